@@ -0,0 +1,81 @@
+"""Compares the typed reply decoders with the old dict decode + walk.
+
+    python benchmarks/decode_responses.py [--size 400000] [--runs 200]
+
+Replies are synthetic but shaped like the real ones: a reasoning-model chat
+completion with a long answer, reasoning text and per-token logprobs, and a
+Gemini reply with safety ratings and usage metadata.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import msgspec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.providers import GetProvider
+
+def ChatReply(size: int) -> bytes:
+    words = size // 12
+    return msgspec.json.encode({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "model": "gpt-5-mini",
+        "choices": [{
+            "index": 0,
+            "message": {
+                "role": "assistant",
+                "content": "1. What is a quiz? a) A b) B c) C d) D |CORRECT:a\n" * (size // 52),
+                "reasoning": "thinking " * (size // 18)
+            },
+            "logprobs": {"content": [{"token": "tok", "logprob": -0.01, "bytes": [116, 111, 107]} for _ in range(words // 8)]},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 1200, "completion_tokens": words, "total_tokens": words + 1200}
+    })
+
+def GeminiReply(size: int) -> bytes:
+    return msgspec.json.encode({
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": "Day 1: revise chapter one.\n" * (size // 54)}] * 2},
+            "finishReason": "STOP",
+            "safetyRatings": [{"category": f"HARM_CATEGORY_{i}", "probability": "NEGLIGIBLE"} for i in range(4)]
+        }],
+        "usageMetadata": {"promptTokenCount": 1200, "candidatesTokenCount": size // 4, "totalTokenCount": size // 4 + 1200}
+    })
+
+def Measure(label: str, func, body: bytes, runs: int) -> None:
+    func(body)
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(body)
+    elapsed = (time.perf_counter() - start) / runs
+
+    tracemalloc.start()
+    func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"  {label:<8} {elapsed * 1000:8.3f} ms/reply   peak {peak / 1024:8.1f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=400_000, help="approximate reply size in bytes")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    untyped = msgspec.json.Decoder()
+
+    for mode, body in (("OpenAI", ChatReply(args.size)), ("Gemini", GeminiReply(args.size))):
+        provider = GetProvider(mode)
+        assert provider.Decode(body) == provider.Extract(untyped.decode(body))
+
+        print(f"{mode} reply, {len(body) / 1024:.0f} KiB")
+        Measure("dict", lambda raw: provider.Extract(untyped.decode(raw)), body, args.runs)
+        Measure("typed", provider.Decode, body, args.runs)
+
+if __name__ == "__main__":
+    main()
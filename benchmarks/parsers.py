@@ -0,0 +1,106 @@
+"""Compares the native_parsers wheel with the pure-Python fallbacks.
+
+    python benchmarks/parsers.py [--questions 20] [--runs 500]
+
+Outputs are synthetic but shaped like the real ones: a full quiz, a month
+long study plan, a flashcard deck and a note analysis. Without the wheel
+only the Python timings are printed.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes import pyParsers
+
+try:
+    import native_parsers
+except ImportError:
+    native_parsers = None
+
+def QuizOutput(questions: int) -> str:
+    return "\n".join(
+        f"{n} Which of these statements about topic {n} is correct? a) The first option, a little longer "
+        f"b) The second option. c) A third option d) None of the above |CORRECT: {'abcd'[n % 4]}|"
+        for n in range(1, questions + 1)
+    )
+
+def StudyPlanOutput(days: int) -> str:
+    return "\n\n".join(f"Day {n}:\n- Revise chapter {n} (45 min)\n- Flashcards for chapter {n}\n- Practice quiz" for n in range(1, days + 1))
+
+def LocalizedStudyPlanOutput(weeks: int) -> str:
+    return "\n\n".join(
+        f"Tydzień {week}:\n" + "\n".join(f"Dzień {7 * (week - 1) + day}: Powtórz rozdział {day} (45 min)" for day in range(1, 8))
+        for week in range(1, weeks + 1)
+    )
+
+def FlashcardOutput(cards: int) -> str:
+    return " ~\n".join(f"What is term number {n}? | The definition of term number {n}, in one sentence." for n in range(cards))
+
+def AnalysisOutput(sections: int) -> str:
+    body = "\n".join(
+        f"SECTION: Section {n}\nCONFIDENCE: {60 + n}\nISSUES:\n- A vague claim.\n- A missing source.\n"
+        f"WHY_IT_MATTERS:\n- Readers can't check it.\nSUGGESTIONS:\n- Cite the lecture slides.\n"
+        for n in range(sections)
+    )
+    return f"OVERALL_SCORE: 78\n\n{body}"
+
+def StreamAll(module, text: str) -> dict:
+    parser = module.QuizStreamParser()
+    quiz = {}
+    for start in range(0, len(text), 64):
+        quiz.update(parser.feed(text[start:start + 64]))
+    quiz.update(parser.finish())
+    return quiz
+
+def Measure(func, runs: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=20, help="questions per quiz (parse_quiz stops at 20)")
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    quiz = QuizOutput(args.questions)
+    plan = StudyPlanOutput(30)
+    localizedPlan = LocalizedStudyPlanOutput(4)
+    deck = FlashcardOutput(50)
+    analysis = AnalysisOutput(6)
+    graded = pyParsers.parse_quiz(quiz)
+    answers = {number: "a" for number in graded}
+
+    cases = [
+        ("parse_quiz", lambda m: m.parse_quiz(quiz)),
+        ("parse_quiz_many x100", lambda m: m.parse_quiz_many([quiz] * 100)),
+        ("QuizStreamParser", lambda m: StreamAll(m, quiz)),
+        ("submit_result", lambda m: m.submit_result(graded, answers)),
+        ("parse_study_plan", lambda m: m.parse_study_plan(plan)),
+        ("parse_study_plan (pl)", lambda m: m.parse_study_plan(localizedPlan)),
+        ("parse_flashcards", lambda m: m.parse_flashcards(deck)),
+        ("parse_note_analysis", lambda m: m.parse_note_analysis(analysis)),
+    ]
+
+    if native_parsers is None:
+        print("native_parsers is not installed, run build.sh to compare")
+
+    print(f"{'':<22} {'python':>12} {'native':>12} {'speedup':>8}")
+    for label, call in cases:
+        python = Measure(lambda: call(pyParsers), args.runs)
+        line = f"{label:<22} {python * 1e6:9.1f} µs"
+
+        if native_parsers is not None:
+            assert call(native_parsers) == call(pyParsers), label
+            native = Measure(lambda: call(native_parsers), args.runs)
+            line += f" {native * 1e6:9.1f} µs {python / native:7.1f}x"
+
+        print(line)
+
+if __name__ == "__main__":
+    main()
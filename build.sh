@@ -32,23 +32,9 @@ else
     echo "No tsconfig.json found, skipping TypeScript compilation"
 fi
 
-# Build and install QuizParser with maximum optimizations
-cd routes/QuizParser
-echo "Building QuizParser with maximum optimizations..."
-maturin build --release --strip
-pip install --force-reinstall target/wheels/*.whl
-cd ../..
-
-# Build and install StudyPlanParser with maximum optimizations
-cd routes/StudyPlanParser
-echo "Building StudyPlanParser with maximum optimizations..."
-maturin build --release --strip
-pip install --force-reinstall target/wheels/*.whl
-cd ../..
-
-# Build and install SubmitQuizResult with maximum optimizations
-cd routes/SubmitQuizResult
-echo "Building SubmitQuizResult with maximum optimizations..."
+# Build and install NativeParsers (quiz, study plan, grading, flashcards, note analysis) with maximum optimizations
+cd routes/NativeParsers
+echo "Building NativeParsers with maximum optimizations..."
 maturin build --release --strip
 pip install --force-reinstall target/wheels/*.whl
 cd ../..
@@ -0,0 +1,32 @@
+# Loaded automatically by gunicorn from the working directory
+import os
+import shutil
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", 4))
+
+# Each request holds a thread while its view waits on the shared AI event
+# loop, so threads, not processes, set how many requests wait on providers
+# at once. A sync worker would serve one request at a time.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 100))
+
+
+def on_starting(server):
+    # Metrics files left by a previous run would be summed into the new one
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def post_worker_init(worker):
+    # Job workers only run in server processes, never in `flask` CLI commands
+    from routes.jobQueue import StartJobWorkers
+    StartJobWorkers()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
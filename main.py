@@ -26,6 +26,7 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from minify_html import minify
 import magic 
+import click
 import defusedxml.ElementTree as ET
 
 # Local application imports
@@ -33,25 +34,33 @@ from routes.utils import (
     LoginUser, RegisterUser, User, LoadUser, SendEmail, VerifyEmail, UserProfile,
     GetMongoClient, GetUserPFP, LoadUserByMail, LoadUserByUsername, CheckPasswordSetup,
     GetStudyStreakData, GetNextAction, IncrementUsage, GetUsage, uploadNotes,
-    StoreQuery, StoreDuckAIConversation, GetQueryFromDB, Log, cleanup
+    StoreQuery, StoreDuckAIConversation, GetQueryFromDB, Log, AiStatus, cleanup,
+    InvalidateUser
 )
 from routes.quiz import (
-    QuizGenerator, quiz, submitResult, QuizGen, ImportQuiz, ExportQuiz, QuizResult
+    QuizGenerator, quiz, submitResult, QuizGen, QuizGenAsync, QuizGenStream, ImportQuiz, ExportQuiz, QuizResult,
+    QuizStatistics
 )
 from routes.noteEnhancer import (
-    EnhanceNotes, NoteEnhancer, EnhancedNotes, ImportNotes as ImportEnhancedNotes,
+    EnhanceNotes, EnhanceNotesAsync, NoteEnhancer, EnhancedNotes, ImportNotes as ImportEnhancedNotes,
     ExportNotes as ExportEnhancedNotes
 )
 from routes.flashcardGenerator import (
-    FlashCardGenerator, FlashcardGenerator, FlashCardResult,
+    FlashCardGenerator, FlashcardGenerator, FlashcardGeneratorAsync, FlashCardResult,
     ImportFlashcards, ExportFlashcards
 )
-from routes.duckAI import GenerateResponse, DuckAI
-from routes.studyPlanGenerator import StudyPlanGen, StudyPlan, ExportStudyPlan, ImportStudyPlan
+from routes.duckAI import GenerateResponseAsync, GenerateResponseStream, DuckAI
+from routes.studyPlanGenerator import StudyPlanGen, StudyPlanGenAsync, StudyPlan, ExportStudyPlan, ImportStudyPlan
 from routes.noteAnalyzer import (
-    NoteAnalyzer, NoteAnalyzerPage, NoteAnalysisResult,
+    NoteAnalyzer, NoteAnalyzerAsync, NoteAnalyzerPage, NoteAnalysisResult,
     ImportNoteAnalysis, ExportNoteAnalysis
 )
+from routes.studyPack import StudyPackGen, StudyPackGenAsync
+from routes.reparse import Reparse, REPARSERS
+from routes.indexes import EnsureIndexes, VerifyIndexes, SoftDeleteUpdate
+from routes.migrations import MigrateUserKeys
+from routes.metrics import RenderMetrics
+from routes.jobQueue import InitJobQueue, StartJobWorkers, JobRequested, EnqueueJob, JobStatus
 from routes.oauth import oauthBp, oauth
 
 load_dotenv()
@@ -189,31 +198,36 @@ s3 = boto3.client(
 )
 
 #
-# Database TTL Indexes
+# Database Indexes
 #
 
-def setup_ttl_indexes():
-    db = GetMongoClient()["EduDuck"]
-    collections = [
-        "users", "quizzes", "study-plans", "flashcards",
-        "enhanced-notes", "duck-ai", "note-analysis"
-    ]
-    for collection_name in collections:
-        try:
-            db.collection.create_index(
-                [("deletedAt", 1)], 
-                expireAfterSeconds=2592000,
-                partialFilterExpression={"deleted": True},  # Matches existing
-                name="deletedAt_1"
-            )
-            Log(f"TTL index created for {collection_name}", "info")
-        except Exception as e:
-            if "already exists" in str(e):
-                Log(f"TTL index already exists for {collection_name}", "info")
-            else:
-                Log(f"Failed to create TTL index for {collection_name}: {str(e)}", "warn")
+# Indexes are reconciled and checked by `flask indexes`, and user lookup keys
+# backfilled by `flask migrate-user-keys`, at deploy time, not on every worker
+# or CLI import where an unreachable database would stall startup
+
+#
+# Job Queue
+#
+
+studyPackStores = {
+    "notes": notes,
+    "quiz": quizzes,
+    "flashcards": flashcards,
+    "analysis": noteAnalyses,
+    "plan": studyPlans
+}
+
+# job kind -> (route the job stands in for, sync view that does the work)
+jobHandlers = {
+    "quiz": ("/quiz-generator/gen-quiz", lambda: QuizGen(prompts, quizzes)),
+    "notes": ("/note-enhancer/enhance", lambda: EnhanceNotes(prompts, notes)),
+    "flashcards": ("/flashcard-generator/generate", lambda: FlashcardGenerator(prompts, flashcards)),
+    "plan": ("/study-plan-generator/generate", lambda: StudyPlanGen(prompts, studyPlans)),
+    "analysis": ("/note-analyzer/analyze", lambda: NoteAnalyzer(prompts, noteAnalyses)),
+    "study-pack": ("/study-pack/generate", lambda: StudyPackGen(prompts, studyPackStores))
+}
 
-setup_ttl_indexes()
+InitJobQueue(app, jobHandlers)
 
 #
 # Cleanup
@@ -240,6 +254,16 @@ def api_login_required(func):
         return func(*args, **kwargs)
     return wrapper
 
+def metrics_token_required(func):
+    # Operational endpoints; open only when METRICS_TOKEN isn't set
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = os.getenv("METRICS_TOKEN")
+        if token and not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return jsonify({"error": "Unauthorized"}), 401
+        return func(*args, **kwargs)
+    return wrapper
+
 def is_safe_image(file) -> bool:
     file.seek(0)
     header = file.read(2048)
@@ -397,6 +421,7 @@ def setup_password():
             {"_id": ObjectId(current_user.id)},
             {"$set": {"password": hashed, "needs_password_setup": False}}
         )
+        InvalidateUser(current_user.id)
 
         skip_url = request.args.get("skip", "/")
         return jsonify({
@@ -496,6 +521,7 @@ def reset_password_confirm(token):
                 }
             }
         )
+        InvalidateUser(str(user["_id"]))
 
         Log(f"Password reset successful for user {user['username']}", "success")
         return jsonify({"message": "Password reset successful. You can now log in."}), 200
@@ -586,6 +612,7 @@ def upload_profile_picture():
             {"_id": ObjectId(user_id)},
             {"$set": {"profilePicture": key}}
         )
+        InvalidateUser(user_id)
     except Exception as e:
         Log(f"Failed to update user profile picture URL in MongoDB -> {str(e)}", "error")
         try:
@@ -634,14 +661,16 @@ def delete_account():
         db = GetMongoClient()["EduDuck"]
         user_id = current_user.id
         now = datetime.datetime.now(datetime.UTC)
-        deletion_update = {"$set": {"deletedAt": now}}
+        deletion_update = SoftDeleteUpdate(now)
 
         db["users"].update_one({"_id": ObjectId(user_id)}, deletion_update)
+        InvalidateUser(user_id)
         db["quizzes"].update_many({"userID": user_id}, deletion_update)
         db["study-plans"].update_many({"userID": user_id}, deletion_update)
         db["flashcards"].update_many({"userID": user_id}, deletion_update)
         db["enhanced-notes"].update_many({"userID": user_id}, deletion_update)
         db["duck-ai"].update_many({"userID": user_id}, deletion_update)
+        db["quiz-submissions"].update_many({"userID": user_id}, deletion_update)
 
         if user.get("profilePicture"):
             try:
@@ -720,6 +749,20 @@ def get_usage():
 def increment_usage():
     return IncrementUsage()
 
+@app.route("/api/ai-status", methods=["GET"])
+@metrics_token_required
+def ai_status():
+    return jsonify(AiStatus())
+
+@app.route("/metrics", methods=["GET"])
+@limiter.exempt
+@metrics_token_required
+def metrics():
+    body, contentType = RenderMetrics()
+    response = make_response(body)
+    response.headers["Content-Type"] = contentType
+    return response
+
 #
 # Quiz Generator
 #
@@ -731,8 +774,15 @@ def quiz_generator():
 
 @app.route('/quiz-generator/gen-quiz', methods=['POST'], endpoint='generate_quiz')
 @limiter.limit("30 per hour")
-def quiz_gen():
-    return QuizGen(prompts, quizzes)
+async def quiz_gen():
+    if JobRequested():
+        return EnqueueJob("quiz")
+    return await QuizGenAsync(prompts, quizzes)
+
+@app.route('/quiz-generator/gen-quiz-stream', methods=['POST'], endpoint='generate_quiz_stream')
+@limiter.limit("30 per hour")
+def quiz_gen_stream():
+    return QuizGenStream(prompts, quizzes)
 
 @app.route("/quiz-generator/quiz", endpoint='show_quiz')
 @limiter.exempt
@@ -746,6 +796,12 @@ def quiz_result():
         return submitResult(quizResults)
     return QuizResult(quizResults, remaining_usage)
 
+@app.route('/quiz-generator/quiz/stats', methods=['GET'], endpoint='quiz_stats')
+@limiter.limit("120 per hour")
+@login_required
+def quiz_stats():
+    return QuizStatistics(quizzes)
+
 @app.route('/quiz-generator/import-quiz', methods=['POST'], endpoint='import_quiz')
 @limiter.exempt
 def import_quiz():
@@ -767,8 +823,10 @@ def note_enhancer():
 
 @app.route('/note-enhancer/enhance', methods=['POST'], endpoint='enhance_notes')
 @limiter.limit("30 per hour")
-def enhance_notes():
-    return EnhanceNotes(prompts, notes)
+async def enhance_notes():
+    if JobRequested():
+        return EnqueueJob("notes")
+    return await EnhanceNotesAsync(prompts, notes)
 
 @app.route('/note-enhancer/result', endpoint='enhanced_notes_result')
 @limiter.exempt
@@ -796,8 +854,10 @@ def flashcard_generator_page():
 
 @app.route('/flashcard-generator/generate', methods=['POST'], endpoint='generate_flashcards')
 @limiter.limit("30 per hour")
-def generate_flashcards():
-    return FlashcardGenerator(prompts, flashcards)
+async def generate_flashcards():
+    if JobRequested():
+        return EnqueueJob("flashcards")
+    return await FlashcardGeneratorAsync(prompts, flashcards)
 
 @app.route('/flashcard-generator/result', endpoint='flashcard_result')
 @limiter.exempt
@@ -825,8 +885,13 @@ def duck_ai_page():
 
 @app.route('/duck-ai/generate', methods=['POST'], endpoint='duck_ai_generate')
 @limiter.limit("30 per hour")
-def duck_ai_generate():
-    return GenerateResponse(prompts)
+async def duck_ai_generate():
+    return await GenerateResponseAsync(prompts)
+
+@app.route('/duck-ai/generate-stream', methods=['POST'], endpoint='duck_ai_generate_stream')
+@limiter.limit("30 per hour")
+def duck_ai_generate_stream():
+    return GenerateResponseStream(prompts)
 
 @app.route('/duck-ai/store-conversation', methods=['POST'], endpoint='duck_ai_store_conversation')
 @login_required
@@ -850,8 +915,10 @@ def study_plan_generator_page():
 
 @app.route('/study-plan-generator/generate', methods=['POST'], endpoint='generate_study_plan')
 @limiter.limit("30 per hour")
-def generate_study_plan():
-    return StudyPlanGen(prompts, studyPlans)
+async def generate_study_plan():
+    if JobRequested():
+        return EnqueueJob("plan")
+    return await StudyPlanGenAsync(prompts, studyPlans)
 
 @app.route('/study-plan-generator/result', endpoint='study_plan_result')
 @limiter.exempt
@@ -868,6 +935,17 @@ def export_study_plan():
 def import_study_plan():
     return ImportStudyPlan(studyPlans)
 
+#
+# Study Pack
+#
+
+@app.route('/study-pack/generate', methods=['POST'], endpoint='generate_study_pack')
+@limiter.limit("30 per hour")
+async def generate_study_pack():
+    if JobRequested():
+        return EnqueueJob("study-pack")
+    return await StudyPackGenAsync(prompts, studyPackStores)
+
 #
 # Note Analyzer
 #
@@ -879,8 +957,10 @@ def note_analyzer_page():
 
 @app.route("/note-analyzer/analyze", methods=["POST"], endpoint="note_analyzer_analyze")
 @limiter.limit("30 per hour")
-def note_analyzer_analyze():
-    return NoteAnalyzer(prompts, noteAnalyses)
+async def note_analyzer_analyze():
+    if JobRequested():
+        return EnqueueJob("analysis")
+    return await NoteAnalyzerAsync(prompts, noteAnalyses)
 
 @app.route("/note-analyzer/result", endpoint="note_analyzer_result")
 @limiter.exempt
@@ -897,6 +977,15 @@ def note_analyzer_import():
 def export_note_analysis():
     return ExportNoteAnalysis(noteAnalyses)
 
+#
+# Background Jobs
+#
+
+@app.route("/jobs/<job_id>", methods=["GET"], endpoint="job_status")
+@limiter.limit("600 per hour")
+def job_status(job_id):
+    return JobStatus(job_id)
+
 #
 # Static & Miscellaneous Routes
 #
@@ -937,5 +1026,43 @@ def terms():
 def microsoft_identity_association():
     return send_from_directory('static', 'microsoft-identity-association.json')
 
+#
+# Maintenance Commands
+#
+
+@app.cli.command("reparse")
+@click.argument("collection", type=click.Choice(sorted(REPARSERS)))
+@click.option("--batch-size", default=500, show_default=True, help="Documents parsed per native call.")
+@click.option("--dry-run", is_flag=True, help="Count changed documents without writing them.")
+def reparse_command(collection, batch_size, dry_run):
+    """Re-run the parsers over stored raw AI output."""
+    stats = Reparse(collection, batch_size, dry_run)
+    click.echo(f"{stats['scanned']} scanned, {stats['changed']} changed, {stats['empty']} empty" + (" (dry run)" if dry_run else ""))
+
+@app.cli.command("indexes")
+@click.option("--rebuild", is_flag=True, help="Drop and recreate indexes whose options changed.")
+@click.option("--dry-run", is_flag=True, help="Report what would change without writing.")
+def indexes_command(rebuild, dry_run):
+    """Reconcile the declared MongoDB indexes and check the hot queries use them."""
+    for entry in EnsureIndexes(rebuild, dry_run):
+        click.echo(f"{entry['collection']:<18} {entry['index']:<24} {entry['action']}")
+
+    slow = [entry for entry in VerifyIndexes() if not entry["ok"]]
+    for entry in slow:
+        click.echo(f"{entry['query']} on {entry['collection']}: {', '.join(entry['stages']) or 'explain failed'}")
+
+    if slow:
+        raise SystemExit(1)
+    click.echo("All hot queries use an index.")
+
+@app.cli.command("migrate-user-keys")
+@click.option("--batch-size", default=500, show_default=True, help="Users updated per bulk write.")
+@click.option("--dry-run", is_flag=True, help="Count users without keys without writing.")
+def migrate_user_keys_command(batch_size, dry_run):
+    """Set the usernameKey and emailKey lookup fields on existing users."""
+    stats = MigrateUserKeys(batch_size, dry_run)
+    click.echo(f"{stats['scanned']} scanned, {stats['updated']} updated" + (" (dry run)" if dry_run else ""))
+
 if __name__ == "__main__":
+    StartJobWorkers()
     app.run()
\ No newline at end of file
@@ -0,0 +1,38 @@
+use pyo3::prelude::*;
+use pyo3::types::{PyDict, PyList};
+
+use crate::text::py_strip;
+
+/// Parse "question | answer ~ question | answer" model output.
+/// Same result as `parse_flashcards` in routes/pyParsers.py.
+#[pyfunction]
+pub fn parse_flashcards<'py>(py: Python<'py>, text: &str) -> PyResult<Bound<'py, PyList>> {
+    // Slices borrow from `text`, nothing is allocated per line
+    let cards = py.allow_threads(|| scan_flashcards(text));
+
+    let list = PyList::empty(py);
+    for (question, answer) in cards {
+        let dict = PyDict::new(py);
+        dict.set_item("question", question)?;
+        dict.set_item("answer", answer)?;
+        list.append(dict)?;
+    }
+
+    Ok(list)
+}
+
+fn scan_flashcards(text: &str) -> Vec<(&str, &str)> {
+    text.split('~')
+        .filter_map(|card| {
+            // Only the first | separates, answers may contain more
+            let (question, answer) = card.split_once('|')?;
+            let (question, answer) = (py_strip(question), py_strip(answer));
+
+            if question.is_empty() || answer.is_empty() {
+                None
+            } else {
+                Some((question, answer))
+            }
+        })
+        .collect()
+}
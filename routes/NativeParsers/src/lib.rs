@@ -0,0 +1,23 @@
+use pyo3::prelude::*;
+
+mod flashcards;
+mod note_analysis;
+mod quiz;
+mod study_plan;
+mod submit;
+mod text;
+
+/// Every native parser in one extension: build.sh builds and installs a
+/// single wheel and the app imports a single shared library.
+#[pymodule]
+fn native_parsers(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_function(wrap_pyfunction!(quiz::parse_quiz, m)?)?;
+    m.add_function(wrap_pyfunction!(quiz::parse_quiz_many, m)?)?;
+    m.add_class::<quiz::QuizStreamParser>()?;
+    m.add_function(wrap_pyfunction!(study_plan::parse_study_plan, m)?)?;
+    m.add_function(wrap_pyfunction!(study_plan::parse_study_plan_many, m)?)?;
+    m.add_function(wrap_pyfunction!(submit::submit_result, m)?)?;
+    m.add_function(wrap_pyfunction!(flashcards::parse_flashcards, m)?)?;
+    m.add_function(wrap_pyfunction!(note_analysis::parse_note_analysis, m)?)?;
+    Ok(())
+}
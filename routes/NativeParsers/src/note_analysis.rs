@@ -0,0 +1,113 @@
+use pyo3::prelude::*;
+use pyo3::types::{PyDict, PyInt, PyList};
+
+use crate::text::py_strip;
+
+#[derive(Clone, Copy)]
+enum Field {
+    Issues,
+    WhyItMatters,
+    Suggestions,
+}
+
+#[derive(Default)]
+struct Section<'a> {
+    title: &'a str,
+    // Every CONFIDENCE: value in order, the last one int() accepts wins
+    confidence: Vec<&'a str>,
+    issues: Vec<&'a str>,
+    why_it_matters: Vec<&'a str>,
+    suggestions: Vec<&'a str>,
+}
+
+#[derive(Default)]
+struct Analysis<'a> {
+    scores: Vec<&'a str>,
+    sections: Vec<Section<'a>>,
+}
+
+/// Parse OVERALL_SCORE / SECTION / CONFIDENCE / ISSUES... model output.
+/// Same result as `parse_note_analysis` in routes/pyParsers.py.
+#[pyfunction]
+pub fn parse_note_analysis<'py>(py: Python<'py>, raw_output: &str) -> PyResult<Bound<'py, PyDict>> {
+    let analysis = py.allow_threads(|| scan_note_analysis(raw_output));
+
+    // Scores go through Python's int() so "+7", "0_5" or non-ASCII digits
+    // convert (or fail) exactly as they do in the Python parser
+    let int = py.get_type::<PyInt>();
+    let to_int = |values: &[&str]| -> Bound<'py, PyAny> {
+        let mut result = 0i64.into_pyobject(py).unwrap().into_any();
+        for value in values {
+            if let Ok(parsed) = int.call1((*value,)) {
+                result = parsed;
+            }
+        }
+        result
+    };
+
+    let sections = PyList::empty(py);
+    for section in analysis.sections {
+        let dict = PyDict::new(py);
+        dict.set_item("title", section.title)?;
+        dict.set_item("confidence", to_int(&section.confidence))?;
+        dict.set_item("issues", section.issues)?;
+        dict.set_item("why_it_matters", section.why_it_matters)?;
+        dict.set_item("suggestions", section.suggestions)?;
+        sections.append(dict)?;
+    }
+
+    let result = PyDict::new(py);
+    result.set_item("overall_score", to_int(&analysis.scores))?;
+    result.set_item("sections", sections)?;
+
+    Ok(result)
+}
+
+fn scan_note_analysis(raw_output: &str) -> Analysis<'_> {
+    let mut analysis = Analysis::default();
+    let text = py_strip(raw_output);
+    if text.is_empty() {
+        return analysis;
+    }
+
+    let mut current: Option<Section> = None;
+    let mut field: Option<Field> = None;
+
+    for line in text.split('\n') {
+        let line = py_strip(line);
+
+        if let Some(score) = line.strip_prefix("OVERALL_SCORE:") {
+            analysis.scores.push(py_strip(score));
+        } else if let Some(title) = line.strip_prefix("SECTION:") {
+            if let Some(section) = current.take() {
+                analysis.sections.push(section);
+            }
+            current = Some(Section { title: py_strip(title), ..Section::default() });
+            field = None;
+        } else if let (Some(confidence), Some(section)) = (line.strip_prefix("CONFIDENCE:"), current.as_mut()) {
+            section.confidence.push(py_strip(confidence));
+            field = None;
+        } else if line == "ISSUES:" {
+            field = Some(Field::Issues);
+        } else if line == "WHY_IT_MATTERS:" {
+            field = Some(Field::WhyItMatters);
+        } else if line == "SUGGESTIONS:" {
+            field = Some(Field::Suggestions);
+        } else if let (Some(item), Some(section), Some(field)) = (line.strip_prefix('-'), current.as_mut(), field) {
+            let item = py_strip(item);
+            if !item.is_empty() {
+                match field {
+                    Field::Issues => section.issues.push(item),
+                    Field::WhyItMatters => section.why_it_matters.push(item),
+                    Field::Suggestions => section.suggestions.push(item),
+                }
+            }
+        }
+    }
+
+    if let Some(section) = current {
+        analysis.sections.push(section);
+    }
+
+    analysis
+}
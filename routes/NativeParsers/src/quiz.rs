@@ -0,0 +1,438 @@
+use pyo3::prelude::*;
+use pyo3::exceptions::PyRuntimeError;
+use pyo3::pybacked::PyBackedStr;
+use pyo3::types::PyDict;
+use rayon::prelude::*;
+
+const MAX_QUESTIONS: usize = 20;
+const CORRECT_MARKER: &[u8] = b"|CORRECT:";
+const MIN_QUESTION_LENGTH: usize = 10;
+const MIN_ANSWER_LENGTH: usize = 1;
+
+#[derive(Debug)]
+struct QuestionBlock {
+    start: usize,
+    end: usize,
+    correct: char,
+}
+
+/// Resumable marker scan shared by `parse_quiz` and `QuizStreamParser`
+#[derive(Debug, Default)]
+struct BlockScanner {
+    pos: usize,   // next byte to check for a marker
+    start: usize, // where the next question block begins
+}
+
+#[derive(Debug)]
+struct ParsedQuestion<'a> {
+    text: &'a str,
+    answers: [&'a str; 4],
+    correct: char,
+}
+
+/// Ultra-fast, safe, and robust quiz parser
+#[pyfunction]
+pub fn parse_quiz(py: Python, quiz: &str) -> PyResult<PyObject> {
+    let questions = parse_questions(quiz);
+    Ok(questions_to_dict(py, &questions)?.into_any().unbind())
+}
+
+/// `parse_quiz` over many quizzes at once for bulk reprocessing. The texts
+/// are parsed in parallel with the GIL released, Python objects are only
+/// built once every text is done.
+#[pyfunction]
+pub fn parse_quiz_many(py: Python, quizzes: Vec<PyBackedStr>) -> PyResult<Vec<PyObject>> {
+    let parsed: Vec<Vec<ParsedQuestion>> = py.allow_threads(|| {
+        quizzes.par_iter().map(|quiz| parse_questions(quiz)).collect()
+    });
+
+    parsed
+        .iter()
+        .map(|questions| Ok(questions_to_dict(py, questions)?.into_any().unbind()))
+        .collect()
+}
+
+/// Valid questions of a complete quiz text, borrowing from it
+fn parse_questions(quiz: &str) -> Vec<ParsedQuestion<'_>> {
+    let bytes = quiz.as_bytes();
+
+    extract_blocks(bytes)
+        .iter()
+        .take(MAX_QUESTIONS)
+        .filter_map(|block| parse_block(bytes, block))
+        .filter(is_valid_question)
+        .collect()
+}
+
+/// Number questions from "1" as `parse_quiz` returns them
+fn questions_to_dict<'py>(py: Python<'py>, questions: &[ParsedQuestion]) -> PyResult<Bound<'py, PyDict>> {
+    let questions_dict = PyDict::new(py);
+
+    for (index, question) in questions.iter().enumerate() {
+        let dict = create_question_dict(py, question)?;
+        questions_dict.set_item((index + 1).to_string(), dict)?;
+    }
+
+    Ok(questions_dict)
+}
+
+/// Extract all question blocks with their correct answers
+#[inline]
+fn extract_blocks(bytes: &[u8]) -> Vec<QuestionBlock> {
+    let mut blocks = Vec::with_capacity(MAX_QUESTIONS);
+    BlockScanner::default().scan(bytes, &mut blocks);
+    blocks
+}
+
+impl BlockScanner {
+    /// Push every block completed within `bytes`. A block whose answer letter
+    /// or closing `|` hasn't arrived yet is left for the next call, so feeding
+    /// text piece by piece finds exactly the blocks a single call would.
+    fn scan(&mut self, bytes: &[u8], blocks: &mut Vec<QuestionBlock>) {
+        let len = bytes.len();
+
+        // Use optimized search
+        let mut i = self.pos;
+        while i < len.saturating_sub(CORRECT_MARKER.len()) {
+            // Fast path: check first and last byte before full comparison
+            if bytes[i] == b'|' && bytes[i + 8] == b':' && &bytes[i..i + CORRECT_MARKER.len()] == CORRECT_MARKER {
+                let block_end = i;
+                let mut j = i + CORRECT_MARKER.len();
+
+                // Skip whitespace
+                while j < len && bytes[j].is_ascii_whitespace() {
+                    j += 1;
+                }
+
+                // Extract correct answer
+                if j >= len {
+                    break; // Not here yet
+                }
+                let correct = normalize_answer_char(bytes[j] as char);
+
+                // Find end delimiter
+                while j < len && bytes[j] != b'|' {
+                    j += 1;
+                }
+
+                if j >= len {
+                    break; // Not here yet
+                }
+                j += 1; // Skip |
+
+                // Validate block size
+                if block_end > self.start && block_end - self.start >= MIN_QUESTION_LENGTH {
+                    blocks.push(QuestionBlock {
+                        start: self.start,
+                        end: block_end,
+                        correct,
+                    });
+                }
+
+                self.start = j;
+                i = j;
+            } else {
+                i += 1;
+            }
+        }
+
+        self.pos = i;
+    }
+}
+
+/// Parse a single question block
+#[inline]
+fn parse_block<'a>(bytes: &'a [u8], block: &QuestionBlock) -> Option<ParsedQuestion<'a>> {
+    let slice = &bytes[block.start..block.end];
+    
+    // Skip leading whitespace and question number
+    let pos = skip_whitespace_and_number(slice)?;
+    
+    // Find all option positions
+    let option_positions = find_option_positions(&slice[pos..])?;
+    
+    // Extract question text (everything before first option)
+    let question_end = pos + option_positions[0].0;
+    let question_text = safe_trim_to_str(&slice[pos..question_end])?;
+    
+    // Extract all answers
+    let mut answers = [""; 4];
+    for i in 0..4 {
+        let (_, content_start) = option_positions[i];
+        let content_end = if i < 3 {
+            option_positions[i + 1].0
+        } else {
+            slice.len() - pos
+        };
+        
+        let answer_slice = &slice[pos + content_start..pos + content_end];
+        answers[i] = safe_trim_answer_to_str(answer_slice)?;
+    }
+    
+    Some(ParsedQuestion {
+        text: question_text,
+        answers,
+        correct: block.correct,
+    })
+}
+
+/// Find positions of all four options (a, b, c, d)
+#[inline]
+fn find_option_positions(slice: &[u8]) -> Option<[(usize, usize); 4]> {
+    let mut positions = [(0, 0); 4];
+    let mut found_mask = 0u8; // Bitmask to track which options we've found
+    
+    let len = slice.len();
+    let mut i = 0;
+    
+    while i < len.saturating_sub(1) && found_mask != 0b1111 {
+        let b = slice[i];
+        
+        // Check if this is an option label
+        if b >= b'a' && b <= b'd' && slice[i + 1] == b')' {
+            let idx = (b - b'a') as usize;
+            
+            // Only record first occurrence of each option
+            if (found_mask & (1 << idx)) == 0 {
+                positions[idx] = (i, i + 2);
+                found_mask |= 1 << idx;
+            }
+            
+            i += 2;
+        } else {
+            i += 1;
+        }
+    }
+    
+    // Verify all four options were found, in order (an out-of-order label
+    // would make the answer slices run backwards)
+    if found_mask == 0b1111 && positions.windows(2).all(|w| w[0].1 <= w[1].0) {
+        Some(positions)
+    } else {
+        None
+    }
+}
+
+/// Skip leading whitespace and question number
+#[inline]
+fn skip_whitespace_and_number(slice: &[u8]) -> Option<usize> {
+    let mut pos = 0;
+    let len = slice.len();
+    
+    // Skip whitespace
+    while pos < len && slice[pos].is_ascii_whitespace() {
+        pos += 1;
+    }
+    
+    // Skip digits
+    while pos < len && slice[pos].is_ascii_digit() {
+        pos += 1;
+    }
+    
+    // Skip whitespace after number
+    while pos < len && slice[pos].is_ascii_whitespace() {
+        pos += 1;
+    }
+    
+    if pos < len {
+        Some(pos)
+    } else {
+        None
+    }
+}
+
+/// Safely convert bytes to str with trimming
+#[inline(always)]
+fn safe_trim_to_str(bytes: &[u8]) -> Option<&str> {
+    let trimmed = trim_bytes(bytes);
+    std::str::from_utf8(trimmed).ok()
+}
+
+/// Safely convert answer bytes to str with aggressive trimming
+#[inline(always)]
+fn safe_trim_answer_to_str(bytes: &[u8]) -> Option<&str> {
+    let trimmed = trim_answer_bytes(bytes);
+    if trimmed.len() >= MIN_ANSWER_LENGTH {
+        std::str::from_utf8(trimmed).ok()
+    } else {
+        None
+    }
+}
+
+/// Trim whitespace from byte slice
+#[inline(always)]
+fn trim_bytes(bytes: &[u8]) -> &[u8] {
+    let mut start = 0;
+    let mut end = bytes.len();
+    
+    while start < end && bytes[start].is_ascii_whitespace() {
+        start += 1;
+    }
+    
+    while end > start && bytes[end - 1].is_ascii_whitespace() {
+        end -= 1;
+    }
+    
+    &bytes[start..end]
+}
+
+/// Trim whitespace and punctuation from answer
+#[inline(always)]
+fn trim_answer_bytes(bytes: &[u8]) -> &[u8] {
+    let mut start = 0;
+    let mut end = bytes.len();
+    
+    // Trim start
+    while start < end && bytes[start].is_ascii_whitespace() {
+        start += 1;
+    }
+    
+    // Trim end (including punctuation)
+    while end > start {
+        let b = bytes[end - 1];
+        if b.is_ascii_whitespace() || matches!(b, b'.' | b',' | b'!' | b'?' | b';' | b':') {
+            end -= 1;
+        } else {
+            break;
+        }
+    }
+    
+    &bytes[start..end]
+}
+
+/// Normalize answer character (lowercase, validate)
+#[inline(always)]
+fn normalize_answer_char(c: char) -> char {
+    match c.to_ascii_lowercase() {
+        'a' | 'b' | 'c' | 'd' => c.to_ascii_lowercase(),
+        _ => 'a', // Default fallback
+    }
+}
+
+/// Validate parsed question
+#[inline]
+fn is_valid_question(q: &ParsedQuestion) -> bool {
+    // Question text must not be empty
+    if q.text.is_empty() || q.text.len() < 5 {
+        return false;
+    }
+    
+    // All answers must be non-empty
+    for answer in &q.answers {
+        if answer.is_empty() {
+            return false;
+        }
+    }
+    
+    // Correct answer must be valid
+    matches!(q.correct, 'a' | 'b' | 'c' | 'd')
+}
+
+/// Create Python dict from parsed question
+#[inline]
+fn create_question_dict<'py>(py: Python<'py>, q: &ParsedQuestion) -> PyResult<Bound<'py, PyDict>> {
+    let dict = PyDict::new(py);
+    let answers_dict = PyDict::new(py);
+    
+    answers_dict.set_item("a", q.answers[0])?;
+    answers_dict.set_item("b", q.answers[1])?;
+    answers_dict.set_item("c", q.answers[2])?;
+    answers_dict.set_item("d", q.answers[3])?;
+    
+    dict.set_item("question", q.text)?;
+    dict.set_item("answers", answers_dict)?;
+    dict.set_item("correct", q.correct)?;
+    
+    Ok(dict)
+}
+
+/// Incremental parser for a quiz that is still being generated.
+///
+/// `feed` takes the next piece of model output and returns the questions it
+/// completed, numbered on from the previous ones, so merging every result
+/// gives the same dict `parse_quiz` returns for the whole text.
+#[pyclass]
+pub struct QuizStreamParser {
+    buffer: Vec<u8>,
+    scanner: BlockScanner,
+    blocks_seen: usize,
+    count: usize,
+    finished: bool,
+}
+
+#[pymethods]
+impl QuizStreamParser {
+    #[new]
+    fn new() -> Self {
+        QuizStreamParser {
+            buffer: Vec::new(),
+            scanner: BlockScanner::default(),
+            blocks_seen: 0,
+            count: 0,
+            finished: false,
+        }
+    }
+
+    /// Number of questions returned so far
+    #[getter]
+    fn count(&self) -> usize {
+        self.count
+    }
+
+    fn feed(&mut self, py: Python, chunk: &str) -> PyResult<PyObject> {
+        if self.finished {
+            return Err(PyRuntimeError::new_err("feed() called after finish()"));
+        }
+
+        // Past the question limit nothing else can be returned
+        if self.blocks_seen < MAX_QUESTIONS {
+            self.buffer.extend_from_slice(chunk.as_bytes());
+        }
+
+        self.take_questions(py)
+    }
+
+    /// End of output. A trailing question without its closing `|` is dropped,
+    /// as `parse_quiz` drops it.
+    fn finish(&mut self, py: Python) -> PyResult<PyObject> {
+        let questions = self.take_questions(py)?;
+
+        self.finished = true;
+        self.buffer = Vec::new();
+
+        Ok(questions)
+    }
+}
+
+impl QuizStreamParser {
+    fn take_questions(&mut self, py: Python) -> PyResult<PyObject> {
+        let questions_dict = PyDict::new(py);
+        let mut blocks = Vec::new();
+        self.scanner.scan(&self.buffer, &mut blocks);
+
+        for block in blocks {
+            if self.blocks_seen >= MAX_QUESTIONS {
+                break;
+            }
+            self.blocks_seen += 1;
+
+            if let Some(parsed) = parse_block(&self.buffer, &block) {
+                if is_valid_question(&parsed) {
+                    let dict = create_question_dict(py, &parsed)?;
+                    self.count += 1;
+                    questions_dict.set_item(self.count.to_string(), dict)?;
+                }
+            }
+        }
+
+        // Everything before the next block has been parsed, keep the buffer small
+        let consumed = self.scanner.start;
+        if consumed > 0 {
+            self.buffer.drain(..consumed);
+            self.scanner.pos -= consumed;
+            self.scanner.start = 0;
+        }
+
+        Ok(questions_dict.into_any().unbind())
+    }
+}
@@ -0,0 +1,144 @@
+use aho_corasick::{AhoCorasick, MatchKind};
+use pyo3::prelude::*;
+use pyo3::pybacked::PyBackedStr;
+use pyo3::types::PyDict;
+use rayon::prelude::*;
+use std::sync::OnceLock;
+
+/// Fast parser for study plan text without regex
+/// Parses "Day X:" patterns, and their week, session and translated
+/// variants ("Dzień 2:", "Jour 3 :", "Woche 1:"), and extracts content between them
+#[pyfunction]
+pub fn parse_study_plan(py: Python, plan_text: &str) -> PyResult<Vec<PyObject>> {
+    entries_to_list(py, &scan_study_plan(plan_text))
+}
+
+/// `parse_study_plan` over many plans at once for bulk reprocessing, parsed
+/// in parallel with the GIL released
+#[pyfunction]
+pub fn parse_study_plan_many(py: Python, plans: Vec<PyBackedStr>) -> PyResult<Vec<Vec<PyObject>>> {
+    let scanned: Vec<Vec<(&str, &str)>> = py.allow_threads(|| {
+        plans.par_iter().map(|plan| scan_study_plan(plan)).collect()
+    });
+
+    scanned.iter().map(|entries| entries_to_list(py, entries)).collect()
+}
+
+fn entries_to_list(py: Python, entries: &[(&str, &str)]) -> PyResult<Vec<PyObject>> {
+    entries
+        .iter()
+        .map(|(day, tasks)| {
+            let dict = PyDict::new(py);
+            dict.set_item("day", day)?;
+            dict.set_item("tasks", tasks)?;
+            Ok(dict.into_any().unbind())
+        })
+        .collect()
+}
+
+/// Step headings the prompts get back in every language the app is served in
+/// (the locales of `determine_request_locale`): days, weeks and sessions.
+/// Matched as written and in upper case.
+const HEADINGS: &[&str] = &[
+    "Day", "Week", "Session",                   // en
+    "Dzień", "Tydzień", "Sesja",                // pl
+    "День", "Тиждень", "Сесія", "Заняття",      // uk
+    "Jour", "Semaine", "Séance",                // fr
+    "Неделя", "Сессия", "Занятие",              // ru
+    "Tag", "Woche", "Sitzung",                  // de
+];
+
+/// One automaton over every heading, built on first use
+fn headings() -> &'static AhoCorasick {
+    static HEADINGS_AC: OnceLock<AhoCorasick> = OnceLock::new();
+    HEADINGS_AC.get_or_init(|| {
+        let mut patterns: Vec<String> = Vec::with_capacity(HEADINGS.len() * 2);
+        for heading in HEADINGS {
+            patterns.push(heading.to_string());
+            patterns.push(heading.to_uppercase());
+        }
+        patterns.sort();
+        patterns.dedup();
+
+        // No heading is a prefix of another, and one that starts inside a
+        // longer match ("ДЕНЬ" in "ТИЖДЕНЬ") follows a letter and fails the
+        // boundary check anyway, so non-overlapping leftmost-longest matches
+        // find every marker. Unlike overlapping search they keep the prefilter.
+        AhoCorasick::builder()
+            .match_kind(MatchKind::LeftmostLongest)
+            .build(&patterns)
+            .expect("heading patterns are valid")
+    })
+}
+
+/// Spaces allowed around the number: French puts a (narrow) no-break space before the colon
+#[inline(always)]
+fn is_marker_space(c: char) -> bool {
+    matches!(c, ' ' | '\t' | '\u{a0}' | '\u{202f}')
+}
+
+/// Letters and digits a heading can't follow, "Montag 1:" isn't "Tag 1:".
+/// Outside ASCII only the scripts of the headings count (Latin and Cyrillic
+/// letters), by code point so pyParsers draws the same line.
+#[inline(always)]
+fn is_word_char(c: char) -> bool {
+    c.is_ascii_alphanumeric()
+        || (matches!(c, '\u{c0}'..='\u{24f}' | '\u{400}'..='\u{4ff}') && c != '\u{d7}' && c != '\u{f7}')
+}
+
+/// End of the "<heading> <number>:" marker whose heading is at start..end, if it is one
+fn marker_end(text: &str, start: usize, end: usize) -> Option<usize> {
+    if text[..start].chars().next_back().is_some_and(is_word_char) {
+        return None;
+    }
+
+    let rest = &text[end..];
+    let after_gap = rest.trim_start_matches(is_marker_space);
+    if after_gap.len() == rest.len() {
+        return None;
+    }
+
+    let digits = after_gap.bytes().take_while(u8::is_ascii_digit).count();
+    if digits == 0 {
+        return None;
+    }
+
+    let after_number = after_gap[digits..].trim_start_matches(is_marker_space);
+    if !after_number.starts_with(':') {
+        return None;
+    }
+
+    Some(text.len() - after_number.len() + 1)
+}
+
+/// (day label, tasks) pairs borrowing from `plan_text`. One pass of the
+/// heading automaton finds every marker, each entry's tasks run up to the next one.
+fn scan_study_plan(plan_text: &str) -> Vec<(&str, &str)> {
+    let bytes = plan_text.as_bytes();
+    let len = bytes.len();
+
+    let mut markers = headings()
+        .find_iter(plan_text)
+        .filter_map(|m| marker_end(plan_text, m.start(), m.end()).map(|end| (m.start(), end)))
+        .peekable();
+
+    let mut result = Vec::new();
+    while let Some((day_start, day_end)) = markers.next() {
+        let mut pos = day_end;
+
+        // Skip whitespace after colon
+        while pos < len && (bytes[pos] == b' ' || bytes[pos] == b'\t') {
+            pos += 1;
+        }
+
+        // Skip newlines after the day label
+        while pos < len && (bytes[pos] == b'\n' || bytes[pos] == b'\r') {
+            pos += 1;
+        }
+
+        let content_end = markers.peek().map_or(len, |&(next_start, _)| next_start);
+        result.push((&plan_text[day_start..day_end], plan_text[pos..content_end].trim()));
+    }
+
+    result
+}
@@ -3,7 +3,7 @@ use pyo3::types::PyDict;
 use std::collections::HashMap;
 
 #[pyfunction]
-fn submit_result<'py>(
+pub fn submit_result<'py>(
     py: Python<'py>,
     quiz: Bound<'py, PyDict>,
     user_answers: Bound<'py, PyDict>,
@@ -78,9 +78,3 @@ fn submit_result<'py>(
     
     Ok(final_dict)
 }
-
-#[pymodule]
-fn submit_quiz(module: &Bound<'_, PyModule>) -> PyResult<()> {
-    module.add_function(wrap_pyfunction!(submit_result, module)?)?;
-    Ok(())
-}
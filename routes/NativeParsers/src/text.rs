@@ -0,0 +1,12 @@
+/// Whitespace as Python's `str.isspace()` sees it: Rust's White_Space set
+/// plus the \x1c-\x1f separators, so trimmed text matches `str.strip()`
+#[inline(always)]
+pub fn is_py_space(c: char) -> bool {
+    c.is_whitespace() || ('\x1c'..='\x1f').contains(&c)
+}
+
+/// `str.strip()` without arguments
+#[inline(always)]
+pub fn py_strip(s: &str) -> &str {
+    s.trim_matches(is_py_space)
+}
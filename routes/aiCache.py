@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from datetime import datetime , timedelta
+from typing import Optional , Callable
+import hashlib
+import threading
+import time
+import msgspec
+
+_keyEncoder = msgspec.json.Encoder(order="sorted")
+
+def MakeCacheKey(mode: str , API_URL: str , payload: dict) -> str:
+    # Payload carries model, fully formatted prompt and sampling params.
+    # Query string is dropped so Gemini's ?key= never ends up in the key.
+    digest = hashlib.sha256()
+    digest.update(mode.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(API_URL.split("?", 1)[0].encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_keyEncoder.encode(payload))
+    return digest.hexdigest()
+
+class ResponseCache:
+    def __init__(self, maxBytes: int, ttl: int = 86400, sharedCollection: Optional[Callable] = None):
+        self.maxBytes = maxBytes
+        self.ttl = ttl
+        self.hits = 0
+        self.sharedHits = 0
+        self.misses = 0
+
+        self._sharedCollection = sharedCollection
+        self._sharedIndexReady = False
+        self._entries: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def Get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expiresAt, _ = entry
+                if expiresAt > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._Evict(key)
+
+        value = self._GetShared(key)
+
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.sharedHits += 1
+            self._PutLocal(key, value, now)
+
+        return value
+
+    def Put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._PutLocal(key, value, time.monotonic())
+        self._PutShared(key, value)
+
+    def Clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _PutLocal(self, key: str, value: str, now: float) -> None:
+        nbytes = len(key) + len(value.encode("utf-8"))
+        if nbytes > self.maxBytes:
+            return
+
+        if key in self._entries:
+            self._Evict(key)
+
+        self._entries[key] = (value, now + self.ttl, nbytes)
+        self._size += nbytes
+
+        while self._size > self.maxBytes:
+            oldest = next(iter(self._entries))
+            self._Evict(oldest)
+
+    def _Evict(self, key: str) -> None:
+        _, _, nbytes = self._entries.pop(key)
+        self._size -= nbytes
+
+    def _GetShared(self, key: str) -> Optional[str]:
+        if self._sharedCollection is None:
+            return None
+
+        try:
+            doc = self._sharedCollection().find_one({
+                "_id": key,
+                # TTL monitor only sweeps once a minute
+                "createdAt": {"$gt": datetime.utcnow() - timedelta(seconds=self.ttl)}
+            })
+        except Exception as err:
+            print(f"AI cache shared tier read failed: {str(err)}")
+            return None
+
+        return doc.get("response") if doc else None
+
+    def _PutShared(self, key: str, value: str) -> None:
+        if self._sharedCollection is None:
+            return
+
+        try:
+            collection = self._sharedCollection()
+
+            if not self._sharedIndexReady:
+                collection.create_index([("createdAt", 1)], expireAfterSeconds=self.ttl, name="createdAt_ttl")
+                self._sharedIndexReady = True
+
+            collection.update_one(
+                {"_id": key},
+                {"$set": {"response": value, "createdAt": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as err:
+            print(f"AI cache shared tier write failed: {str(err)}")
@@ -0,0 +1,119 @@
+import math
+import re
+
+_sectionBreak = re.compile(r"\n(?=#{1,6} )|\n\s*\n")
+_sentenceBreak = re.compile(r"(?<=[.!?。])\s+")
+
+def _Pieces(notes: str , maxChars: int) -> list[str]:
+    """Sections/paragraphs, with anything longer than maxChars cut at sentences."""
+    pieces = []
+    for block in _sectionBreak.split(notes):
+        block = block.strip()
+        if not block:
+            continue
+        if len(block) <= maxChars:
+            pieces.append(block)
+            continue
+
+        current = ""
+        for sentence in _sentenceBreak.split(block):
+            while len(sentence) > maxChars:
+                # No sentence boundary to use (tables, OCR output), cut hard
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(sentence[:maxChars])
+                sentence = sentence[maxChars:]
+            if current and len(current) + 1 + len(sentence) > maxChars:
+                pieces.append(current)
+                current = ""
+            current = f"{current} {sentence}" if current else sentence
+        if current:
+            pieces.append(current)
+    return pieces
+
+def SplitNotes(notes: str , maxChars: int = 8000 , maxChunks: int = 8) -> list[str]:
+    """Packs section and paragraph boundaries into chunks of about maxChars.
+
+    Chunks grow past maxChars when needed so there are never more than
+    maxChunks of them.
+    """
+    if len(notes) <= maxChars:
+        return [notes]
+
+    target = max(maxChars, math.ceil(len(notes) / maxChunks))
+    chunks = []
+    current = ""
+
+    for piece in _Pieces(notes, target):
+        if current and len(current) + 2 + len(piece) > target:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+
+    if current:
+        chunks.append(current)
+
+    # Packing can still overshoot by one, fold the tail into its neighbour
+    while len(chunks) > maxChunks:
+        tail = chunks.pop()
+        chunks[-1] = f"{chunks[-1]}\n\n{tail}"
+
+    return chunks
+
+def ShareCounts(total: int , weights: list[int]) -> list[int]:
+    """Splits total proportionally to weights (largest remainder), at least 1 each."""
+    weightSum = sum(weights) or 1
+    exact = [total * weight / weightSum for weight in weights]
+    shares = [max(1, math.floor(value)) for value in exact]
+
+    remaining = total - sum(shares)
+    order = sorted(range(len(weights)), key=lambda i: exact[i] - math.floor(exact[i]), reverse=True)
+    for i in order[:max(0, remaining)]:
+        shares[i] += 1
+
+    return shares
+
+def ChunkNotes(notes: str , amount , maxChars: int = 8000 , maxChunks: int = 8) -> list[tuple[str, object]]:
+    """Returns (chunk, amount) pairs; short notes come back untouched as one pair."""
+    chunks = SplitNotes(notes, maxChars, maxChunks)
+    if len(chunks) == 1:
+        return [(notes, amount)]
+    return list(zip(chunks, ShareCounts(int(amount), [len(chunk) for chunk in chunks])))
+
+def _Normalize(text: str) -> str:
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in text.lower()).split())
+
+def MergeQuizzes(quizzes: list[dict] , limit: int) -> dict:
+    """Merges parse_quiz results, dropping repeated questions and renumbering."""
+    merged = {}
+    seen = set()
+
+    for quiz in quizzes:
+        for key in sorted(quiz, key=lambda k: int(k) if str(k).isdigit() else 0):
+            question = quiz[key]
+            normalized = _Normalize(question.get("question", ""))
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            merged[str(len(merged) + 1)] = question
+            if len(merged) >= limit:
+                return merged
+
+    return merged
+
+def MergeFlashcards(decks: list[list] , limit: int) -> list:
+    merged = []
+    seen = set()
+
+    for deck in decks:
+        for card in deck:
+            normalized = _Normalize(card["question"])
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            merged.append(card)
+            if len(merged) >= limit:
+                return merged
+
+    return merged
@@ -0,0 +1,188 @@
+from collections import deque
+from typing import Optional
+import math
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Shed requests report this so the views show their usual 503 message
+SHED_RESULT = "API error 503"
+
+def IsProviderFailure(result) -> bool:
+    """Failures that say something about the provider's health.
+
+    4xx other than 429 are the caller's problem (bad key, no credits) and
+    must not trip the breaker for everybody else. A 429 only counts when the
+    key is the server's, see ProviderGuard.Release.
+    """
+    if result is None or result == "Request timeout":
+        return True
+    if isinstance(result, str) and result.startswith("API error "):
+        code = result.removeprefix("API error ")
+        return code == "429" or code.startswith("5")
+    return False
+
+def IsOverload(result) -> bool:
+    return result in (None, "Request timeout", "API error 429", "API error 503")
+
+class CircuitBreaker:
+    """Trips on error rate or slow-call rate over a sliding window of calls.
+
+    Not thread-safe: only used from the AI event loop.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        minCalls: int = 10,
+        errorRate: float = 0.5,
+        slowCall: float = 30.0,
+        slowRate: float = 0.8,
+        cooldown: float = 30.0
+    ):
+        self.minCalls = minCalls
+        self.errorRate = errorRate
+        self.slowCall = slowCall
+        self.slowRate = slowRate
+        self.cooldown = cooldown
+
+        self.state = CLOSED
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window)
+        self._openedAt = 0.0
+        self._probing = False
+
+    def Allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self._openedAt < self.cooldown:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+
+        if self.state == HALF_OPEN:
+            # One probe at a time decides whether the provider is back
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+
+        return True
+
+    def Record(self, failed: bool, latency: float) -> None:
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if failed:
+                self._Open()
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((failed, latency >= self.slowCall))
+
+        if len(self._outcomes) < self.minCalls:
+            return
+
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, isSlow in self._outcomes if isSlow)
+
+        if failures / len(self._outcomes) >= self.errorRate or slow / len(self._outcomes) >= self.slowRate:
+            self._Open()
+
+    def Abandon(self) -> None:
+        """Releases a half-open probe that was cancelled before it finished."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def _Open(self) -> None:
+        self.state = OPEN
+        self.trips += 1
+        self._openedAt = time.monotonic()
+        self._outcomes.clear()
+
+    def Stats(self) -> dict:
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "calls": len(self._outcomes),
+            "failures": failures
+        }
+
+class AdaptiveLimiter:
+    """AIMD concurrency cap: +1 per window of good calls, halved on overload."""
+
+    def __init__(self, initial: float = 16, minimum: float = 1, maximum: float = 256, targetLatency: float = 30.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.targetLatency = targetLatency
+
+        self.limit = float(initial)
+        self.inFlight = 0
+        self.shed = 0
+        self._lastDecrease = 0.0
+
+    def Acquire(self) -> bool:
+        if self.inFlight >= math.floor(self.limit):
+            self.shed += 1
+            return False
+        self.inFlight += 1
+        return True
+
+    def Release(self, overloaded: Optional[bool], latency: Optional[float] = None) -> None:
+        self.inFlight -= 1
+
+        if overloaded is None:
+            return
+
+        if overloaded or (latency is not None and latency > self.targetLatency):
+            # Only back off once per latency window so one burst of 429s
+            # doesn't collapse the limit to the floor
+            now = time.monotonic()
+            if now - self._lastDecrease >= min(self.targetLatency, 5.0):
+                self.limit = max(self.minimum, self.limit / 2)
+                self._lastDecrease = now
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def Stats(self) -> dict:
+        return {
+            "limit": math.floor(self.limit),
+            "inFlight": self.inFlight,
+            "shed": self.shed
+        }
+
+class ProviderGuard:
+    """Breaker plus concurrency cap for one provider/model pair."""
+
+    def __init__(self, breaker: CircuitBreaker, limiter: AdaptiveLimiter):
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def Admit(self) -> bool:
+        if not self.breaker.Allow():
+            return False
+        if not self.limiter.Acquire():
+            self.breaker.Abandon()
+            return False
+        return True
+
+    def Release(self, result, latency: Optional[float], sharedKey: bool = True) -> None:
+        # A 429 is the quota of the key that was sent. A user's own key running
+        # out says nothing about the provider, so it mustn't open the circuit
+        # or halve the limit for everybody else.
+        if latency is None or (result == "API error 429" and not sharedKey):
+            self.breaker.Abandon()
+            self.limiter.Release(None)
+            return
+
+        self.breaker.Record(IsProviderFailure(result), latency)
+        self.limiter.Release(IsOverload(result), latency)
+
+    def Stats(self) -> dict:
+        return {"breaker": self.breaker.Stats(), "limiter": self.limiter.Stats()}
@@ -1,7 +1,8 @@
-from routes.utils import AiReq , IncrementUsage , GetMongoClient , GetQueryFromDB , Log
-from flask import render_template , jsonify , request , current_app
+from routes.utils import AiReq , AsyncAiReq , AiReqStream , FormatSSE , ReserveUsage , GetUserDoc , GetQueryFromDB , Log , StoreDuckAIConversation
+from routes.providers import GetProvider , RequestOptions
+from routes.promptTemplates import FormatPrompt , AppendPrompt
+from flask import render_template , jsonify , request , current_app , Response , stream_with_context
 from flask_login import current_user
-from bson import ObjectId
 import os
 
 standardApiErrors = {
@@ -17,66 +18,41 @@ moreApiErrors = {
     "API error 400": "API error 400 occurred. Bad request format. Check JSON payload and parameters."
 }
 
-def GenerateResponse(prompts: dict):
-    data: dict = request.get_json()
+def PrepareDuckAIRequest(prompts: dict, data: dict):
+    """Returns (early response, None) or (None, AiReq args)."""
     MESSAGE = data["message"]
     API_MODE = data["apiMode"]
-    MODEL = data.get("model" , False)
     IS_FREE = data.get("isFree" , False)
     LANGUAGE = data.get("language" , "en")
 
-    IsReasoning = False
-
     if IS_FREE:
         with current_app.app_context():
             if not current_user.is_authenticated:
                 Log("User not logined in." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
-            userData = GetMongoClient()["EduDuck"]["users"].find_one({"_id": ObjectId(current_user.id)})
+            userData = GetUserDoc()
             if not userData:
                 Log("User account not found." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
             times_used = userData.get("daily_usage", {}).get("timesUsed", 0)
             if times_used >= 3:
                 Log("Daily limit reached." , "error")
-                return render_template("pages/dailyLimit.html", remaining=0)
-
-        IncrementUsage()
+                return render_template("pages/dailyLimit.html", remaining=0) , None
 
-    if MODEL:
-        MODEL = MODEL.strip()
-        IsReasoning = any(x in MODEL.lower() for x in ["gpt-5", "o1"])
+        if not ReserveUsage():
+            Log("Daily limit reached." , "error")
+            return render_template("pages/dailyLimit.html", remaining=0) , None
 
     API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
 
-    if API_MODE == "Hugging Face": 
-        API_URL = "https://router.huggingface.co/v1/chat/completions" 
-    elif API_MODE == "Gemini":
-        API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-    else:
-        API_URL = "https://api.openai.com/v1/chat/completions"
-
-    if API_MODE == "Hugging Face":
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-    elif API_MODE == "OpenAI":
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        }
-    else: 
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": API_KEY
-        }
-    
     PROMPT = prompts['generateResponse']
 
     if PROMPT == None:
-        return jsonify({'response': 'Internal Error: PROMPT NOT FOUND'})
+        return jsonify({'response': 'Internal Error: PROMPT NOT FOUND'}) , None
     else:
-        PROMPT = PROMPT.format(MESSAGE=MESSAGE)
+        PROMPT = FormatPrompt(PROMPT , MESSAGE=MESSAGE)
 
     languages = {
         "en": "English",
@@ -87,42 +63,11 @@ def GenerateResponse(prompts: dict):
         "fr": "French"
     }
     language_name = languages.get(LANGUAGE, "English")
-    PROMPT += f"\n\nPlease respond in {language_name}."
-
-    if API_MODE == "Hugging Face":
-        payload = {
-            "messages": [{"role": "user", "content": PROMPT}],
-            "model": data.get("model") or "openai/gpt-oss-20b"
-        }
-    elif API_MODE == "OpenAI":
-        payload = {
-            "model": MODEL if MODEL else "gpt-4.1-nano",
-            "messages": [{"role": "user", "content": PROMPT}],
-        }
-    elif API_MODE == "Gemini":
-        payload = {
-            "contents": [{
-                "role": "user",
-                "parts": [{"text": PROMPT}]
-            }]
-        }
-
-    if IsReasoning:
-        payload["max_completion_tokens"] = 4096  
-    elif API_MODE == "Gemini": 
-        pass
-    else:
-        payload["max_tokens"] = 4096
-        payload["temperature"] = data.get("temperature", 0.3)
-        payload["top_p"] = data.get("top_p", 0.9)
-
-    if API_MODE != "Gemini" and payload.get("model" , None) is None:
-        payload["model"] = "openai/gpt-oss-20b"
-
-    if payload and API_MODE == "Hugging Face": print(f"Model: {payload["model"]}") 
+    PROMPT = AppendPrompt(PROMPT , f"\n\nPlease respond in {language_name}.")
 
-    output = AiReq(API_URL , headers , payload , API_MODE)
+    return None , GetProvider(API_MODE).BuildRequest(PROMPT , RequestOptions(data , API_KEY))
 
+def FinishDuckAIResponse(output):
     if (output is None):
         return jsonify({"response": "Internal Error."})
 
@@ -139,6 +84,67 @@ def GenerateResponse(prompts: dict):
 
     return jsonify({'response': output})
 
+def GenerateResponse(prompts: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareDuckAIRequest(prompts , data)
+    if early is not None:
+        return early
+
+    return FinishDuckAIResponse(AiReq(*aiRequest))
+
+async def GenerateResponseAsync(prompts: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareDuckAIRequest(prompts , data)
+    if early is not None:
+        return early
+
+    return FinishDuckAIResponse(await AsyncAiReq(*aiRequest))
+
+def GenerateResponseStream(prompts: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareDuckAIRequest(prompts , data)
+    if early is not None:
+        return early
+
+    USER_MESSAGE = data.get("userMessage")
+    QUERY_ID = data.get("queryID")
+
+    def events():
+        chunks = []
+
+        for chunk in AiReqStream(*aiRequest):
+            if chunk is None:
+                yield FormatSSE("error" , {"message": "Internal Error."})
+                return
+
+            if not chunks and (chunk in standardApiErrors or chunk in moreApiErrors):
+                yield FormatSSE("error" , {"message": standardApiErrors.get(chunk) or moreApiErrors[chunk]})
+                return
+
+            chunks.append(chunk)
+            yield FormatSSE("chunk" , {"text": chunk})
+
+        output = "".join(chunks).strip()
+        queryID = None
+
+        if current_user.is_authenticated and USER_MESSAGE and output:
+            queryID = StoreDuckAIConversation(
+                [{"role": "user", "content": USER_MESSAGE}, {"role": "assistant", "content": output}],
+                QUERY_ID
+            )
+
+        Log(f"Streamed DuckAI response. Length: {len(output)}" , "success")
+        yield FormatSSE("done" , {"queryID": queryID})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 def DuckAI():
     if not current_user.is_authenticated:
         return render_template("DuckAI/DuckAI.html" , chat=[] , prefill_topic=request.args.get('topic', '').strip())
@@ -1,11 +1,17 @@
-from routes.utils import AiReq , IncrementUsage , StoreQuery , Log , GetQueryFromDB , StoreTempQuery , GetMongoClient
+from routes.utils import AiReq , AsyncAiReq , AiReqMany , AsyncAiReqMany , CacheIfParsed , GetChunkConfig , ReserveUsage , StoreQuery , Log , GetQueryFromDB , StoreTempQuery , GetUserDoc , FindReusableQuery , RememberQuery
+from routes.providers import GetProvider , ModelParams , RequestOptions
+from routes.promptTemplates import FormatPrompt
+from routes.chunking import ChunkNotes , MergeFlashcards
+from routes.metrics import TimedParser
+from routes.parsers import parse_flashcards
+from routes.structuredOutput import UseStructuredOutput , OutputSchema , DecodeOutput
 from flask_login import current_user
 from requests import post
 from flask import render_template , jsonify , request , send_file , url_for , current_app
 from json import load , JSONDecodeError , dumps
 from uuid import uuid4
+from typing import Optional
 from io import BytesIO
-from bson import ObjectId
 import os
 
 standardApiErrors = {
@@ -21,139 +27,158 @@ moreApiErrors = {
     "API error 400": "What does API error 400 mean? | Bad request ~"
 }
 
-def ParseFlashcards(fc: str) -> dict:
-    if not fc: return []
-    output = []
-    
-    for flashcard in fc.split("~"):
-        try:
-            question, answer = flashcard.split("|", 1) 
-            question, answer = question.strip(), answer.strip()
-            if question and answer:  
-                output.append({'question': question, 'answer': answer})
-        except ValueError:
-            continue  
-    
-    return output
+@TimedParser("flashcards")
+def ParseFlashcards(fc: str) -> list:
+    flashcards = DecodeOutput("flashcards" , fc)
+    return parse_flashcards(fc) if flashcards is None else flashcards
 
-def FlashcardGenerator(prompts: dict , flashcardDict: dict):
-    data: dict = request.get_json()
+def FlashcardParams(data: dict) -> dict:
+    """Settings a stored deck has to match before it's reused for other notes."""
+    return {"language": data["language"], "amount": str(data["amount"]), **ModelParams(data)}
+
+def ReuseFlashcards(data: dict , flashcardDict: dict):
+    reused = FindReusableQuery("flashcards" , data["notes"] , FlashcardParams(data))
+    if reused is None:
+        return None
+
+    flashcards , similarity = reused
+    return jsonify({**StoreFlashcards(flashcards , flashcardDict).get_json(), "reused": True, "similarity": round(similarity , 2)})
+
+def PrepareFlashcardRequest(prompts: dict , data: dict , flashcardDict: dict):
+    """Returns (early response, None) or (None, list of AiReq args, one per notes chunk).
+
+    A deck already made from near-identical notes is the early response,
+    unless the client sent forceNew.
+    """
     IS_FREE = data.get("isFree" , False)
     NOTES = data["notes"]
     LANGUAGE = data["language"]
     API_MODE = data["apiMode"]
     AMOUNT = data["amount"]
-    MODEL = data.get("model" , False)
-
-    IsReasoning = False
 
     if IS_FREE:
         with current_app.app_context():
             if not current_user.is_authenticated:
                 Log("User not logined in." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
-            userData = GetMongoClient()["EduDuck"]["users"].find_one({"_id": ObjectId(current_user.id)})
+            userData = GetUserDoc()
             if not userData:
                 Log("User account not found." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
             times_used = userData.get("daily_usage", {}).get("timesUsed", 0)
             if times_used >= 3:
                 Log("Daily limit reached." , "error")
-                return render_template("pages/dailyLimit.html", remaining=0)
+                return render_template("pages/dailyLimit.html", remaining=0) , None
 
-        IncrementUsage()
+    if not data.get("forceNew" , False):
+        reused = ReuseFlashcards(data , flashcardDict)
+        if reused is not None:
+            return reused , None
 
-    if MODEL:
-        MODEL = MODEL.strip()
-        IsReasoning = any(x in MODEL.lower() for x in ["gpt-5", "o1"])
+    if IS_FREE and not ReserveUsage():
+        Log("Daily limit reached." , "error")
+        return render_template("pages/dailyLimit.html", remaining=0) , None
 
     API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
 
-    if API_MODE == "Hugging Face": 
-        API_URL = "https://router.huggingface.co/v1/chat/completions" 
-    elif API_MODE == "Gemini":
-        API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-    else:
-        API_URL = "https://api.openai.com/v1/chat/completions"
-
-    if API_MODE == "Hugging Face":
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-    elif API_MODE == "OpenAI":
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        }
-    else: 
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": API_KEY
-        }
-    
-    PROMPT = prompts['flashcard']
+    provider = GetProvider(API_MODE)
+    structured = UseStructuredOutput(provider , prompts , 'flashcard')
+
+    PROMPT = prompts['flashcardJson' if structured else 'flashcard']
 
     if PROMPT == None:
-        return jsonify({'flashcards': 'Internal Error: PROMPT NOT FOUND'})
-    else:
-        PROMPT = PROMPT.format(NOTES=NOTES , LANGUAGE=LANGUAGE , AMOUNT=AMOUNT)
-
-    if API_MODE == "Hugging Face":
-        payload = {
-            "messages": [{"role": "user", "content": PROMPT}],
-            "model": data.get("model") or "openai/gpt-oss-20b"
-        }
-    elif API_MODE == "OpenAI":
-        payload = {
-            "model": MODEL if MODEL else "gpt-4.1-nano",
-            "messages": [{"role": "user", "content": PROMPT}],
-        }
-    elif API_MODE == "Gemini":
-        payload = {
-            "contents": [{
-                "role": "user",
-                "parts": [{"text": PROMPT}]
-            }]
-        }
-
-    if IsReasoning:
-        payload["max_completion_tokens"] = 4096
-    elif API_MODE == "Gemini":
-        pass  
-    else:
-        payload["max_tokens"] = 4096
-        payload["temperature"] = data.get("temperature", 0.3)
-        payload["top_p"] = data.get("top_p", 0.9)
+        return jsonify({'flashcards': 'Internal Error: PROMPT NOT FOUND'}) , None
+
+    options = RequestOptions(data , API_KEY)
+    config = GetChunkConfig()
 
-    if payload and API_MODE == "Hugging Face": print(f"Model: {payload["model"]}") 
+    return None , [
+        provider.BuildRequest(
+            FormatPrompt(PROMPT , NOTES=chunk , LANGUAGE=LANGUAGE , AMOUNT=amount),
+            {**options, "schema": OutputSchema("flashcards" , int(amount))} if structured else options
+        )
+        for chunk , amount in ChunkNotes(NOTES , AMOUNT , config["maxChars"] , config["maxChunks"])
+    ]
 
-    output = AiReq(API_URL , headers , payload , API_MODE)
+def StoreFlashcards(flashcards: list , flashcardDict: dict , data: Optional[dict] = None):
+    """data is the request the deck was generated for, its notes get fingerprinted for reuse."""
+    queryRes = None
 
+    if len(flashcards) == 0:
+        Log("Failed to parse flashcards. (empty)" , "error")
+    else:
+        if current_user.is_authenticated:
+            queryRes = StoreQuery("flashcards" , flashcards)
+            if data is not None:
+                RememberQuery("flashcards" , queryRes , data["notes"] , FlashcardParams(data))
+        else:
+            queryRes = StoreTempQuery(flashcards , flashcardDict)
+
+    return jsonify({'id': queryRes})
+
+def FinishFlashcards(output , flashcardDict: dict , data: Optional[dict] = None):
     if (output is None):
         return jsonify({"flashcards": "Internal Error."})
 
     Log("Got AI response, checking if success..." , "info")
 
     if output in standardApiErrors:
-        output = standardApiErrors[output]
+        output , data = standardApiErrors[output] , None
     elif output in moreApiErrors:
-        output = moreApiErrors[output]
+        output , data = moreApiErrors[output] , None
     else:
         Log("Generated flashcards. Parsing..." , "success")
 
-    Log("Got AI response, checking if success..." , "info")
+    return StoreFlashcards(ParseFlashcards(output) , flashcardDict , data)
 
-    flashcards = ParseFlashcards(output)
+def FinishFlashcardChunks(outputs: list , flashcardDict: dict , amount: int , data: Optional[dict] = None):
+    decks = [
+        ParseFlashcards(output) for output in outputs
+        if output and output not in standardApiErrors and output not in moreApiErrors
+    ]
+    flashcards = MergeFlashcards(decks , amount)
 
-    if len(flashcards) == 0:
-        Log("Failed to parse flashcards. (empty)" , "error")
-    else:
-        if current_user.is_authenticated:
-            queryRes = StoreQuery("flashcards" , flashcards)
-        else:
-            queryRes = StoreTempQuery(flashcards , flashcardDict)
+    if not flashcards:
+        return FinishFlashcards(next((output for output in outputs if output is not None) , None) , flashcardDict)
 
-    return jsonify({'id': queryRes})
+    Log(f"Merged {len(flashcards)} flashcards from {len(decks)}/{len(outputs)} chunks." , "success")
+
+    return StoreFlashcards(flashcards , flashcardDict , data)
+
+def FlashcardGenerator(prompts: dict , flashcardDict: dict):
+    data: dict = request.get_json()
+
+    early , aiRequests = PrepareFlashcardRequest(prompts , data , flashcardDict)
+    if early is not None:
+        return early
+
+    # Untimed parse, the one in FinishFlashcards is the one measured
+    cache = CacheIfParsed(ParseFlashcards.__wrapped__) if not data.get("forceNew" , False) else False
+
+    if len(aiRequests) > 1:
+        return FinishFlashcardChunks(AiReqMany(aiRequests , cache=cache) , flashcardDict , int(data["amount"]) , data)
+
+    output = AiReq(*aiRequests[0] , cache=cache)
+
+    return FinishFlashcards(output , flashcardDict , data)
+
+async def FlashcardGeneratorAsync(prompts: dict , flashcardDict: dict):
+    data: dict = request.get_json()
+
+    early , aiRequests = PrepareFlashcardRequest(prompts , data , flashcardDict)
+    if early is not None:
+        return early
+
+    cache = CacheIfParsed(ParseFlashcards.__wrapped__) if not data.get("forceNew" , False) else False
+
+    if len(aiRequests) > 1:
+        return FinishFlashcardChunks(await AsyncAiReqMany(aiRequests , cache=cache) , flashcardDict , int(data["amount"]) , data)
+
+    output = await AsyncAiReq(*aiRequests[0] , cache=cache)
+
+    return FinishFlashcards(output , flashcardDict , data)
 
 def FlashCardGenerator():
     return render_template("Flashcard Generator/flashCardGenerator.html" , prefill_topic=request.args.get('topic', '').strip())
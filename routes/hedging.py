@@ -0,0 +1,122 @@
+from collections import deque
+from typing import Awaitable , Callable , Optional , Any
+import asyncio
+import math
+import threading
+import time
+
+# Results worth racing a second provider for. Auth and bad-request errors
+# would fail the same way on the fallback, so they are returned as-is.
+RETRYABLE_RESULTS = {
+    "API error 429",
+    "API error 500",
+    "API error 502",
+    "API error 503",
+    "API error 504",
+    "Request timeout"
+}
+
+def IsRetryable(result) -> bool:
+    return result is None or result in RETRYABLE_RESULTS
+
+class LatencyTracker:
+    """Sliding window of successful request latencies for one provider/model."""
+
+    def __init__(self, window: int = 256, minSamples: int = 20):
+        self.minSamples = minSamples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def Record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def Percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.minSamples:
+                return None
+            samples = sorted(self._samples)
+
+        index = max(0, math.ceil(p / 100 * len(samples)) - 1)
+        return samples[index]
+
+_trackers: dict[tuple, LatencyTracker] = {}
+_trackersLock = threading.Lock()
+
+def GetLatencyTracker(mode: str , model: Optional[str]) -> LatencyTracker:
+    with _trackersLock:
+        tracker = _trackers.get((mode, model))
+        if tracker is None:
+            tracker = _trackers[(mode, model)] = LatencyTracker()
+        return tracker
+
+class Deadline:
+    """End-to-end latency budget for one user request."""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self._expiresAt = time.monotonic() + budget
+
+    def Remaining(self) -> float:
+        return max(0.0, self._expiresAt - time.monotonic())
+
+    def Expired(self) -> bool:
+        return self.Remaining() <= 0
+
+async def Hedge(
+    primary: Callable[[], Awaitable[Any]],
+    fallback: Optional[Callable[[], Awaitable[Any]]],
+    hedgeAfter: float,
+    deadline: Deadline
+) -> tuple[Any, Optional[str]]:
+    """Races primary against fallback within the deadline.
+
+    The fallback starts once hedgeAfter seconds pass without an answer, or
+    straight away if the primary fails with a retryable result. The first
+    usable result wins and the other request is cancelled. Returns
+    (result, winner) where winner is "primary", "fallback" or None.
+    """
+    start = time.monotonic()
+    primaryTask = asyncio.ensure_future(primary())
+    fallbackTask = None
+    pending = {primaryTask}
+    lastResult = None
+
+    try:
+        while pending:
+            remaining = deadline.Remaining()
+            if remaining <= 0:
+                return "Request timeout" , None
+
+            wait = remaining
+            if fallback is not None and fallbackTask is None:
+                wait = min(wait, max(0.0, hedgeAfter - (time.monotonic() - start)))
+
+            done , pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                try:
+                    result = task.result()
+                except Exception as err:
+                    print(f"Hedged request failed: {str(err)}")
+                    result = None
+
+                if not IsRetryable(result):
+                    return result , "primary" if task is primaryTask else "fallback"
+
+                # Prefer the primary's error so the user sees their own provider's message
+                if task is primaryTask or lastResult is None:
+                    lastResult = result
+
+            if fallback is not None and fallbackTask is None and (primaryTask.done() or time.monotonic() - start >= hedgeAfter):
+                fallbackTask = asyncio.ensure_future(fallback())
+                pending.add(fallbackTask)
+
+        return lastResult , None
+    finally:
+        for task in (primaryTask, fallbackTask):
+            if task is not None and not task.done():
+                task.cancel()
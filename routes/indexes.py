@@ -0,0 +1,203 @@
+"""Indexes the app's queries rely on, and a check that they're used.
+
+INDEXES declares the indexes per collection. `flask indexes`, run on
+deploy, creates the missing ones with EnsureIndexes, and `--rebuild` also
+replaces ones whose options changed. VerifyIndexes explains the hot queries
+(GetQueryFromDB, UserProfile, GetStudyStreakData, GetNextAction and the
+user lookups) and reports any that would fall back to a collection scan.
+
+Collections that manage their own indexes (jobs, note-fingerprints, the AI
+cache) aren't listed, and indexes not declared here are left alone.
+"""
+from datetime import datetime , timedelta
+from typing import Optional
+from pymongo import ASCENDING , DESCENDING
+from routes.utils import GetMongoClient , Log , QueryLookup , ProfileFilter , StreakPipeline , NextActionFilter , UserLookup
+
+# Soft-deleted documents are removed 30 days after deletedAt
+DELETED_TTL = 2592000
+SOFT_DELETED = {"deletedAt": {"$exists": True}}
+
+# Stored queries: looked up by queryID for one user, listed newest first per user
+CONTENT_COLLECTIONS = ["quizzes", "study-plans", "flashcards", "enhanced-notes", "note-analysis", "quiz-submissions"]
+
+def _Index(keys: list , **options) -> dict:
+    name = "_".join(f"{field}_{direction}" for field , direction in keys)
+    return {"keys": keys, "name": options.pop("name" , name), "options": options}
+
+def SoftDeleteUpdate(now: datetime) -> dict:
+    """The update delete_account marks a user and their content with, the one the TTL indexes expire."""
+    return {"$set": {"deletedAt": now}}
+
+def _DeletedTTL() -> dict:
+    return _Index(
+        [("deletedAt", ASCENDING)],
+        expireAfterSeconds=DELETED_TTL,
+        partialFilterExpression=SOFT_DELETED
+    )
+
+INDEXES = {
+    **{
+        collection: [
+            _Index([("queryID", ASCENDING), ("userID", ASCENDING)]),
+            _Index([("userID", ASCENDING), ("createdAt", DESCENDING)]),
+            _DeletedTTL()
+        ]
+        for collection in CONTENT_COLLECTIONS
+    },
+    "duck-ai": [
+        _Index([("queryID", ASCENDING), ("userID", ASCENDING)]),
+        _Index([("userID", ASCENDING), ("createdAt", DESCENDING)]),
+        _Index([("userID", ASCENDING), ("lastEditedAt", DESCENDING)]),
+        _DeletedTTL()
+    ],
+    # Logins, registration, password resets and OAuth linking look users up by
+    # these exact keys. Not unique: OAuth sign-ups may share a display name.
+    "users": [
+        _Index([("usernameKey", ASCENDING)]),
+        _Index([("emailKey", ASCENDING)]),
+        *[_Index([(provider, ASCENDING)], sparse=True) for provider in ("googleId", "githubId", "discordId", "microsoftId")],
+        _DeletedTTL()
+    ]
+}
+
+# Options that make two indexes on the same keys different
+_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+def _Matches(existing: dict , index: dict) -> bool:
+    if [(field , direction) for field , direction in existing["key"]] != index["keys"]:
+        return False
+    return all(existing.get(option) == index["options"].get(option) for option in _OPTIONS)
+
+def EnsureIndexes(rebuild: bool = False , dryRun: bool = False) -> list[dict]:
+    """Creates the declared indexes that are missing. With rebuild, one that
+    exists with other options (under its name or on the same keys) is dropped
+    and created again; without, it's reported as a conflict. Safe to run any
+    number of times, returns one {"collection", "index", "action"} per index."""
+    db = GetMongoClient()["EduDuck"]
+    report = []
+
+    for collection , indexes in INDEXES.items():
+        try:
+            existing = db[collection].index_information()
+        except Exception as e:
+            Log(f"Failed to read indexes of {collection}: {str(e)}" , "warn")
+            report.extend({"collection": collection, "index": index["name"], "action": "error"} for index in indexes)
+            continue
+
+        for index in indexes:
+            same = [name for name , info in existing.items() if _Matches(info , index)]
+            clashing = [
+                name for name , info in existing.items()
+                if name not in same and (name == index["name"] or [tuple(key) for key in info["key"]] == index["keys"])
+            ]
+
+            if same:
+                action = "ok"
+            elif clashing and not rebuild:
+                action = "conflict"
+            else:
+                action = "rebuilt" if clashing else "created"
+
+                if not dryRun:
+                    try:
+                        for name in clashing:
+                            db[collection].drop_index(name)
+                        db[collection].create_index(index["keys"] , name=index["name"] , **index["options"])
+                    except Exception as e:
+                        Log(f"Failed to create index {index['name']} on {collection}: {str(e)}" , "warn")
+                        action = "error"
+
+            if action in ("created" , "rebuilt"):
+                Log(f"Index {index['name']} {action} on {collection}" , "info")
+            elif action == "conflict":
+                Log(f"Index {index['name']} on {collection} clashes with {', '.join(clashing)}, run `flask indexes --rebuild`" , "warn")
+
+            report.append({"collection": collection, "index": index["name"], "action": action})
+
+    return report
+
+#
+# Query plan checks
+#
+
+# Stand-ins for the values the real queries get, the plan doesn't depend on them
+_SAMPLE_USER = "000000000000000000000000"
+_SAMPLE_QUERY = "00000000-0000-0000-0000-000000000000"
+
+def _Find(filter: dict , sort: Optional[list] = None , limit: int = 0):
+    def Explain(collection) -> dict:
+        cursor = collection.find(filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor.explain()
+    return Explain
+
+def _Aggregate(pipeline: list):
+    def Explain(collection) -> dict:
+        return collection.database.command("aggregate" , collection.name , pipeline=pipeline , explain=True)
+    return Explain
+
+def HotQueries() -> list[tuple]:
+    """(caller, collection, explain) for every query shape of the profile and quiz pages."""
+    end = datetime.now()
+    start = end - timedelta(days=365)
+    queries = []
+
+    for collection in ["quizzes", "study-plans", "flashcards", "enhanced-notes", "note-analysis", "duck-ai"]:
+        sortField = "lastEditedAt" if collection == "duck-ai" else "createdAt"
+        queries += [
+            ("GetQueryFromDB", collection, _Find(QueryLookup(_SAMPLE_QUERY , _SAMPLE_USER))),
+            ("UserProfile", collection, _Find(ProfileFilter(_SAMPLE_USER) , [(sortField, DESCENDING)])),
+            ("GetStudyStreakData", collection, _Aggregate(StreakPipeline(_SAMPLE_USER , start , end))),
+            ("GetNextAction", collection, _Find(NextActionFilter(_SAMPLE_USER) , [("createdAt", DESCENDING)] , 50))
+        ]
+
+    queries.append(("GetStudyStreakData", "duck-ai", _Aggregate(StreakPipeline(_SAMPLE_USER , start , end , field="lastEditedAt"))))
+    queries.append(("QuizResult", "quiz-submissions", _Find(QueryLookup(_SAMPLE_QUERY , _SAMPLE_USER))))
+    queries.append(("LoadUserByUsername", "users", _Find(UserLookup("usernameKey" , "duck"))))
+    queries.append(("LoadUserByMail", "users", _Find(UserLookup("emailKey" , "duck@eduduck.app"))))
+
+    return queries
+
+def PlanStages(explain) -> set:
+    """Stage names in the winning plans of an explain result (find or aggregate, classic or SBE)."""
+    stages = set()
+
+    def Collect(node , inWinningPlan: bool):
+        if isinstance(node , list):
+            for item in node:
+                Collect(item , inWinningPlan)
+        elif isinstance(node , dict):
+            if inWinningPlan and isinstance(node.get("stage") , str):
+                stages.add(node["stage"])
+            for key , value in node.items():
+                if key != "rejectedPlans":
+                    Collect(value , inWinningPlan or key == "winningPlan")
+
+    Collect(explain , False)
+    return stages
+
+def VerifyIndexes() -> list[dict]:
+    """Explains every hot query, returns {"query", "collection", "stages", "ok"} for each.
+    A query is fine when its plan scans an index, or reads nothing from a collection that doesn't exist yet."""
+    db = GetMongoClient()["EduDuck"]
+    report = []
+
+    for caller , collection , explain in HotQueries():
+        try:
+            stages = PlanStages(explain(db[collection]))
+        except Exception as e:
+            Log(f"Failed to explain {caller} on {collection}: {str(e)}" , "warn")
+            report.append({"query": caller, "collection": collection, "stages": [], "ok": False})
+            continue
+
+        ok = "COLLSCAN" not in stages and ("IXSCAN" in stages or stages == {"EOF"})
+        if not ok:
+            Log(f"{caller} on {collection} doesn't use an index: {', '.join(sorted(stages))}" , "warn")
+
+        report.append({"query": caller, "collection": collection, "stages": sorted(stages), "ok": ok})
+
+    return report
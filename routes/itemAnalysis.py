@@ -0,0 +1,135 @@
+"""Persisted quiz submissions and per-question item analysis.
+
+Every submission by a logged in user is stored in quiz-submissions and
+folded into a rollup in quiz-stats with a single $inc, so stats never
+rescan submissions. Rollups are keyed by a fingerprint of the quiz
+content rather than its queryID: a quiz shared by export/import gets a new
+ID for every student, but the same questions land in the same rollup, and
+an edited quiz starts a fresh one instead of mixing versions.
+
+The rollup keeps sums, not attempts:
+    attempts, scoreSum, scoreSquares                   over all attempts
+    questions.<n>.right, .rightScoreSum, .options.<x>  per question
+which is enough for difficulty, option selection rates and the corrected
+point-biserial (item vs. rest of the test) discrimination.
+"""
+from datetime import datetime
+from hashlib import sha256
+from json import dumps
+from typing import Optional
+from uuid import uuid4
+import math
+from flask_login import current_user
+from routes.utils import GetMongoClient , Log
+
+LETTERS = ("a" , "b" , "c" , "d")
+# Distractors picked by fewer attempts than this aren't pulling anyone
+WEAK_DISTRACTOR = 0.05
+
+def QuizKey(quiz: dict) -> str:
+    """Fingerprint of the questions, answers and correct letters."""
+    content = {
+        number: [question.get("question"), question.get("answers"), question.get("correct")]
+        for number , question in quiz.items() if isinstance(question , dict)
+    }
+    return sha256(dumps(content , sort_keys=True , ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def Choice(answer) -> str:
+    answer = answer.strip().lower() if isinstance(answer , str) else ""
+    return answer if answer in LETTERS else "blank"
+
+def RollupUpdate(result: dict) -> dict:
+    """$inc for one graded submission (submit_result's output)."""
+    score = result["score"]
+    inc = {"attempts": 1, "scoreSum": score, "scoreSquares": score * score}
+
+    for number , graded in result["results"].items():
+        inc[f"questions.{number}.options.{Choice(graded['user'])}"] = 1
+        if graded["right"]:
+            inc[f"questions.{number}.right"] = 1
+            inc[f"questions.{number}.rightScoreSum"] = score
+
+    return inc
+
+def RecordSubmission(quiz: dict , result: dict) -> Optional[str]:
+    """Stores the graded submission and updates its quiz's rollup, returns the result ID (None for guests)."""
+    if not current_user.is_authenticated:
+        return None
+
+    db = GetMongoClient()["EduDuck"]
+    quizKey = QuizKey(quiz)
+    resultID = str(uuid4())
+    now = datetime.utcnow()
+
+    db["quiz-submissions"].insert_one({
+        "userID": current_user.id,
+        "queryID": resultID,
+        "quizKey": quizKey,
+        "query": result,
+        "createdAt": now
+    })
+    db["quiz-stats"].update_one(
+        {"_id": quizKey},
+        {
+            "$inc": RollupUpdate(result),
+            "$set": {"total": result["total"], "updatedAt": now},
+            "$setOnInsert": {"createdAt": now}
+        },
+        upsert=True
+    )
+
+    Log(f"Recorded quiz submission. ID: {resultID} , quiz: {quizKey[:12]}" , "info")
+
+    return resultID
+
+def Discrimination(attempts: int , right: int , rightScoreSum: int , scoreSum: int , scoreSquares: int) -> Optional[float]:
+    """Point-biserial correlation of the item with the rest score (total minus the item).
+    None while it's undefined: everyone or no one got it right, or the rest scores don't vary."""
+    if not 0 < right < attempts:
+        return None
+
+    # rest = score - item, so its sums follow from the score sums: sum(item) = right,
+    # sum(score * item) = rightScoreSum and item * item = item
+    restSum = scoreSum - right
+    restSquares = scoreSquares - 2 * rightScoreSum + right
+    restRightSum = rightScoreSum - right
+
+    p = right / attempts
+    restMean = restSum / attempts
+    restVariance = restSquares / attempts - restMean * restMean
+    if restVariance <= 1e-12:
+        return None
+
+    covariance = restRightSum / attempts - p * restMean
+    return covariance / math.sqrt(p * (1 - p) * restVariance)
+
+def ItemStats(rollup: Optional[dict] , quiz: dict) -> dict:
+    """Difficulty, discrimination and option rates per question of quiz from its rollup."""
+    rollup = rollup or {}
+    attempts = rollup.get("attempts" , 0)
+    questions = {}
+
+    for number , question in quiz.items():
+        counts = rollup.get("questions" , {}).get(number , {})
+        options = counts.get("options" , {})
+        right = counts.get("right" , 0)
+        correct = question.get("correct") if isinstance(question , dict) else None
+        rates = {choice: options.get(choice , 0) / attempts if attempts else 0.0 for choice in (*LETTERS , "blank")}
+        discrimination = Discrimination(attempts , right , counts.get("rightScoreSum" , 0) , rollup.get("scoreSum" , 0) , rollup.get("scoreSquares" , 0))
+
+        questions[number] = {
+            "difficulty": right / attempts if attempts else None,
+            "discrimination": round(discrimination , 4) if discrimination is not None else None,
+            "options": rates,
+            "weakDistractors": [choice for choice in LETTERS if choice != correct and attempts and rates[choice] < WEAK_DISTRACTOR]
+        }
+
+    return {
+        "attempts": attempts,
+        "meanScore": rollup.get("scoreSum" , 0) / attempts if attempts else None,
+        "questions": questions
+    }
+
+def QuizStats(quiz: dict) -> dict:
+    rollup = GetMongoClient()["EduDuck"]["quiz-stats"].find_one({"_id": QuizKey(quiz)})
+    return ItemStats(rollup , quiz)
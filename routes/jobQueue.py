@@ -0,0 +1,322 @@
+from flask import request , jsonify , g
+from flask_login import current_user , login_user
+from pymongo import ReturnDocument
+from routes.utils import GetMongoClient , LoadUser , User , Log
+from datetime import datetime , timedelta
+from typing import Optional
+from uuid import uuid4
+import json
+import os
+import sqlite3
+import threading
+import time
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class MongoJobStore:
+    """Jobs in the EduDuck.jobs collection, shared by every worker process."""
+
+    def __init__(self, ttl: int = 86400):
+        self.ttl = ttl
+
+    @property
+    def collection(self):
+        return GetMongoClient()["EduDuck"]["jobs"]
+
+    def EnsureIndexes(self) -> None:
+        self.collection.create_index([("state", 1), ("createdAt", 1)], name="state_1_createdAt_1")
+        self.collection.create_index([("createdAt", 1)], expireAfterSeconds=self.ttl, name="createdAt_ttl")
+
+    def Enqueue(self , job: dict) -> None:
+        now = datetime.utcnow()
+        self.collection.insert_one({**job, "state": QUEUED, "attempts": 0, "createdAt": now, "updatedAt": now})
+
+    def Claim(self , lease: float) -> Optional[dict]:
+        # Running jobs whose lease ran out belong to a worker that died
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"$or": [{"state": QUEUED}, {"state": RUNNING, "leaseUntil": {"$lt": now}}]},
+            {"$set": {"state": RUNNING, "leaseUntil": now + timedelta(seconds=lease), "updatedAt": now}, "$inc": {"attempts": 1}},
+            sort=[("createdAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def Finish(self , jobID: str , state: str , result=None , statusCode: Optional[int] = None , error: Optional[str] = None) -> None:
+        # The payload carries the user's API key, drop it as soon as we're done
+        self.collection.update_one(
+            {"_id": jobID},
+            {
+                "$set": {"state": state, "result": result, "statusCode": statusCode, "error": error, "updatedAt": datetime.utcnow()},
+                "$unset": {"payload": "", "headers": ""}
+            }
+        )
+
+    def Get(self , jobID: str) -> Optional[dict]:
+        return self.collection.find_one({"_id": jobID}, {"payload": 0, "headers": 0})
+
+class SqliteJobStore:
+    """Single-host stand-in for MongoJobStore, for development and one-box deploys."""
+
+    def __init__(self , path: str = "jobs.sqlite3" , ttl: int = 86400):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+        return connection
+
+    def EnsureIndexes(self) -> None:
+        self.connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT,
+                headers TEXT,
+                userID TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leaseUntil REAL,
+                result TEXT,
+                statusCode INTEGER,
+                error TEXT,
+                createdAt REAL NOT NULL,
+                updatedAt REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state_createdAt ON jobs (state, createdAt);
+        """)
+
+    def _Job(self , row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["_id"] = job.pop("id")
+        for field in ("payload", "headers", "result"):
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def Enqueue(self , job: dict) -> None:
+        now = time.time()
+        self.connection.execute(
+            "DELETE FROM jobs WHERE createdAt < ?", (now - self.ttl,)
+        )
+        self.connection.execute(
+            "INSERT INTO jobs (id, kind, payload, headers, userID, state, createdAt, updatedAt) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job["_id"], job["kind"], json.dumps(job["payload"]), json.dumps(job.get("headers") or {}), job.get("userID"), QUEUED, now, now)
+        )
+
+    def Claim(self , lease: float) -> Optional[dict]:
+        connection = self.connection
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so two workers can't pick the same row
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE state = ? OR (state = ? AND leaseUntil < ?) ORDER BY createdAt LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, leaseUntil = ?, updatedAt = ? WHERE id = ?",
+                (RUNNING, now + lease, now, row["id"])
+            )
+            job = connection.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        return self._Job(job)
+
+    def Finish(self , jobID: str , state: str , result=None , statusCode: Optional[int] = None , error: Optional[str] = None) -> None:
+        self.connection.execute(
+            "UPDATE jobs SET state = ?, result = ?, statusCode = ?, error = ?, payload = NULL, headers = NULL, updatedAt = ? WHERE id = ?",
+            (state, json.dumps(result) if result is not None else None, statusCode, error, time.time(), jobID)
+        )
+
+    def Get(self , jobID: str) -> Optional[dict]:
+        return self._Job(self.connection.execute("SELECT * FROM jobs WHERE id = ?", (jobID,)).fetchone())
+
+class JobWorkers:
+    """Threads that claim jobs and run the regular generator views for them.
+
+    handlers maps a job kind to (path, view): the view runs inside a request
+    context rebuilt from the stored JSON body, as the job's user.
+    """
+
+    def __init__(self , app , store , handlers: dict , threads: int = 4 , lease: float = 300 , maxAttempts: int = 3 , pollInterval: float = 1.0):
+        self.app = app
+        self.store = store
+        self.handlers = handlers
+        self.threads = threads
+        self.lease = lease
+        self.maxAttempts = maxAttempts
+        self.pollInterval = pollInterval
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+
+    def Start(self) -> None:
+        # Threads don't survive a fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        for i in range(self.threads):
+            threading.Thread(target=self._Run, name=f"job-worker-{i}", daemon=True).start()
+
+    def Stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def Wake(self) -> None:
+        self._wake.set()
+
+    def _Run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.store.Claim(self.lease)
+            except Exception as err:
+                Log(f"Failed to claim job: {str(err)}", "error")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.pollInterval)
+                self._wake.clear()
+                continue
+
+            self.RunJob(job)
+
+    def RunJob(self , job: dict) -> None:
+        jobID = job["_id"]
+
+        if job["attempts"] > self.maxAttempts:
+            self.store.Finish(jobID, FAILED, error="Job was abandoned by its workers too many times.")
+            return
+        if job["kind"] not in self.handlers:
+            self.store.Finish(jobID, FAILED, error=f"Unknown job kind: {job['kind']}")
+            return
+
+        path , view = self.handlers[job["kind"]]
+        start = time.perf_counter()
+
+        try:
+            with self.app.test_request_context(path, method="POST", json=job["payload"], headers=job.get("headers") or {}):
+                # Lets ReserveUsage charge a re-claimed job only once
+                g.jobID = jobID
+                if job.get("userID"):
+                    userDoc = LoadUser(userID=job["userID"])
+                    if userDoc:
+                        login_user(User(userDoc))
+                response = self.app.make_response(view())
+
+            result = response.get_json(silent=True) if response.is_json else {"html": response.get_data(as_text=True)}
+            self.store.Finish(jobID, DONE, result=result, statusCode=response.status_code)
+            Log(f"Job {jobID} ({job['kind']}) done in {time.perf_counter() - start:.4f}s", "success")
+        except Exception as err:
+            Log(f"Job {jobID} ({job['kind']}) failed: {str(err)}", "error")
+            self.store.Finish(jobID, FAILED, error="Internal Error.")
+
+_jobWorkers = None
+
+def InitJobQueue(app , handlers: dict) -> Optional[JobWorkers]:
+    """Sets up the job store and workers when AI_JOBS=1, otherwise job mode
+    stays off. The worker threads aren't started here: a CLI process importing
+    the app would claim queued jobs and strand them when it exits. Servers
+    call StartJobWorkers, and the first job enqueued in a process starts them too."""
+    global _jobWorkers
+    if os.getenv("AI_JOBS") != "1":
+        return None
+
+    ttl = int(os.getenv("AI_JOB_TTL", 86400))
+    if os.getenv("AI_JOBS_STORE", "mongo") == "sqlite":
+        store = SqliteJobStore(os.getenv("AI_JOBS_SQLITE", "jobs.sqlite3"), ttl=ttl)
+    else:
+        store = MongoJobStore(ttl=ttl)
+
+    try:
+        store.EnsureIndexes()
+    except Exception as err:
+        Log(f"Failed to set up job store: {str(err)}", "warn")
+
+    _jobWorkers = JobWorkers(
+        app,
+        store,
+        handlers,
+        threads=int(os.getenv("AI_JOB_WORKERS", 4)),
+        lease=float(os.getenv("AI_JOB_LEASE", 300))
+    )
+    return _jobWorkers
+
+def StartJobWorkers() -> None:
+    """Starts this process's job workers, if job mode is on."""
+    if _jobWorkers is not None:
+        _jobWorkers.Start()
+
+def GetJobWorkers() -> Optional[JobWorkers]:
+    return _jobWorkers
+
+def JobRequested() -> bool:
+    """The client asked for a job ID instead of waiting on the provider."""
+    if _jobWorkers is None:
+        return False
+    if "respond-async" in request.headers.get("Prefer", ""):
+        return True
+    return bool((request.get_json(silent=True) or {}).get("job"))
+
+def EnqueueJob(kind: str):
+    workers = _jobWorkers
+    workers.Start()
+
+    jobID = str(uuid4())
+    headers = {}
+    if request.cookies.get("lang"):
+        headers["Cookie"] = f"lang={request.cookies['lang']}"
+    if request.headers.get("Accept-Language"):
+        headers["Accept-Language"] = request.headers["Accept-Language"]
+
+    workers.store.Enqueue({
+        "_id": jobID,
+        "kind": kind,
+        "payload": request.get_json(),
+        "headers": headers,
+        "userID": current_user.id if current_user.is_authenticated else None
+    })
+    workers.Wake()
+    Log(f"Queued {kind} job {jobID}", "info")
+
+    return jsonify({"job": jobID, "status": f"/jobs/{jobID}"}) , 202
+
+def JobStatus(jobID: str):
+    workers = _jobWorkers
+    job = workers.store.Get(jobID) if workers else None
+
+    # Signed-in users' jobs are private, anonymous ones are guarded by the unguessable ID
+    if job and job.get("userID") and (not current_user.is_authenticated or current_user.id != job["userID"]):
+        job = None
+    if job is None:
+        return jsonify({"error": "Job not found."}) , 404
+
+    status = {"id": jobID, "state": job["state"]}
+    if job["state"] == DONE:
+        status["result"] = job.get("result")
+        status["statusCode"] = job.get("statusCode")
+    elif job["state"] == FAILED:
+        status["error"] = job.get("error")
+
+    response = jsonify(status)
+    if job["state"] in (QUEUED, RUNNING):
+        response.headers["Retry-After"] = "2"
+    return response
@@ -0,0 +1,165 @@
+from prometheus_client import (
+    Counter, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from pymongo import monitoring
+from contextvars import ContextVar
+from functools import wraps
+import os
+import time
+
+# Provider calls take seconds, parsers microseconds, Mongo somewhere between
+AI_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+PARSER_BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+AI_REQUEST_SECONDS = Histogram(
+    "eduduck_ai_request_seconds",
+    "Provider request latency by phase (connect, ttfb, body, decode, total).",
+    ["provider", "model", "route", "phase"],
+    buckets=AI_BUCKETS
+)
+AI_ERRORS = Counter(
+    "eduduck_ai_errors_total",
+    "Failed provider requests by HTTP status or failure kind.",
+    ["provider", "model", "route", "status"]
+)
+AI_RETRIES = Counter(
+    "eduduck_ai_retries_total",
+    "Provider requests sent again after a 429, 503 or failed connect.",
+    ["provider", "model", "route", "reason"]
+)
+AI_RETRY_WAIT_SECONDS = Histogram(
+    "eduduck_ai_retry_wait_seconds",
+    "Backoff slept before each retry, including provider Retry-After hints.",
+    ["provider"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30)
+)
+AI_PROMPT_TOKENS = Counter(
+    "eduduck_ai_prompt_tokens_total",
+    "Prompt tokens billed by providers, as reported in their usage fields.",
+    ["provider", "model", "route"]
+)
+AI_CACHED_PROMPT_TOKENS = Counter(
+    "eduduck_ai_cached_prompt_tokens_total",
+    "Prompt tokens the provider served from its prompt prefix cache.",
+    ["provider", "model", "route"]
+)
+AI_CACHE = Counter(
+    "eduduck_ai_cache_total",
+    "AI response cache lookups (hit, miss) and requests joined to an in-flight one (coalesced).",
+    ["result"]
+)
+PARSER_SECONDS = Histogram(
+    "eduduck_parser_seconds",
+    "Time spent turning provider output into quizzes, plans, flashcards and analyses.",
+    ["parser"],
+    buckets=PARSER_BUCKETS
+)
+MONGO_SECONDS = Histogram(
+    "eduduck_mongo_seconds",
+    "MongoDB command latency as reported by the driver.",
+    ["command", "collection", "outcome"],
+    buckets=MONGO_BUCKETS
+)
+
+# The Flask endpoint that started the AI call, carried across the AI loop's tasks
+_aiRoute = ContextVar("aiRoute", default="none")
+
+def SetRoute(route: str) -> None:
+    _aiRoute.set(route or "none")
+
+def CurrentRoute() -> str:
+    return _aiRoute.get()
+
+class RequestPhases:
+    """httpx trace hook splitting one provider call into phases.
+
+    ttfb runs from sending the request to the response headers, so it
+    includes connect; connect is 0 when a pooled connection was reused.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    async def __call__(self, event: str, info: dict) -> None:
+        if event.endswith((".started", ".complete")):
+            # http11./http2. prefixes differ per protocol, the phases don't
+            self.marks[event.removeprefix("http11.").removeprefix("http2.")] = time.perf_counter()
+
+    def Observe(self, provider: str, model, route: str, bodyDone: float, decodeDone: float) -> None:
+        connectStart = self.marks.get("connection.connect_tcp.started")
+        connectDone = self.marks.get("connection.start_tls.complete") or self.marks.get("connection.connect_tcp.complete")
+        headersDone = self.marks.get("receive_response_headers.complete", bodyDone)
+
+        labels = (provider, model or "default", route)
+        AI_REQUEST_SECONDS.labels(*labels, "connect").observe(
+            connectDone - connectStart if connectStart and connectDone else 0.0
+        )
+        AI_REQUEST_SECONDS.labels(*labels, "ttfb").observe(headersDone - self.start)
+        AI_REQUEST_SECONDS.labels(*labels, "body").observe(bodyDone - headersDone)
+        AI_REQUEST_SECONDS.labels(*labels, "decode").observe(decodeDone - bodyDone)
+        AI_REQUEST_SECONDS.labels(*labels, "total").observe(decodeDone - self.start)
+
+def ObserveStream(provider: str, model, route: str, firstToken: float, total: float) -> None:
+    """Streamed calls have no separate body phase, ttfb runs to the first token."""
+    labels = (provider, model or "default", route)
+    AI_REQUEST_SECONDS.labels(*labels, "ttfb").observe(firstToken)
+    AI_REQUEST_SECONDS.labels(*labels, "total").observe(total)
+
+def CountAiError(provider: str, model, status) -> None:
+    AI_ERRORS.labels(provider, model or "default", CurrentRoute(), str(status)).inc()
+
+def CountAiRetry(provider: str, model, reason, delay: float) -> None:
+    AI_RETRIES.labels(provider, model or "default", CurrentRoute(), str(reason)).inc()
+    AI_RETRY_WAIT_SECONDS.labels(provider).observe(delay)
+
+def CountPromptTokens(provider: str, model, promptTokens: int, cachedTokens: int) -> None:
+    labels = (provider, model or "default", CurrentRoute())
+    AI_PROMPT_TOKENS.labels(*labels).inc(promptTokens)
+    AI_CACHED_PROMPT_TOKENS.labels(*labels).inc(cachedTokens)
+
+def ObserveParser(parser: str, seconds: float) -> None:
+    PARSER_SECONDS.labels(parser).observe(seconds)
+
+def TimedParser(parser: str):
+    """Records the wrapped parser's run time under the given name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ObserveParser(parser, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends, passed to MongoClient(event_listeners=...)."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else "none"
+
+    def _Observe(self, event, outcome: str) -> None:
+        collection = self._collections.pop(event.request_id, "none")
+        MONGO_SECONDS.labels(event.command_name, collection, outcome).observe(event.duration_micros / 1_000_000)
+
+    def succeeded(self, event):
+        self._Observe(event, "ok")
+
+    def failed(self, event):
+        self._Observe(event, "error")
+
+def RenderMetrics() -> tuple[bytes, str]:
+    """Prometheus text exposition for this process, or for every gunicorn
+    worker when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
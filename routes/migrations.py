@@ -0,0 +1,30 @@
+"""Backfills for fields newer code looks documents up by.
+
+Each migration only touches documents that still lack the field, so running
+it again (every deploy does, through its flask command) is cheap once it's done.
+"""
+from pymongo import UpdateOne
+from routes.reparse import Batches
+from routes.utils import GetMongoClient , Log , UserKeys
+
+def MigrateUserKeys(batchSize: int = 500 , dryRun: bool = False) -> dict:
+    """Sets usernameKey and emailKey on users created before logins switched to them."""
+    users = GetMongoClient()["EduDuck"]["users"]
+    cursor = users.find(
+        {"$or": [{"usernameKey": {"$exists": False}}, {"emailKey": {"$exists": False}}]},
+        {"username": 1, "email": 1}
+    ).batch_size(batchSize)
+
+    stats = {"scanned": 0, "updated": 0}
+    for batch in Batches(cursor , batchSize):
+        stats["scanned"] += len(batch)
+        updates = [UpdateOne({"_id": doc["_id"]} , {"$set": UserKeys(doc.get("username") , doc.get("email"))}) for doc in batch]
+        stats["updated"] += len(updates)
+
+        if updates and not dryRun:
+            users.bulk_write(updates , ordered=False)
+
+    if stats["updated"]:
+        Log(f"User lookup keys set on {stats['updated']} users" + (" (dry run)" if dryRun else "") , "info")
+
+    return stats
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional , Callable
+import hashlib
+import heapq
+import random
+import re
+import threading
+import unicodedata
+import zlib
+
+# MinHash over word 3-shingles. Two notes that differ by whitespace, casing,
+# punctuation, a typo or a moved paragraph still share most of their shingles,
+# so their signatures agree in roughly Jaccard-similarity of the positions.
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Longer notes are sampled down to this many shingles (bottom-k by CRC), so
+# hashing stays a few hundred ms even for a 2.5 MB upload
+MAX_SHINGLES = 2048
+
+_MASK = (1 << 64) - 1
+_rng = random.Random(0x0DDC)
+# Fixed seeds: signatures stored in Mongo must stay comparable across restarts
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1 , _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"\w+")
+
+# Signatures of the last few notes, by digest
+SIGNATURE_CACHE = 64
+_signatures: OrderedDict[bytes, tuple[int, ...]] = OrderedDict()
+_signaturesLock = threading.Lock()
+
+def NormalizeNotes(notes: str) -> list[str]:
+    return _WORD.findall(unicodedata.normalize("NFKC", notes).casefold())
+
+def _Hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def Shingles(notes: str) -> set[int]:
+    words = NormalizeNotes(notes)
+    if len(words) <= SHINGLE_SIZE:
+        return {_Hash(" ".join(words))} if words else set()
+
+    grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if len(grams) > MAX_SHINGLES:
+        # The same shingles have the smallest CRCs in both of two near-identical
+        # notes, so the sample keeps their similarity
+        grams = heapq.nsmallest(MAX_SHINGLES , grams , key=lambda gram: zlib.crc32(gram.encode("utf-8")))
+    return {_Hash(gram) for gram in grams}
+
+def _MinHash(notes: str) -> tuple[int, ...]:
+    shingles = Shingles(notes)
+    if not shingles:
+        return ()
+    # Kept below 2**63 so the values fit Mongo's int64
+    return tuple(min(((a * shingle + b) & _MASK) >> 1 for shingle in shingles) for a , b in _PERMUTATIONS)
+
+def Signature(notes: str) -> tuple[int, ...]:
+    """MinHash signature, cached because lookup and store hash the same notes.
+
+    Keyed by a digest of the notes so the cache never holds request bodies.
+    """
+    key = hashlib.blake2b(notes.encode("utf-8"), digest_size=16).digest()
+    with _signaturesLock:
+        if key in _signatures:
+            _signatures.move_to_end(key)
+            return _signatures[key]
+
+    signature = _MinHash(notes)
+    with _signaturesLock:
+        _signatures[key] = signature
+        while len(_signatures) > SIGNATURE_CACHE:
+            _signatures.popitem(last=False)
+    return signature
+
+def Bands(signature: tuple) -> list[str]:
+    """LSH band keys: two notes become candidates when any band matches exactly."""
+    return [
+        f"{band}:{hashlib.blake2b(repr(signature[band * ROWS:(band + 1) * ROWS]).encode(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+def Similarity(a , b) -> float:
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x , y in zip(a , b)) / len(a)
+
+class NoteIndex:
+    """Fingerprints of the notes stored artifacts were generated from.
+
+    Entries carry the artifact kind and the settings that shape it (language,
+    difficulty, amount), only an artifact made with the same settings is offered.
+    """
+
+    def __init__(self , collection: Callable , threshold: float = 0.8 , candidates: int = 20):
+        self.threshold = threshold
+        self.candidates = candidates
+
+        self._collection = collection
+        self._indexReady = False
+
+    def _Collection(self):
+        collection = self._collection()
+        if not self._indexReady:
+            collection.create_index([("kind", 1), ("params", 1), ("bands", 1)], name="kind_1_params_1_bands_1")
+            self._indexReady = True
+        return collection
+
+    def Find(self , kind: str , notes: str , params: dict) -> Optional[dict]:
+        signature = Signature(notes)
+        if not signature:
+            return None
+
+        try:
+            docs = self._Collection().find(
+                {"kind": kind, "params": params, "bands": {"$in": Bands(signature)}},
+                {"signature": 1, "collection": 1, "queryID": 1}
+            ).sort("createdAt", -1).limit(self.candidates)
+
+            best = None
+            for doc in docs:
+                similarity = Similarity(signature , doc["signature"])
+                if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                    best = {**doc, "similarity": similarity}
+            return best
+        except Exception as err:
+            print(f"Note index lookup failed: {str(err)}")
+            return None
+
+    def Add(self , kind: str , notes: str , params: dict , collection: str , queryID: str) -> None:
+        signature = Signature(notes)
+        if not signature:
+            return
+
+        try:
+            self._Collection().insert_one({
+                "kind": kind,
+                "params": params,
+                "bands": Bands(signature),
+                "signature": list(signature),
+                "collection": collection,
+                "queryID": queryID,
+                "createdAt": datetime.utcnow()
+            })
+        except Exception as err:
+            print(f"Note index write failed: {str(err)}")
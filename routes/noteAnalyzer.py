@@ -1,10 +1,14 @@
 from flask import render_template, request, jsonify, send_file, current_app
 from flask_login import current_user
-from routes.utils import AiReq, IncrementUsage, StoreQuery, StoreTempQuery, GetQueryFromDB, Log, GetMongoClient
+from routes.utils import AiReq, AsyncAiReq, CacheIfParsed, ReserveUsage, StoreQuery, StoreTempQuery, GetQueryFromDB, Log, GetUserDoc
+from routes.providers import GetProvider, RequestOptions
+from routes.promptTemplates import FormatPrompt
+from routes.metrics import TimedParser
+from routes.parsers import parse_note_analysis
+from routes.structuredOutput import UseStructuredOutput, OutputSchema, DecodeOutput
 from json import dumps, JSONDecodeError, load
 from io import BytesIO
 from uuid import uuid4
-from bson import ObjectId
 import os
 
 standardApiErrors = {
@@ -21,167 +25,62 @@ moreApiErrors = {
 }
 
 
+@TimedParser("note_analysis")
 def ParseNoteAnalysis(raw_output: str) -> dict:
-    if not raw_output or not raw_output.strip():
-        return {"overall_score": 0, "sections": []}
-
-    result = {
-        "overall_score": 0,
-        "sections": []
-    }
-
-    lines = raw_output.strip().split("\n")
-    current_section = None
-    current_field = None
-
-    for line in lines:
-        line_stripped = line.strip()
-
-        if line_stripped.startswith("OVERALL_SCORE:"):
-            try:
-                score_str = line_stripped.split(":", 1)[1].strip()
-                result["overall_score"] = int(score_str)
-            except (ValueError, IndexError):
-                Log(f"Failed to parse OVERALL_SCORE: {line_stripped}", "warn")
-                continue
-
-        elif line_stripped.startswith("SECTION:"):
-            if current_section:
-                result["sections"].append(current_section)
-
-            title = line_stripped.split(":", 1)[1].strip()
-            current_section = {
-                "title": title,
-                "confidence": 0,
-                "issues": [],
-                "why_it_matters": [],
-                "suggestions": []
-            }
-            current_field = None
-
-        elif line_stripped.startswith("CONFIDENCE:") and current_section:
-            try:
-                conf_str = line_stripped.split(":", 1)[1].strip()
-                current_section["confidence"] = int(conf_str)
-            except (ValueError, IndexError):
-                Log(f"Failed to parse CONFIDENCE: {line_stripped}", "warn")
-            current_field = None
-
-        elif line_stripped == "ISSUES:":
-            current_field = "issues"
-        elif line_stripped == "WHY_IT_MATTERS:":
-            current_field = "why_it_matters"
-        elif line_stripped == "SUGGESTIONS:":
-            current_field = "suggestions"
-
-        elif line_stripped.startswith("-") and current_section and current_field:
-            item = line_stripped[1:].strip()
-            if item:
-                current_section[current_field].append(item)
-
-    if current_section:
-        result["sections"].append(current_section)
-
-    return result
+    analysis = DecodeOutput("note-analysis", raw_output)
+    return parse_note_analysis(raw_output) if analysis is None else analysis
 
 
-def NoteAnalyzer(prompts: dict, analyses: dict):
-    data: dict = request.get_json()
+def PrepareNoteAnalyzerRequest(prompts: dict, data: dict):
+    """Returns (early response, None) or (None, AiReq args)."""
 
     IS_FREE = data.get("isFree", False)
     NOTES = data["notes"]
     LANGUAGE = data["language"]
     API_MODE = data["apiMode"]
-    MODEL = data.get("model", False)
-
-    IsReasoning = False
 
     if IS_FREE:
         with current_app.app_context():
             if not current_user.is_authenticated:
                 Log("User not logined in.", "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html"), None
 
-            userData = GetMongoClient()["EduDuck"]["users"].find_one(
-                {"_id": ObjectId(current_user.id)}
-            )
+            userData = GetUserDoc()
             if not userData:
                 Log("User account not found.", "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html"), None
 
             times_used = userData.get("daily_usage", {}).get("timesUsed", 0)
             if times_used >= 3:
                 Log("Daily limit reached.", "error")
-                return render_template("pages/dailyLimit.html", remaining=0)
+                return render_template("pages/dailyLimit.html", remaining=0), None
 
-            IncrementUsage()
-
-    if MODEL:
-        MODEL = MODEL.strip()
-        IsReasoning = any(x in MODEL.lower() for x in ["gpt-5", "o1"])
+            if not ReserveUsage():
+                Log("Daily limit reached.", "error")
+                return render_template("pages/dailyLimit.html", remaining=0), None
 
     API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
 
-    if API_MODE == "Hugging Face":
-        API_URL = "https://router.huggingface.co/v1/chat/completions"
-    elif API_MODE == "Gemini":
-        API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-    else:
-        API_URL = "https://api.openai.com/v1/chat/completions"
-
-    if API_MODE == "Hugging Face":
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-    elif API_MODE == "OpenAI":
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        }
-    else:
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": API_KEY
-        }
+    provider = GetProvider(API_MODE)
+    structured = UseStructuredOutput(provider, prompts, "noteAnalyzer")
+    options = RequestOptions(data, API_KEY)
+    if structured:
+        options["schema"] = OutputSchema("note-analysis")
 
-    PROMPT = prompts.get("noteAnalyzer")
+    PROMPT = prompts.get("noteAnalyzerJson" if structured else "noteAnalyzer")
     if PROMPT is None:
-        return jsonify({"analysis": "Internal Error: PROMPT NOT FOUND"})
+        return jsonify({"analysis": "Internal Error: PROMPT NOT FOUND"}), None
 
-    PROMPT = PROMPT.format(
+    PROMPT = FormatPrompt(
+        PROMPT,
         NOTES=NOTES,
         LANGUAGE=LANGUAGE,
     )
 
-    if API_MODE == "Hugging Face":
-        payload = {
-            "messages": [{"role": "user", "content": PROMPT}],
-            "model": data.get("model") or "openai/gpt-oss-20b"
-        }
-    elif API_MODE == "OpenAI":
-        payload = {
-            "model": MODEL if MODEL else "gpt-4.1-nano",
-            "messages": [{"role": "user", "content": PROMPT}]
-        }
-    elif API_MODE == "Gemini":
-        payload = {
-            "contents": [{
-                "role": "user",
-                "parts": [{"text": PROMPT}]
-            }]
-        }
-
-    if IsReasoning:
-        payload["max_completion_tokens"] = 4096
-    elif API_MODE != "Gemini":
-        payload["max_tokens"] = 4096
-
-    payload["temperature"] = data.get("temperature", 0.3)
-    payload["top_p"] = data.get("top_p", 0.9)
-
-    if payload and API_MODE == "Hugging Face":
-        print(f"Model: {payload['model']}")
-
-    output = AiReq(API_URL, headers, payload, API_MODE)
+    return None, provider.BuildRequest(PROMPT, options)
+
 
+def FinishNoteAnalysis(output, analyses: dict):
     if output is None:
         return jsonify({"analysis": "Internal Error."})
 
@@ -211,6 +110,37 @@ def NoteAnalyzer(prompts: dict, analyses: dict):
     return jsonify({"id": query_id})
 
 
+def AnalysisCache(data: dict):
+    # Untimed parse, the one in FinishNoteAnalysis is the one measured
+    if data.get("forceNew", False):
+        return False
+    return CacheIfParsed(lambda output: ParseNoteAnalysis.__wrapped__(output).get("sections"))
+
+
+def NoteAnalyzer(prompts: dict, analyses: dict):
+    data: dict = request.get_json()
+
+    early, aiRequest = PrepareNoteAnalyzerRequest(prompts, data)
+    if early is not None:
+        return early
+
+    output = AiReq(*aiRequest, cache=AnalysisCache(data))
+
+    return FinishNoteAnalysis(output, analyses)
+
+
+async def NoteAnalyzerAsync(prompts: dict, analyses: dict):
+    data: dict = request.get_json()
+
+    early, aiRequest = PrepareNoteAnalyzerRequest(prompts, data)
+    if early is not None:
+        return early
+
+    output = await AsyncAiReq(*aiRequest, cache=AnalysisCache(data))
+
+    return FinishNoteAnalysis(output, analyses)
+
+
 def NoteAnalyzerPage():
     """GET /note-analyzer"""
     return render_template(
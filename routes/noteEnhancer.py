@@ -1,113 +1,58 @@
 from flask import render_template , request , jsonify , send_file , url_for , current_app
 from io import BytesIO
 from uuid import uuid4
-from routes.utils import AiReq , IncrementUsage , StoreQuery , Log , GetQueryFromDB , StoreTempQuery , GetMongoClient
+from routes.utils import AiReq , AsyncAiReq , ReserveUsage , StoreQuery , Log , GetQueryFromDB , StoreTempQuery , GetUserDoc
+from routes.providers import GetProvider , RequestOptions
+from routes.promptTemplates import FormatPrompt
 from flask_login import current_user
 from requests import post
-from bson import ObjectId
 import os
 
 def NoteEnhancer():
     return render_template('Note Enhancer/noteEnhancer.html' , prefill_topic=request.args.get('topic', '').strip())
 
-def EnhanceNotes(prompts: dict , notes: dict):
-    data: dict = request.get_json()
+def PrepareEnhanceNotesRequest(prompts: dict , data: dict):
+    """Returns (early response, None) or (None, AiReq args)."""
     Log(f"EnhanceNotes - Full data received: {data}", "info") # Added log statement
     IS_FREE = data["isFree"]
     NOTES = data["notes"]
     LANGUAGE = data["language"]
     API_MODE = data["apiMode"]
-    MODEL = data.get("model" , False)
 
     Log(f"EnhanceNotes - LANGUAGE received: {LANGUAGE}", "info") # Added log statement
 
-    IsReasoning = False
-
     if IS_FREE:
         with current_app.app_context():
             if not current_user.is_authenticated:
                 Log("User not logined in." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
-            userData = GetMongoClient()["EduDuck"]["users"].find_one({"_id": ObjectId(current_user.id)})
+            userData = GetUserDoc()
             if not userData:
                 Log("User account not found." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
             times_used = userData.get("daily_usage", {}).get("timesUsed", 0)
             if times_used >= 3:
                 Log("Daily limit reached." , "error")
-                return render_template("pages/dailyLimit.html", remaining=0)
+                return render_template("pages/dailyLimit.html", remaining=0) , None
 
-        IncrementUsage()
-
-    if MODEL:
-        MODEL = MODEL.strip()
-        IsReasoning = any(x in MODEL.lower() for x in ["gpt-5", "o1"])
+        if not ReserveUsage():
+            Log("Daily limit reached." , "error")
+            return render_template("pages/dailyLimit.html", remaining=0) , None
 
     API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
 
-    if API_MODE == "Hugging Face": 
-        API_URL = "https://router.huggingface.co/v1/chat/completions" 
-    elif API_MODE == "Gemini":
-        API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-    else:
-        API_URL = "https://api.openai.com/v1/chat/completions"
-
-    if API_MODE == "Hugging Face":
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-    elif API_MODE == "OpenAI":
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        }
-    else: 
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": API_KEY
-        }
-    
     PROMPT = prompts['enhanceNotes']
 
     if PROMPT == None:
-        return jsonify({'notes': 'Internal Error: PROMPT NOT FOUND'})
+        return jsonify({'notes': 'Internal Error: PROMPT NOT FOUND'}) , None
     else:
-        PROMPT = PROMPT.format(NOTES=NOTES , LANGUAGE=LANGUAGE)
-
-    if API_MODE == "Hugging Face":
-        payload = {
-            "messages": [{"role": "user", "content": PROMPT}],
-            "model": data.get("model") or "openai/gpt-oss-20b"
-        }
-    elif API_MODE == "OpenAI":
-        payload = {
-            "model": MODEL if MODEL else "gpt-4.1-nano",
-            "messages": [{"role": "user", "content": PROMPT}],
-        }
-    elif API_MODE == "Gemini":
-        payload = {
-            "contents": [{
-                "role": "user",
-                "parts": [{"text": PROMPT}]
-            }]
-        }
-
-    if IsReasoning:
-        payload["max_completion_tokens"] = 4096  
-    elif API_MODE == "Gemini":
-        pass
-    else:
-        payload["max_tokens"] = 4096
-        payload["temperature"] = data.get("temperature", 0.3)
-        payload["top_p"] = data.get("top_p", 0.9)
-
-    if API_MODE != "Gemini" and payload.get("model" , None) is None:
-        payload["model"] = "openai/gpt-oss-20b"
-
-    if payload and API_MODE == "Hugging Face": print(f"Model: {payload["model"]}") 
+        PROMPT = FormatPrompt(PROMPT , NOTES=NOTES , LANGUAGE=LANGUAGE)
 
-    enhancedNotes = AiReq(API_URL , headers , payload , API_MODE)
+    return None , GetProvider(API_MODE).BuildRequest(PROMPT , RequestOptions(data , API_KEY))
 
+def FinishEnhanceNotes(enhancedNotes , notes: dict):
     if (enhancedNotes is None):
         return jsonify({"notes": "Internal Error."})
 
@@ -122,6 +67,28 @@ def EnhanceNotes(prompts: dict , notes: dict):
 
     return jsonify({'id': queryRes})
 
+def EnhanceNotes(prompts: dict , notes: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareEnhanceNotesRequest(prompts , data)
+    if early is not None:
+        return early
+
+    enhancedNotes = AiReq(*aiRequest , cache=not data.get("forceNew" , False))
+
+    return FinishEnhanceNotes(enhancedNotes , notes)
+
+async def EnhanceNotesAsync(prompts: dict , notes: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareEnhanceNotesRequest(prompts , data)
+    if early is not None:
+        return early
+
+    enhancedNotes = await AsyncAiReq(*aiRequest , cache=not data.get("forceNew" , False))
+
+    return FinishEnhanceNotes(enhancedNotes , notes)
+
 def EnhancedNotes(Notes: dict):
     noteID = request.args.get('id')
 
@@ -1,7 +1,7 @@
 from authlib.integrations.flask_client import OAuth
 from flask import Blueprint, redirect, url_for, flash, render_template
 from flask_login import login_user, current_user
-from routes.utils import LoadUser, GetMongoClient, User
+from routes.utils import LoadUser, GetMongoClient, User, UserKey, UserKeys, InvalidateUser
 from authlib.integrations.base_client.errors import OAuthError
 import secrets, os
 from datetime import date
@@ -88,9 +88,9 @@ def authorizeGoogle():
         user = User(userDoc)
     else:
         userDoc = usersCollection.find_one({
-            "email": info.get("email").lower(),
+            "emailKey": UserKey(info.get("email")),
             "deletedAt": {"$exists": False}
-        })
+        }) if info.get("email") else None
         if not userDoc:
             userDoc = {
                 "username": info.get("name").lower() if info.get("name") else info.get("email").split("@")[0],
@@ -103,12 +103,14 @@ def authorizeGoogle():
                     "timesUsed": 0
                 }
             }
+            userDoc.update(UserKeys(userDoc["username"], userDoc["email"]))
             result = usersCollection.insert_one(userDoc)
         else:
             usersCollection.update_one(
                 {"_id": userDoc["_id"]},
                 {"$set": {"googleId": googleId}}
             )
+            InvalidateUser(str(userDoc["_id"]))
 
         user = User(userDoc)
 
@@ -159,7 +161,7 @@ def authorizeGithub():
         user = User(userDoc)
     else:
         userDoc = usersCollection.find_one({
-            "email": primaryEmail.lower(), 
+            "emailKey": UserKey(primaryEmail),
             "deletedAt": {"$exists": False}
         }) if primaryEmail else None
         if not userDoc:
@@ -174,12 +176,14 @@ def authorizeGithub():
                     "timesUsed": 0
                 }
             }
+            userDoc.update(UserKeys(userDoc["username"], userDoc["email"]))
             result = usersCollection.insert_one(userDoc)
         else:
             usersCollection.update_one(
                 {"_id": userDoc["_id"]},
                 {"$set": {"githubId": githubId}}
             )
+            InvalidateUser(str(userDoc["_id"]))
 
         user = User(userDoc)
 
@@ -227,7 +231,7 @@ def authorizeDiscord():
         user = User(userDoc)
     else:
         userDoc = usersCollection.find_one({
-            "email": email.lower(),
+            "emailKey": UserKey(email),
             "deletedAt": {"$exists": False}
         }) if email else None
         if not userDoc:
@@ -242,12 +246,14 @@ def authorizeDiscord():
                     "timesUsed": 0
                 }
             }
+            userDoc.update(UserKeys(userDoc["username"], userDoc["email"]))
             result = usersCollection.insert_one(userDoc)
         else:
             usersCollection.update_one(
                 {"_id": userDoc["_id"]},
                 {"$set": {"discordId": discordId}}
             )
+            InvalidateUser(str(userDoc["_id"]))
 
         user = User(userDoc)
 
@@ -294,9 +300,9 @@ def authorizeMicrosoft():
         user = User(userDoc)
     else:
         userDoc = usersCollection.find_one({
-            "email": info.get("email").lower(),
+            "emailKey": UserKey(info.get("email")),
             "deletedAt": {"$exists": False}
-        })
+        }) if info.get("email") else None
         if not userDoc:
             userDoc = {
                 "username": info.get("name").lower() if info.get("name") else info.get("email").split("@")[0],
@@ -309,12 +315,14 @@ def authorizeMicrosoft():
                     "timesUsed": 0
                 }
             }
+            userDoc.update(UserKeys(userDoc["username"], userDoc["email"]))
             result = usersCollection.insert_one(userDoc)
         else:
             usersCollection.update_one(
                 {"_id": userDoc["_id"]},
                 {"$set": {"microsoftId": microsoftId}}
             )
+            InvalidateUser(str(userDoc["_id"]))
 
         user = User(userDoc)
 
@@ -0,0 +1,20 @@
+"""Parsers the app uses: the native_parsers wheel from build.sh when it's
+installed, the pure-Python versions in routes.pyParsers otherwise."""
+try:
+    from native_parsers import ( # Rust Functions
+        parse_quiz , parse_quiz_many , QuizStreamParser , submit_result ,
+        parse_study_plan , parse_study_plan_many , parse_flashcards , parse_note_analysis
+    )
+    NATIVE = True
+except ImportError:
+    from routes.pyParsers import (
+        parse_quiz , parse_quiz_many , QuizStreamParser , submit_result ,
+        parse_study_plan , parse_study_plan_many , parse_flashcards , parse_note_analysis
+    )
+    NATIVE = False
+
+__all__ = [
+    "parse_quiz" , "parse_quiz_many" , "QuizStreamParser" , "submit_result" ,
+    "parse_study_plan" , "parse_study_plan_many" , "parse_flashcards" , "parse_note_analysis" ,
+    "NATIVE"
+]
@@ -0,0 +1,24 @@
+from typing import Union
+
+# A template in prompts.json is either a plain string (one user message) or
+# {"system": ..., "user": ...}. The system part never contains placeholders:
+# it is the identical prefix every request starts with, which is what the
+# providers' automatic prompt caching keys on. Only "user" is formatted.
+Prompt = Union[str, dict]
+
+def FormatPrompt(template: Prompt , **values) -> Prompt:
+    if isinstance(template, dict):
+        return {"system": template["system"], "user": template["user"].format(**values)}
+    return template.format(**values)
+
+def AppendPrompt(prompt: Prompt , text: str) -> Prompt:
+    """Adds text to the dynamic end of the prompt."""
+    if isinstance(prompt, dict):
+        return {**prompt, "user": prompt["user"] + text}
+    return prompt + text
+
+def SplitPrompt(prompt: Prompt) -> tuple[str, str]:
+    """(system, user); system is empty for plain string prompts."""
+    if isinstance(prompt, dict):
+        return prompt["system"] , prompt["user"]
+    return "" , prompt
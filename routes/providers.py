@@ -0,0 +1,283 @@
+from typing import Optional
+from urllib.parse import quote , unquote
+from routes.responseSchemas import CHAT_DECODER , GEMINI_DECODER
+from routes.promptTemplates import SplitPrompt
+from routes.structuredOutput import GeminiSchema , JsonSchema
+import msgspec
+import os
+
+REASONING_MODEL_MARKERS = ("gpt-5", "o1")
+DEFAULT_MAX_TOKENS = 4096
+
+def IsReasoningModel(model: Optional[str]) -> bool:
+    if not model:
+        return False
+    model = model.lower()
+    return any(marker in model for marker in REASONING_MODEL_MARKERS)
+
+def RequestOptions(data: dict , apiKey: str) -> dict:
+    """Picks the provider options out of a generator request body."""
+    return {
+        "apiKey": apiKey,
+        "model": (data.get("model") or "").strip() or None,
+        "temperature": data.get("temperature", 0.3),
+        "top_p": data.get("top_p", 0.9)
+    }
+
+def ModelParams(data: dict) -> dict:
+    """Provider and model a stored artifact was generated with, so reuse never crosses either."""
+    return {"apiMode": data["apiMode"], "model": (data.get("model") or "").strip()}
+
+class Provider:
+    """One AI backend: endpoint, header template, payload skeleton and extractor.
+
+    Everything that doesn't depend on the request is built once in __init__,
+    BuildRequest only fills in the key, model, prompt and sampling options.
+    """
+    mode = ""
+    endpoint = ""
+    defaultModel = ""
+    knownModels = () # Labelled by name in metrics and status, other models are "custom"
+    decoder = msgspec.json.Decoder()
+    supportsSchema = False # options["schema"] ({"name", "schema"}) is sent as a response schema
+
+    def __init__(self):
+        self._headers = self.HeaderTemplate()
+
+    def HeaderTemplate(self) -> dict:
+        return {"Content-Type": "application/json"}
+
+    def Endpoint(self , apiKey: str , model: Optional[str] = None) -> str:
+        return self.endpoint
+
+    def Headers(self , apiKey: str) -> dict:
+        return {**self._headers, "Authorization": f"Bearer {apiKey}"}
+
+    def Payload(self , prompt: str , options: dict) -> dict:
+        raise NotImplementedError
+
+    def Extract(self , result) -> tuple[str, bool]:
+        raise NotImplementedError
+
+    def ExtractReply(self , reply) -> Optional[tuple[str, bool]]:
+        """Text from a reply decoded with self.decoder, None if it has none."""
+        return self.Extract(reply)
+
+    def Usage(self , reply) -> Optional[tuple[int, int]]:
+        """(prompt tokens, of which served from the provider's prompt cache)."""
+        return None
+
+    def DecodeReply(self , content: bytes) -> tuple[str, bool, Optional[tuple[int, int]]]:
+        """Raw reply body to (text, parsed, usage) through the provider's typed schema."""
+        try:
+            reply = self.decoder.decode(content)
+            extracted = self.ExtractReply(reply)
+        except msgspec.ValidationError:
+            extracted = None
+
+        if extracted is None:
+            # Error bodies and odd shapes get the dict walk and its messages
+            return (*self.Extract(msgspec.json.decode(content)) , None)
+        return (*extracted , self.Usage(reply))
+
+    def Decode(self , content: bytes) -> tuple[str, bool]:
+        text , parsed , _ = self.DecodeReply(content)
+        return text , parsed
+
+    def PromptOf(self , payload: dict):
+        """Recovers the prompt (string or system/user dict) from a payload built by this provider."""
+        raise NotImplementedError
+
+    def SchemaOf(self , payload: dict) -> Optional[dict]:
+        """Recovers options["schema"] from a payload built by this provider."""
+        return None
+
+    def ApiKeyOf(self , headers: dict) -> Optional[str]:
+        return (headers.get("Authorization") or "").removeprefix("Bearer ") or None
+
+    def ModelOf(self , API_URL: str , payload: dict) -> Optional[str]:
+        """The model a request built by this provider is sent to."""
+        return payload.get("model")
+
+    def BuildRequest(self , prompt , options: dict) -> tuple:
+        """Returns the positional AiReq args: (API_URL, headers, payload, mode)."""
+        apiKey = options.get("apiKey")
+        return self.Endpoint(apiKey , options.get("model")) , self.Headers(apiKey) , self.Payload(prompt , options) , self.mode
+
+    def generate(self , prompt: str , options: dict , cache: bool = False):
+        from routes.utils import AiReq
+        return AiReq(*self.BuildRequest(prompt , options) , cache=cache)
+
+    async def agenerate(self , prompt: str , options: dict , cache: bool = False):
+        from routes.utils import AsyncAiReq
+        return await AsyncAiReq(*self.BuildRequest(prompt , options) , cache=cache)
+
+class OpenAIProvider(Provider):
+    mode = "OpenAI"
+    endpoint = "https://api.openai.com/v1/chat/completions"
+    defaultModel = "gpt-4.1-nano"
+    knownModels = (
+        "gpt-4.1-nano", "gpt-4.1-mini", "gpt-4.1", "gpt-4o-mini", "gpt-4o",
+        "gpt-5-nano", "gpt-5-mini", "gpt-5", "o1", "o3-mini", "o3", "o4-mini"
+    )
+    decoder = CHAT_DECODER
+    supportsSchema = True
+
+    def Payload(self , prompt , options: dict) -> dict:
+        model = options.get("model") or self.defaultModel
+        system , user = SplitPrompt(prompt)
+        # Static instructions first so requests share a cacheable prefix
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": user})
+
+        payload = {
+            "model": model,
+            "messages": messages
+        }
+
+        if IsReasoningModel(model):
+            # Reasoning models reject max_tokens and custom sampling
+            payload["max_completion_tokens"] = options.get("maxTokens", DEFAULT_MAX_TOKENS)
+        else:
+            payload["max_tokens"] = options.get("maxTokens", DEFAULT_MAX_TOKENS)
+            payload["temperature"] = options.get("temperature", 0.3)
+            payload["top_p"] = options.get("top_p", 0.9)
+
+        schema = options.get("schema")
+        if schema and self.supportsSchema:
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": schema["name"], "strict": True, "schema": schema["schema"]}
+            }
+
+        return payload
+
+    def Extract(self , result) -> tuple[str, bool]:
+        try:
+            return result["choices"][0]["message"]["content"] , True
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Error parsing {self.mode} response: {e}")
+            return f"Error parsing {self.mode} response." , False
+
+    def ExtractReply(self , reply) -> Optional[tuple[str, bool]]:
+        if not reply.choices:
+            return None
+        return reply.choices[0].message.content , True
+
+    def Usage(self , reply) -> Optional[tuple[int, int]]:
+        if reply.usage is None:
+            return None
+        details = reply.usage.prompt_tokens_details
+        return reply.usage.prompt_tokens , details.cached_tokens if details else 0
+
+    def PromptOf(self , payload: dict):
+        messages = payload.get("messages") or []
+        if len(messages) == 1:
+            return messages[0].get("content")
+        if [message.get("role") for message in messages] == ["system", "user"]:
+            return {"system": messages[0].get("content"), "user": messages[1].get("content")}
+        return None
+
+    def SchemaOf(self , payload: dict) -> Optional[dict]:
+        try:
+            schema = payload["response_format"]["json_schema"]
+            return {"name": schema["name"], "schema": schema["schema"]}
+        except (KeyError, TypeError):
+            return None
+
+class HuggingFaceProvider(OpenAIProvider):
+    mode = "Hugging Face"
+    endpoint = "https://router.huggingface.co/v1/chat/completions"
+    defaultModel = "openai/gpt-oss-20b"
+    knownModels = ("openai/gpt-oss-20b", "openai/gpt-oss-120b")
+    supportsSchema = False # json_schema support depends on the model behind the router
+
+    def HeaderTemplate(self) -> dict:
+        return {}
+
+class GeminiProvider(Provider):
+    mode = "Gemini"
+    endpoint = "https://generativelanguage.googleapis.com/v1beta/models/"
+    defaultModel = "gemini-2.5-flash"
+    knownModels = ("gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-2.5-pro", "gemini-2.0-flash")
+    decoder = GEMINI_DECODER
+    supportsSchema = True
+
+    def Endpoint(self , apiKey: str , model: Optional[str] = None) -> str:
+        # The model is part of the path, quoted so a custom one can't leave it
+        return f"{self.endpoint}{quote(model or self.defaultModel , safe='')}:generateContent?key={apiKey}"
+
+    def Headers(self , apiKey: str) -> dict:
+        return {**self._headers, "x-goog-api-key": apiKey}
+
+    def Payload(self , prompt , options: dict) -> dict:
+        system , user = SplitPrompt(prompt)
+        payload = {"systemInstruction": {"parts": [{"text": system}]}} if system else {}
+        payload["contents"] = [{
+            "role": "user",
+            "parts": [{"text": user}]
+        }]
+
+        schema = options.get("schema")
+        if schema:
+            payload["generationConfig"] = {
+                "responseMimeType": "application/json",
+                "responseSchema": GeminiSchema(schema["schema"])
+            }
+
+        return payload
+
+    def Extract(self , result) -> tuple[str, bool]:
+        try:
+            parts = result["candidates"][0]["content"]["parts"]
+            return "".join(part["text"] for part in parts) , True
+        except (KeyError, IndexError, TypeError):
+            return "Unknown API format." , False
+
+    def ExtractReply(self , reply) -> Optional[tuple[str, bool]]:
+        if not reply.candidates:
+            return None
+        return "".join(part.text for part in reply.candidates[0].content.parts) , True
+
+    def Usage(self , reply) -> Optional[tuple[int, int]]:
+        if reply.usageMetadata is None:
+            return None
+        return reply.usageMetadata.promptTokenCount , reply.usageMetadata.cachedContentTokenCount
+
+    def PromptOf(self , payload: dict):
+        try:
+            user = payload["contents"][0]["parts"][0]["text"]
+            if "systemInstruction" not in payload:
+                return user
+            return {"system": payload["systemInstruction"]["parts"][0]["text"], "user": user}
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    def SchemaOf(self , payload: dict) -> Optional[dict]:
+        try:
+            # Gemini has no schema name, the fallback only needs a valid one
+            return {"name": "reply", "schema": JsonSchema(payload["generationConfig"]["responseSchema"])}
+        except (KeyError, TypeError):
+            return None
+
+    def ApiKeyOf(self , headers: dict) -> Optional[str]:
+        return headers.get("x-goog-api-key")
+
+    def ModelOf(self , API_URL: str , payload: dict) -> Optional[str]:
+        if not API_URL.startswith(self.endpoint):
+            return None
+        return unquote(API_URL.removeprefix(self.endpoint).split(":", 1)[0])
+
+PROVIDERS = {provider.mode: provider for provider in (OpenAIProvider() , HuggingFaceProvider() , GeminiProvider())}
+
+def GetProvider(mode: str) -> Provider:
+    # Unknown modes always fell through to the OpenAI endpoint
+    return PROVIDERS.get(mode , PROVIDERS["OpenAI"])
+
+def ModelLabel(mode: str , model: Optional[str]) -> str:
+    """Bounded stand-in for a client-chosen model, for metric labels and per-model state."""
+    if not model:
+        return "default"
+    if model in GetProvider(mode).knownModels or model == os.getenv("AI_FALLBACK_MODEL"):
+        return model
+    return "custom"
@@ -0,0 +1,343 @@
+"""Pure-Python versions of the native_parsers functions.
+
+Same names, arguments and results as the Rust extension, so routes.parsers
+can use them when the wheel isn't built. tests/test_native_parsers.py fuzzes
+both and checks they agree.
+"""
+import math
+
+MAX_QUESTIONS = 20
+CORRECT_MARKER = b"|CORRECT:"
+MIN_QUESTION_LENGTH = 10
+MIN_QUESTION_TEXT = 5 # bytes
+
+# Rust's u8::is_ascii_whitespace, which has no \v
+_asciiSpace = b" \t\n\x0c\r"
+_answerTrim = _asciiSpace + b".,!?;:"
+_optionLabels = (b"a)" , b"b)" , b"c)" , b"d)")
+
+# Rust's char::is_whitespace, str.strip() would also drop \x1c-\x1f
+_rustSpace = "\t\n\x0b\x0c\r \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+
+_asciiUpper = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ" , "abcdefghijklmnopqrstuvwxyz")
+
+#
+# Quiz
+#
+
+class _BlockScanner:
+    """Resumable marker scan shared by parse_quiz and QuizStreamParser."""
+    def __init__(self):
+        self.pos = 0   # next byte to check for a marker
+        self.start = 0 # where the next question block begins
+
+    def Scan(self , data: bytes , blocks: list) -> None:
+        """Appends (start, end, correct) for every block completed within data."""
+        last = len(data) - len(CORRECT_MARKER) # a marker needs a byte after it
+
+        while True:
+            i = data.find(CORRECT_MARKER , self.pos)
+            if i == -1 or i >= last:
+                self.pos = max(self.pos , last)
+                return
+
+            j = i + len(CORRECT_MARKER)
+            while j < len(data) and data[j] in _asciiSpace:
+                j += 1
+            if j >= len(data):
+                self.pos = i # answer letter not here yet
+                return
+
+            letter = data[j:j + 1].lower()
+            correct = letter.decode() if letter in b"abcd" else "a"
+
+            close = data.find(b"|" , j)
+            if close == -1:
+                self.pos = i # closing | not here yet
+                return
+
+            if i > self.start and i - self.start >= MIN_QUESTION_LENGTH:
+                blocks.append((self.start , i , correct))
+
+            self.start = self.pos = close + 1
+
+def _ParseBlock(data: bytes , block: tuple):
+    start , end , correct = block
+    text = data[start:end].lstrip(_asciiSpace)
+
+    # Question number
+    digits = 0
+    while digits < len(text) and 48 <= text[digits] <= 57:
+        digits += 1
+    text = text[digits:].lstrip(_asciiSpace)
+    if not text:
+        return None
+
+    # First a) b) c) d), which must come in that order
+    positions = [text.find(label) for label in _optionLabels]
+    if -1 in positions or any(positions[i] + 2 > positions[i + 1] for i in range(3)):
+        return None
+
+    question = text[:positions[0]].strip(_asciiSpace)
+    bounds = positions[1:] + [len(text)]
+    answers = [text[positions[i] + 2:bounds[i]].lstrip(_asciiSpace).rstrip(_answerTrim) for i in range(4)]
+
+    if len(question) < MIN_QUESTION_TEXT or not all(answers):
+        return None
+
+    return {
+        "question": question.decode(),
+        "answers": dict(zip("abcd" , (answer.decode() for answer in answers))),
+        "correct": correct
+    }
+
+def parse_quiz(quiz: str) -> dict:
+    data = quiz.encode()
+    blocks = []
+    _BlockScanner().Scan(data , blocks)
+
+    questions = {}
+    for block in blocks[:MAX_QUESTIONS]:
+        question = _ParseBlock(data , block)
+        if question is not None:
+            questions[str(len(questions) + 1)] = question
+
+    return questions
+
+def parse_quiz_many(quizzes: list) -> list:
+    return [parse_quiz(quiz) for quiz in quizzes]
+
+class QuizStreamParser:
+    """Incremental parser for a quiz that is still being generated, see parse_quiz."""
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scanner = _BlockScanner()
+        self._blocksSeen = 0
+        self._finished = False
+        self.count = 0 # questions returned so far
+
+    def feed(self , chunk: str) -> dict:
+        if self._finished:
+            raise RuntimeError("feed() called after finish()")
+
+        # Past the question limit nothing else can be returned
+        if self._blocksSeen < MAX_QUESTIONS:
+            self._buffer += chunk.encode()
+
+        return self._TakeQuestions()
+
+    def finish(self) -> dict:
+        questions = self._TakeQuestions()
+
+        self._finished = True
+        self._buffer = bytearray()
+
+        return questions
+
+    def _TakeQuestions(self) -> dict:
+        data = bytes(self._buffer)
+        blocks = []
+        self._scanner.Scan(data , blocks)
+
+        questions = {}
+        for block in blocks:
+            if self._blocksSeen >= MAX_QUESTIONS:
+                break
+            self._blocksSeen += 1
+
+            question = _ParseBlock(data , block)
+            if question is not None:
+                self.count += 1
+                questions[str(self.count)] = question
+
+        # Everything before the next block has been parsed
+        consumed = self._scanner.start
+        if consumed:
+            del self._buffer[:consumed]
+            self._scanner.pos -= consumed
+            self._scanner.start = 0
+
+        return questions
+
+def submit_result(quiz: dict , user_answers: dict) -> dict:
+    if not quiz:
+        raise ValueError("No quiz data")
+
+    answers = {
+        key: value for key , value in user_answers.items()
+        if isinstance(key , str) and isinstance(value , str)
+    }
+
+    score = 0
+    results = {}
+    for number , question in quiz.items():
+        if not isinstance(number , str) or not isinstance(question , dict):
+            raise TypeError("quiz must map question numbers to question dicts")
+
+        correct = question.get("correct")
+        correct = correct if isinstance(correct , str) else ""
+        user = answers.get(number , "")
+
+        # Only ASCII letters compare case-insensitively, as in eq_ignore_ascii_case
+        right = bool(correct) and correct.translate(_asciiUpper) == user.translate(_asciiUpper)
+        score += right
+        results[number] = {"correct": correct, "user": user, "right": right}
+
+    # Rounds half away from zero like f64::round
+    scaled = score / len(quiz) * 1000
+    percentage = (math.floor(scaled) + (scaled - math.floor(scaled) >= 0.5)) / 10
+
+    return {"score": score, "total": len(quiz), "percentage": percentage, "results": results}
+
+#
+# Study Plan
+#
+
+# Same headings as HEADINGS in study_plan.rs, matched as written and in upper case
+_headings = [
+    "Day", "Week", "Session",
+    "Dzień", "Tydzień", "Sesja",
+    "День", "Тиждень", "Сесія", "Заняття",
+    "Jour", "Semaine", "Séance",
+    "Неделя", "Сессия", "Занятие",
+    "Tag", "Woche", "Sitzung",
+]
+_headingSet = frozenset(_headings + [heading.upper() for heading in _headings])
+_headingLengths = sorted({len(heading) for heading in _headingSet})
+_markerSpace = " \t\xa0\u202f"
+
+def _IsWordChar(char: str) -> bool:
+    """is_word_char in study_plan.rs: ASCII letters and digits, Latin and Cyrillic letters."""
+    if char.isascii():
+        return char.isalnum()
+    return ("\xc0" <= char <= "\u024f" or "\u0400" <= char <= "\u04ff") and char not in "\xd7\xf7"
+
+def _MarkerStart(text: str , colon: int) -> int:
+    """Start of the "<heading> <number>:" marker ending at text[colon], -1 if there isn't one.
+
+    The native parser finds headings with an Aho-Corasick automaton and checks
+    what follows. Here str.find jumps between colons and each is checked
+    backwards, which finds the same markers without a per-character loop."""
+    pos = colon
+    while pos > 0 and text[pos - 1] in _markerSpace:
+        pos -= 1
+
+    numberEnd = pos
+    while pos > 0 and "0" <= text[pos - 1] <= "9":
+        pos -= 1
+    if pos == numberEnd:
+        return -1
+
+    gapEnd = pos
+    while pos > 0 and text[pos - 1] in _markerSpace:
+        pos -= 1
+    if pos == gapEnd:
+        return -1
+
+    for length in _headingLengths:
+        start = pos - length
+        if start >= 0 and text[start:pos] in _headingSet and not (start and _IsWordChar(text[start - 1])):
+            return start
+
+    return -1
+
+def parse_study_plan(plan_text: str) -> list:
+    markers = []
+    colon = plan_text.find(":")
+    while colon != -1:
+        start = _MarkerStart(plan_text , colon)
+        if start != -1:
+            markers.append((start , colon + 1))
+        colon = plan_text.find(":" , colon + 1)
+
+    plan = []
+    length = len(plan_text)
+    for index , (dayStart , dayEnd) in enumerate(markers):
+        pos = dayEnd
+        while pos < length and plan_text[pos] in " \t":
+            pos += 1
+        while pos < length and plan_text[pos] in "\n\r":
+            pos += 1
+
+        contentEnd = markers[index + 1][0] if index + 1 < len(markers) else length
+        plan.append({"day": plan_text[dayStart:dayEnd], "tasks": plan_text[pos:contentEnd].strip(_rustSpace)})
+
+    return plan
+
+def parse_study_plan_many(plans: list) -> list:
+    return [parse_study_plan(plan) for plan in plans]
+
+#
+# Flashcards
+#
+
+def parse_flashcards(text: str) -> list:
+    output = []
+
+    for flashcard in text.split("~"):
+        # Only the first | separates, answers may contain more
+        question , separator , answer = flashcard.partition("|")
+        question , answer = question.strip() , answer.strip()
+        if separator and question and answer:
+            output.append({"question": question, "answer": answer})
+
+    return output
+
+#
+# Note Analysis
+#
+
+def _ToInt(value: str , default: int) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def parse_note_analysis(raw_output: str) -> dict:
+    result = {
+        "overall_score": 0,
+        "sections": []
+    }
+
+    currentSection = None
+    currentField = None
+
+    for line in raw_output.strip().split("\n"):
+        line = line.strip()
+
+        if line.startswith("OVERALL_SCORE:"):
+            result["overall_score"] = _ToInt(line[len("OVERALL_SCORE:"):].strip() , result["overall_score"])
+
+        elif line.startswith("SECTION:"):
+            if currentSection is not None:
+                result["sections"].append(currentSection)
+
+            currentSection = {
+                "title": line[len("SECTION:"):].strip(),
+                "confidence": 0,
+                "issues": [],
+                "why_it_matters": [],
+                "suggestions": []
+            }
+            currentField = None
+
+        elif line.startswith("CONFIDENCE:") and currentSection is not None:
+            currentSection["confidence"] = _ToInt(line[len("CONFIDENCE:"):].strip() , currentSection["confidence"])
+            currentField = None
+
+        elif line == "ISSUES:":
+            currentField = "issues"
+        elif line == "WHY_IT_MATTERS:":
+            currentField = "why_it_matters"
+        elif line == "SUGGESTIONS:":
+            currentField = "suggestions"
+
+        elif line.startswith("-") and currentSection is not None and currentField:
+            item = line[1:].strip()
+            if item:
+                currentSection[currentField].append(item)
+
+    if currentSection is not None:
+        result["sections"].append(currentSection)
+
+    return result
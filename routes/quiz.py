@@ -1,15 +1,21 @@
 import re
-from flask import render_template , request , jsonify , send_file , url_for , current_app
+from flask import render_template , request , jsonify , send_file , url_for , current_app , Response , stream_with_context
 from flask_login import current_user
-from quiz_parser import parse_quiz # Rust Function
-from routes.utils import AiReq , IncrementUsage , StoreTempQuery, StoreQuery , GetQueryFromDB , Log , GetMongoClient , GetUsage
+from routes.parsers import parse_quiz , QuizStreamParser , submit_result
+from routes.utils import AiReq , AsyncAiReq , AiReqMany , AsyncAiReqMany , AiReqStream , CacheIfParsed , FormatSSE , GetChunkConfig , ReserveUsage , StoreTempQuery, StoreQuery , GetQueryFromDB , Log , GetMongoClient , GetUsage , FindReusableQuery , RememberQuery
+from routes.providers import GetProvider , ModelParams , RequestOptions
+from routes.promptTemplates import FormatPrompt
+from routes.chunking import ChunkNotes , MergeQuizzes
+from routes.metrics import ObserveParser
+from routes.structuredOutput import UseStructuredOutput , OutputSchema , DecodeOutput
+from routes.itemAnalysis import RecordSubmission , QuizStats
 from json import load , JSONDecodeError , dumps
 from uuid import uuid4
+from typing import Optional
 from io import BytesIO
 from requests import post
 from bson import ObjectId
 import os
-import submit_quiz
 
 import time
 
@@ -49,7 +55,13 @@ def quiz(quizzes, RemainingUsage):
 
 def QuizResult(quizResults, RemainingUsage):
     quizResultID = request.args.get('result')
-    results = quizResults.get(quizResultID , '') if quizResultID else ''
+    results = ''
+
+    if current_user.is_authenticated and quizResultID:
+        results = GetQueryFromDB(quizResultID , 'quiz-submissions') or ''
+
+    if not results:
+        results = quizResults.get(quizResultID , '') if quizResultID else ''
     print("READ", quizResultID, "found:", bool(results))
     return render_template("Quiz Generator/QuizResult.html" , results=results, remaining=RemainingUsage())
 
@@ -62,133 +74,264 @@ def submitResult(quizResults: dict):
     if not quiz:
         return jsonify({'error': 'No quiz data'}), 400
     
-    result_data = submit_quiz.submit_quiz.submit_result(quiz, user_answers)
+    result_data = submit_result(quiz, user_answers)
     end = time.perf_counter()
     Log(f"Parsing Time: {end - start:0.6f}s" , "info")
-    
-    return jsonify({"id": StoreTempQuery(result_data , quizResults)})
+    ObserveParser("submit_quiz" , end - start)
 
-def QuizGen(prompts: dict , quizzes: dict):
-    data: dict = request.get_json()
+    try:
+        resultID = RecordSubmission(quiz , result_data)
+    except Exception as e:
+        Log(f"Failed to record quiz submission: {str(e)}" , "error")
+        resultID = None
+
+    return jsonify({"id": resultID or StoreTempQuery(result_data , quizResults)})
+
+def QuizStatistics(quizzes: dict):
+    """Item analysis over every submission of the quiz ?id= points to, by anyone who has it."""
+    quizID = request.args.get('id')
+    quiz = GetQueryFromDB(quizID , 'quizzes') if quizID else None
+
+    if not quiz:
+        quiz = quizzes.get(quizID) if quizID else None
+
+    if not quiz or not isinstance(quiz , dict):
+        return jsonify({"error": "Quiz not found"}), 404
+
+    return jsonify(QuizStats(quiz))
+
+def QuizParams(data: dict) -> dict:
+    """Settings a stored quiz has to match before it's reused for other notes."""
+    return {"language": data["language"], "difficulty": data["difficulty"], "amount": str(data["questionCount"]), **ModelParams(data)}
+
+def ReuseQuiz(data: dict , quizzes: dict):
+    reused = FindReusableQuery("quiz" , data["notes"] , QuizParams(data))
+    if reused is None:
+        return None
+
+    quiz , similarity = reused
+    return jsonify({**StoreQuiz(quiz , quizzes).get_json(), "reused": True, "similarity": round(similarity , 2)})
+
+def PrepareQuizRequest(prompts: dict , data: dict , quizzes: dict , structured: bool = True):
+    """Returns (early response, None) or (None, list of AiReq args, one per notes chunk).
+
+    A quiz already made from near-identical notes is the early response,
+    unless the client sent forceNew. structured=False keeps the text format
+    even with AI_STRUCTURED_OUTPUT on, for callers that parse as it streams.
+    """
     IS_FREE = data["isFree"]
     NOTES = data["notes"]
     LANGUAGE = data["language"]
     AMOUNT = data["questionCount"]
     API_MODE = data["apiMode"]
     DIFFICULTY = data["difficulty"]
-    MODEL = data.get("model" , False)
-
-    IsReasoning = False
 
     if IS_FREE:
         with current_app.app_context():
             if not current_user.is_authenticated:
                 Log("User not logined in." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html") , None
 
             usage = GetUsage()
             convertedResp = usage.get_json()
             if convertedResp["timesUsed"] >= 3:
                 Log("Daily limit reached." , "error")
-                return render_template("pages/dailyLimit.html", remaining=0)
+                return render_template("pages/dailyLimit.html", remaining=0) , None
 
-        IncrementUsage()
+    if not data.get("forceNew" , False):
+        reused = ReuseQuiz(data , quizzes)
+        if reused is not None:
+            return reused , None
 
-    if MODEL:
-        MODEL = MODEL.strip()
-        IsReasoning = any(x in MODEL.lower() for x in ["gpt-5", "o1"])
+    if IS_FREE and not ReserveUsage():
+        Log("Daily limit reached." , "error")
+        return render_template("pages/dailyLimit.html", remaining=0) , None
 
     API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
     
-    if API_MODE == "Hugging Face": 
-        API_URL = "https://router.huggingface.co/v1/chat/completions" 
-    elif API_MODE == "Gemini":
-        API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-    else:
-        API_URL = "https://api.openai.com/v1/chat/completions"
-
-    if API_MODE == "Hugging Face":
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-    elif API_MODE == "OpenAI":
-        headers = {
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        }
-    else: 
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": API_KEY
-        }
-
-    PROMPT = prompts['quiz']
+    provider = GetProvider(API_MODE)
+    structured = structured and UseStructuredOutput(provider , prompts , 'quiz')
+
+    PROMPT = prompts['quizJson' if structured else 'quiz']
 
     if PROMPT == None:
-        return jsonify({'quiz': 'Internal Error: PROMPT NOT FOUND'})
-    else:
-        PROMPT = PROMPT.format(NOTES=NOTES , LANGUAGE=LANGUAGE, AMOUNT=AMOUNT , DIFFICULTY=DIFFICULTY)
-
-    if API_MODE == "Hugging Face":
-        payload = {
-            "messages": [{"role": "user", "content": PROMPT}],
-            "model": data.get("model") or "openai/gpt-oss-20b"
-        }
-    elif API_MODE == "OpenAI":
-        payload = {
-            "model": MODEL if MODEL else "gpt-4.1-nano",
-            "messages": [{"role": "user", "content": PROMPT}],
-        }
-    elif API_MODE == "Gemini":
-        payload = {
-            "contents": [{
-                "role": "user",
-                "parts": [{"text": PROMPT}]
-            }]
-        }
-
-    if IsReasoning:
-        payload["max_completion_tokens"] = 4096
-    elif API_MODE == "Gemini":
-        pass  
+        return jsonify({'quiz': 'Internal Error: PROMPT NOT FOUND'}) , None
+
+    options = RequestOptions(data , API_KEY)
+    config = GetChunkConfig()
+
+    # Long notes are split so each call asks for its share of the questions
+    return None , [
+        provider.BuildRequest(
+            FormatPrompt(PROMPT , NOTES=chunk , LANGUAGE=LANGUAGE, AMOUNT=amount , DIFFICULTY=DIFFICULTY),
+            {**options, "schema": OutputSchema("quiz" , int(amount))} if structured else options
+        )
+        for chunk , amount in ChunkNotes(NOTES , AMOUNT , config["maxChars"] , config["maxChunks"])
+    ]
+
+def StoreQuiz(quiz: dict , quizzes: dict , data: Optional[dict] = None , raw: Optional[dict] = None):
+    """data is the request the quiz was generated for, its notes get fingerprinted for reuse.
+    raw is the model output it was parsed from, stored for reparsing."""
+    queryRes = None
+
+    if len(quiz) == 0:
+        Log("Failed to parse quiz. (empty)" , "error")
     else:
-        payload["max_tokens"] = 4096
-        payload["temperature"] = data.get("temperature", 0.3)
-        payload["top_p"] = data.get("top_p", 0.9)
+        if current_user.is_authenticated:
+            queryRes = StoreQuery("quiz" , quiz , raw)
+            if data is not None:
+                RememberQuery("quiz" , queryRes , data["notes"] , QuizParams(data))
+        else:
+            queryRes = StoreTempQuery(quiz , quizzes)
 
-    if payload and API_MODE == "Hugging Face": print(f"Model: {payload["model"]}") 
+    return jsonify({'id': queryRes})
 
-    start = time.perf_counter()
-    output = AiReq(API_URL , headers , payload , API_MODE)
-    end = time.perf_counter()
+def ParseQuiz(output: str) -> dict:
+    """Schema replies are decoded, everything else goes through the text parser."""
+    quiz = DecodeOutput("quiz" , output)
+    return parse_quiz(output) if quiz is None else quiz
 
+def FinishQuiz(output , quizzes: dict , data: Optional[dict] = None):
     if (output is None):
         return jsonify({"quiz": "Internal Error."})
 
-    Log(f"Got AI response, time: {end - start:.6f}s. checking if success..." , "info")
+    raw = None
 
     if output in standardApiErrors:
-        output = standardApiErrors[output]
+        output , data = standardApiErrors[output] , None
     elif output in moreApiErrors:
-        output = moreApiErrors[output]
+        output , data = moreApiErrors[output] , None
     else:
         Log("Generated quiz. Parsing..." , "success")
+        raw = {"outputs": [output]}
 
     start = time.perf_counter()
-    quiz = parse_quiz(output)
+    quiz = ParseQuiz(output)
     end = time.perf_counter()
 
     Log(f"Parsing Time: {end - start:0.6f}s" , "info")
+    ObserveParser("quiz" , end - start)
 
-    queryRes = None
+    return StoreQuiz(quiz , quizzes , data , raw)
 
-    if len(quiz) == 0:
-        Log("Failed to parse quiz. (empty)" , "error")
-    else:
-        if current_user.is_authenticated:
-            queryRes = StoreQuery("quiz" , quiz)
-        else:
-            queryRes = StoreTempQuery(quiz , quizzes)
+def FinishQuizChunks(outputs: list , quizzes: dict , amount: int , data: Optional[dict] = None):
+    parsed = []
+    usable = []
+    for output in outputs:
+        if output and output not in standardApiErrors and output not in moreApiErrors:
+            start = time.perf_counter()
+            parsed.append(ParseQuiz(output))
+            ObserveParser("quiz" , time.perf_counter() - start)
+            usable.append(output)
+    quiz = MergeQuizzes(parsed , amount)
 
-    return jsonify({'id': queryRes})
+    if not quiz:
+        # No chunk produced anything usable, report it like a single request would
+        return FinishQuiz(next((output for output in outputs if output is not None) , None) , quizzes)
+
+    Log(f"Merged {len(quiz)} questions from {len(parsed)}/{len(outputs)} chunks." , "success")
+
+    return StoreQuiz(quiz , quizzes , data , {"outputs": usable, "limit": amount})
+
+def QuizGen(prompts: dict , quizzes: dict):
+    data: dict = request.get_json()
+
+    early , aiRequests = PrepareQuizRequest(prompts , data , quizzes)
+    if early is not None:
+        return early
+
+    cache = CacheIfParsed(ParseQuiz) if not data.get("forceNew" , False) else False
+    start = time.perf_counter()
+
+    if len(aiRequests) > 1:
+        outputs = AiReqMany(aiRequests , cache=cache)
+        Log(f"Got {len(outputs)} chunk responses, time: {time.perf_counter() - start:.6f}s." , "info")
+        return FinishQuizChunks(outputs , quizzes , int(data["questionCount"]) , data)
+
+    output = AiReq(*aiRequests[0] , cache=cache)
+    end = time.perf_counter()
+
+    Log(f"Got AI response, time: {end - start:.6f}s. checking if success..." , "info")
+
+    return FinishQuiz(output , quizzes , data)
+
+async def QuizGenAsync(prompts: dict , quizzes: dict):
+    data: dict = request.get_json()
+
+    early , aiRequests = PrepareQuizRequest(prompts , data , quizzes)
+    if early is not None:
+        return early
+
+    cache = CacheIfParsed(ParseQuiz) if not data.get("forceNew" , False) else False
+    start = time.perf_counter()
+
+    if len(aiRequests) > 1:
+        outputs = await AsyncAiReqMany(aiRequests , cache=cache)
+        Log(f"Got {len(outputs)} chunk responses, time: {time.perf_counter() - start:.6f}s." , "info")
+        return FinishQuizChunks(outputs , quizzes , int(data["questionCount"]) , data)
+
+    output = await AsyncAiReq(*aiRequests[0] , cache=cache)
+    end = time.perf_counter()
+
+    Log(f"Got AI response, time: {end - start:.6f}s. checking if success..." , "info")
+
+    return FinishQuiz(output , quizzes , data)
+
+def QuizGenStream(prompts: dict , quizzes: dict):
+    """Sends each question as a "question" event once the model has finished it, then "done" with the stored quiz ID."""
+    data: dict = request.get_json()
+
+    early , aiRequests = PrepareQuizRequest(prompts , data , quizzes , structured=False)
+    if early is not None:
+        return early
+
+    cache = CacheIfParsed(ParseQuiz) if not data.get("forceNew" , False) else False
+
+    if len(aiRequests) > 1:
+        # Chunks are generated side by side, answer like the regular endpoint
+        return FinishQuizChunks(AiReqMany(aiRequests , cache=cache) , quizzes , int(data["questionCount"]) , data)
+
+    def events():
+        parser = QuizStreamParser()
+        quiz = {}
+        output = []
+        received = False
+        parseTime = 0.0
+
+        for chunk in AiReqStream(*aiRequests[0] , cache=cache):
+            if chunk is None:
+                yield FormatSSE("error" , {"message": "Internal Error."})
+                return
+
+            if not received and (chunk in standardApiErrors or chunk in moreApiErrors):
+                # Stored as the usual explanation quiz
+                yield FormatSSE("done" , FinishQuiz(chunk , quizzes).get_json())
+                return
+            received = True
+            output.append(chunk)
+
+            start = time.perf_counter()
+            questions = parser.feed(chunk)
+            parseTime += time.perf_counter() - start
+
+            for number , question in questions.items():
+                quiz[number] = question
+                yield FormatSSE("question" , {"number": number, "question": question})
+
+        for number , question in parser.finish().items():
+            quiz[number] = question
+            yield FormatSSE("question" , {"number": number, "question": question})
+
+        Log(f"Streamed {len(quiz)} questions, parsing time: {parseTime:0.6f}s" , "info")
+        ObserveParser("quiz" , parseTime)
+
+        yield FormatSSE("done" , StoreQuiz(quiz , quizzes , data , {"outputs": ["".join(output)]}).get_json())
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 def ImportQuiz(quizzes: dict) -> None:
     file = request.files.get("quizFile")      
@@ -0,0 +1,83 @@
+from datetime import datetime
+from itertools import islice
+from pymongo import UpdateOne
+from routes.parsers import parse_quiz_many , parse_study_plan_many
+from routes.chunking import MergeQuizzes
+from routes.structuredOutput import DecodeOutput
+from routes.utils import GetMongoClient , Log
+
+def ParseMany(kind: str , outputs: list , parseMany) -> list:
+    """Schema replies are decoded, the text ones of the batch go through a single parseMany call."""
+    decoded = [DecodeOutput(kind , output) for output in outputs]
+    parsed = iter(parseMany([output for output , result in zip(outputs , decoded) if result is None]))
+    return [next(parsed) if result is None else result for result in decoded]
+
+def RebuildQuizzes(raws: list[dict]) -> list:
+    """Chunked quizzes are merged again like FinishQuizChunks does."""
+    outputs = [output for raw in raws for output in raw["outputs"]]
+    parsed = iter(ParseMany("quiz" , outputs , parse_quiz_many))
+
+    quizzes = []
+    for raw in raws:
+        pieces = list(islice(parsed , len(raw["outputs"])))
+        if raw.get("limit") is not None:
+            quizzes.append(MergeQuizzes(pieces , raw["limit"]))
+        else:
+            quizzes.append(pieces[0] if pieces else {})
+
+    return quizzes
+
+def RebuildStudyPlans(raws: list[dict]) -> list:
+    return ParseMany("plan" , [raw["outputs"][0] for raw in raws] , parse_study_plan_many)
+
+# collection -> rebuild function
+REPARSERS = {
+    "quizzes": RebuildQuizzes,
+    "study-plans": RebuildStudyPlans
+}
+
+def Batches(cursor , size: int):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def Reparse(collection: str , batchSize: int = 500 , dryRun: bool = False) -> dict:
+    """
+    Runs the current parsers over the raw model output stored with each
+    query and rewrites the ones whose parsed result changed. An empty result
+    never overwrites a stored one.
+    """
+    rebuild = REPARSERS[collection]
+    coll = GetMongoClient()["EduDuck"][collection]
+
+    cursor = coll.find(
+        {"raw.outputs.0": {"$exists": True}, "deleted": {"$ne": True}},
+        {"raw": 1, "query": 1}
+    ).batch_size(batchSize)
+
+    stats = {"scanned": 0, "changed": 0, "empty": 0}
+
+    for batch in Batches(cursor , batchSize):
+        rebuilt = rebuild([doc["raw"] for doc in batch])
+        updates = []
+
+        for doc , query in zip(batch , rebuilt):
+            if not query:
+                stats["empty"] += 1
+            elif query != doc.get("query"):
+                updates.append(UpdateOne({"_id": doc["_id"]} , {"$set": {"query": query, "reparsedAt": datetime.utcnow()}}))
+
+        stats["scanned"] += len(batch)
+        stats["changed"] += len(updates)
+
+        if updates and not dryRun:
+            coll.bulk_write(updates , ordered=False)
+
+        Log(f"Reparsed {stats['scanned']} {collection}, {stats['changed']} changed." , "info")
+
+    return stats
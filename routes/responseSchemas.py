@@ -0,0 +1,59 @@
+from typing import Optional
+import msgspec
+
+# Only the fields we read are declared. msgspec skips everything else
+# (logprobs, safety ratings, reasoning text, most of usage) while scanning
+# instead of building dicts for it. gc=False: decoded replies never form cycles.
+# Fields the old dict walk indexed directly stay required, so a reply
+# missing them fails validation and takes the same error path as before.
+
+class ChatMessage(msgspec.Struct, gc=False):
+    content: Optional[str]
+
+class ChatChoice(msgspec.Struct, gc=False):
+    message: ChatMessage
+
+class PromptTokensDetails(msgspec.Struct, gc=False):
+    cached_tokens: int = 0
+
+class ChatUsage(msgspec.Struct, gc=False):
+    prompt_tokens: int = 0
+    prompt_tokens_details: Optional[PromptTokensDetails] = None
+
+class ChatCompletion(msgspec.Struct, gc=False):
+    """OpenAI /v1/chat/completions, also served by the Hugging Face router."""
+    choices: list[ChatChoice] = []
+    usage: Optional[ChatUsage] = None
+
+class ResponsesContent(msgspec.Struct, gc=False):
+    type: str = ""
+    text: str = ""
+
+class ResponsesItem(msgspec.Struct, gc=False):
+    content: list[ResponsesContent] = []
+
+class ResponsesReply(msgspec.Struct, gc=False):
+    """OpenAI /v1/responses, used for OCR."""
+    output: list[ResponsesItem] = []
+
+class GeminiPart(msgspec.Struct, gc=False):
+    text: str
+
+class GeminiContent(msgspec.Struct, gc=False):
+    parts: list[GeminiPart]
+
+class GeminiCandidate(msgspec.Struct, gc=False):
+    content: GeminiContent
+
+class GeminiUsage(msgspec.Struct, gc=False):
+    promptTokenCount: int = 0
+    cachedContentTokenCount: int = 0
+
+class GeminiReply(msgspec.Struct, gc=False):
+    """Gemini models/*:generateContent."""
+    candidates: list[GeminiCandidate] = []
+    usageMetadata: Optional[GeminiUsage] = None
+
+CHAT_DECODER = msgspec.json.Decoder(ChatCompletion)
+RESPONSES_DECODER = msgspec.json.Decoder(ResponsesReply)
+GEMINI_DECODER = msgspec.json.Decoder(GeminiReply)
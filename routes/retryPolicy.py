@@ -0,0 +1,107 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime , timezone
+from typing import Optional
+import json
+import random
+import re
+
+# Statuses that mean the provider rejected the request without running it,
+# so sending it again can't bill or generate twice. 500/502/504 may have
+# been half-processed upstream and are left to the hedge instead.
+RETRY_STATUSES = {429, 503}
+
+_durationPart = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_durationUnits = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def ParseDuration(value) -> Optional[float]:
+    """Seconds from "12", "1.5", "250ms", "37s" or Go-style "6m0s"."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _durationPart.findall(value)
+    if not parts or "".join(number + unit for number , unit in parts) != value:
+        return None
+    return sum(float(number) * _durationUnits[unit] for number , unit in parts)
+
+def _RetryAfterHeader(value) -> Optional[float]:
+    seconds = ParseDuration(value)
+    if seconds is not None or not isinstance(value, str):
+        return seconds
+
+    try:
+        # Retry-After may also be an HTTP date
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _GeminiRetryDelay(body: bytes) -> Optional[float]:
+    try:
+        details = json.loads(body)["error"]["details"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    for detail in details if isinstance(details, list) else []:
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("RetryInfo"):
+            return ParseDuration(detail.get("retryDelay"))
+    return None
+
+def ParseRetryHint(headers, body: bytes = b"") -> Optional[float]:
+    """How long the provider asked us to wait, from whichever hint it sent."""
+    retryAfterMs = ParseDuration(headers.get("retry-after-ms"))
+    if retryAfterMs is not None:
+        return retryAfterMs / 1000
+
+    retryAfter = _RetryAfterHeader(headers.get("retry-after"))
+    if retryAfter is not None:
+        return retryAfter
+
+    # OpenAI: wait for whichever exhausted budget resets
+    resets = [
+        ParseDuration(headers.get(f"x-ratelimit-reset-{kind}"))
+        for kind in ("requests", "tokens")
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0"
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    if resets:
+        return max(resets)
+
+    return _GeminiRetryDelay(body)
+
+def RetryAfter(status: int , headers , body: bytes = b"") -> Optional[float]:
+    """None if the response must not be retried, otherwise the provider's
+    requested wait in seconds (0 when it gave none)."""
+    if status not in RETRY_STATUSES:
+        return None
+    if status == 429 and b"insufficient_quota" in body:
+        # Out of credits, not rate limited: waiting won't help
+        return None
+    return ParseRetryHint(headers, body) or 0.0
+
+class RetryPolicy:
+    """Decorrelated-jitter backoff, bounded by attempts and the request deadline."""
+
+    def __init__(self, attempts: int = 2, base: float = 0.5, cap: float = 20.0, reserve: float = 2.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        # Time a retry needs left over after sleeping to be worth sending
+        self.reserve = reserve
+
+    def Backoff(self, previous: Optional[float]) -> float:
+        return min(self.cap, random.uniform(self.base, (previous or self.base) * 3))
+
+    def Delay(self, attempt: int , previous: Optional[float] , hint: float , remaining: float) -> Optional[float]:
+        """Seconds to wait before retry number attempt, or None to give up."""
+        if attempt > self.attempts:
+            return None
+
+        delay = max(hint, self.Backoff(previous))
+        if hint > self.cap or delay + self.reserve > remaining:
+            return None
+        return delay
@@ -0,0 +1,52 @@
+from typing import Awaitable , Callable , Any
+import asyncio
+import hashlib
+
+def MakeFlightKey(cacheKey: str , API_URL: str , headers: dict) -> str:
+    # Callers only share a flight when they would also share credentials,
+    # otherwise one user's bad key could hand everyone else an API error.
+    digest = hashlib.sha256(cacheKey.encode("utf-8"))
+    for name in ("Authorization", "x-goog-api-key"):
+        digest.update(b"\0")
+        digest.update(str(headers.get(name, "")).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(API_URL.partition("?")[2].encode("utf-8"))
+    return digest.hexdigest()
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight task.
+
+    Not thread-safe: every call must come from the same event loop.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._inFlight: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inFlight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inFlight
+
+    async def Do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inFlight.get(key)
+
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._inFlight[key] = task
+            task.add_done_callback(lambda _: self._inFlight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shielded so a caller that goes away doesn't cancel the others' request
+        return await asyncio.shield(task)
+
+    def Stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "inFlight": len(self._inFlight)
+        }
@@ -0,0 +1,187 @@
+"""JSON schema replies for the generators.
+
+With AI_STRUCTURED_OUTPUT=1, quiz, flashcard, study plan and note analysis
+requests to providers that support it send the JSON prompt variant
+("quizJson", ...) with a response schema built from the Structs below.
+The reply is decoded straight into them and turned into the dicts the text
+parsers return, so storage and templates don't change. Replies that aren't
+JSON go to the text parsers as before.
+"""
+from functools import lru_cache
+from typing import Annotated , Literal , Optional
+import os
+import msgspec
+
+# Same shapes as parse_quiz, parse_flashcards, parse_study_plan and
+# parse_note_analysis return. Every field is required: OpenAI's strict mode
+# needs that, and a reply missing one fails validation instead of storing holes.
+
+class QuizAnswers(msgspec.Struct , gc=False):
+    a: str
+    b: str
+    c: str
+    d: str
+
+class QuizQuestion(msgspec.Struct , gc=False):
+    question: str
+    answers: QuizAnswers
+    correct: Annotated[Literal["a", "b", "c", "d"] , msgspec.Meta(description="Letter of the correct answer.")]
+
+class QuizOutput(msgspec.Struct , gc=False):
+    questions: list[QuizQuestion]
+
+class Flashcard(msgspec.Struct , gc=False):
+    question: str
+    answer: str
+
+class FlashcardOutput(msgspec.Struct , gc=False):
+    flashcards: list[Flashcard]
+
+class StudyDay(msgspec.Struct , gc=False):
+    day: Annotated[int , msgspec.Meta(description="Day number, starting at 1.")]
+    tasks: str
+
+class StudyPlanOutput(msgspec.Struct , gc=False):
+    days: list[StudyDay]
+
+class AnalysisSection(msgspec.Struct , gc=False):
+    title: str
+    confidence: Annotated[int , msgspec.Meta(description="0-100")]
+    issues: list[str]
+    why_it_matters: list[str]
+    suggestions: list[str]
+
+class NoteAnalysisOutput(msgspec.Struct , gc=False):
+    overall_score: Annotated[int , msgspec.Meta(description="0-100")]
+    sections: list[AnalysisSection]
+
+# kind (StoreQuery name) -> reply type
+OUTPUTS = {
+    "quiz": QuizOutput,
+    "flashcards": FlashcardOutput,
+    "plan": StudyPlanOutput,
+    "note-analysis": NoteAnalysisOutput
+}
+
+_decoders = {kind: msgspec.json.Decoder(output) for kind , output in OUTPUTS.items()}
+_enabled = None
+
+def StructuredOutputEnabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = os.getenv("AI_STRUCTURED_OUTPUT") == "1"
+    return _enabled
+
+def UseStructuredOutput(provider , prompts: dict , promptKey: str) -> bool:
+    """True when the request for prompts[promptKey] should ask provider for a schema reply."""
+    return (
+        StructuredOutputEnabled()
+        and provider.supportsSchema
+        and prompts.get(promptKey + "Json") is not None
+    )
+
+def _Inline(node , defs: dict):
+    """Resolves msgspec's $refs and closes every object, as OpenAI's strict mode requires."""
+    if isinstance(node , list):
+        return [_Inline(item , defs) for item in node]
+    if not isinstance(node , dict):
+        return node
+
+    if "$ref" in node:
+        return _Inline(defs[node["$ref"].rsplit("/" , 1)[-1]] , defs)
+
+    schema = {key: _Inline(value , defs) for key , value in node.items() if key not in ("title" , "$defs")}
+    if "enum" in schema and "type" not in schema:
+        schema["type"] = "string"
+    if schema.get("type") == "object":
+        schema["additionalProperties"] = False
+
+    return schema
+
+@lru_cache(maxsize=64)
+def OutputSchema(kind: str , items: Optional[int] = None) -> dict:
+    """{"name", "schema"} for provider options, shared so don't modify it.
+    items pins the length of the reply's list (questions, flashcards...)."""
+    output = OUTPUTS[kind]
+    generated = msgspec.json.schema(output)
+    schema = _Inline(generated , generated.get("$defs" , {}))
+
+    if items is not None:
+        field = output.__struct_fields__[0]
+        schema["properties"][field] = {**schema["properties"][field], "minItems": items, "maxItems": items}
+
+    return {"name": kind.replace("-" , "_"), "schema": schema}
+
+def GeminiSchema(schema: dict) -> dict:
+    """JSON schema to the OpenAPI subset generationConfig.responseSchema takes."""
+    converted = {}
+    for key , value in schema.items():
+        if key == "additionalProperties":
+            continue
+        if key == "type":
+            value = value.upper()
+        elif key == "properties":
+            value = {name: GeminiSchema(prop) for name , prop in value.items()}
+            converted["propertyOrdering"] = list(value)
+        elif key == "items":
+            value = GeminiSchema(value)
+        converted[key] = value
+    return converted
+
+def JsonSchema(schema: dict) -> dict:
+    """Inverse of GeminiSchema, so a Gemini request's schema can be sent elsewhere."""
+    converted = {}
+    for key , value in schema.items():
+        if key == "propertyOrdering":
+            continue
+        if key == "type":
+            value = value.lower()
+        elif key == "properties":
+            value = {name: JsonSchema(prop) for name , prop in value.items()}
+        elif key == "items":
+            value = JsonSchema(value)
+        converted[key] = value
+    if converted.get("type") == "object":
+        converted["additionalProperties"] = False
+    return converted
+
+def _Questions(reply: QuizOutput) -> dict:
+    questions = {}
+    for question in reply.questions:
+        answers = msgspec.structs.asdict(question.answers)
+        if question.question.strip() and all(answer.strip() for answer in answers.values()):
+            questions[str(len(questions) + 1)] = {"question": question.question, "answers": answers, "correct": question.correct}
+    return questions
+
+def _Flashcards(reply: FlashcardOutput) -> list:
+    return [
+        {"question": card.question, "answer": card.answer}
+        for card in reply.flashcards if card.question.strip() and card.answer.strip()
+    ]
+
+def _StudyPlan(reply: StudyPlanOutput) -> list:
+    # Labels as parse_study_plan cuts them out of "Day N: ..."
+    return [{"day": f"Day {day.day}:", "tasks": day.tasks} for day in reply.days]
+
+def _NoteAnalysis(reply: NoteAnalysisOutput) -> dict:
+    return msgspec.to_builtins(reply)
+
+_converters = {
+    "quiz": _Questions,
+    "flashcards": _Flashcards,
+    "plan": _StudyPlan,
+    "note-analysis": _NoteAnalysis
+}
+
+def DecodeOutput(kind: str , output: str):
+    """The parsed result of a schema reply, None if output isn't one (the caller then runs the text parser)."""
+    if not output or not output.lstrip().startswith("{"):
+        return None
+
+    try:
+        reply = _decoders[kind].decode(output)
+    except (msgspec.ValidationError , msgspec.DecodeError) as e:
+        print(f"Invalid structured {kind} reply: {e}")
+        return None
+
+    return _converters[kind](reply)
@@ -0,0 +1,201 @@
+from flask import render_template , request , jsonify , current_app
+from flask_login import current_user
+from routes.parsers import parse_quiz , parse_study_plan
+from routes.utils import AiReq , AsyncAiReq , CacheIfParsed , ReserveUsage , StoreQuery , StoreTempQuery , Log , GetUserDoc
+from routes.providers import GetProvider , RequestOptions
+from routes.promptTemplates import FormatPrompt
+from routes.flashcardGenerator import ParseFlashcards
+from routes.noteAnalyzer import ParseNoteAnalysis
+from routes.metrics import TimedParser
+import os
+import re
+import time
+
+standardApiErrors = {
+    "API error 402": "Free credits exhausted. Please check your API plan.",
+    "API error 401": "Invalid or missing API key."
+}
+
+moreApiErrors = {
+    "API error 429": "Rate limit exceeded. Please try again later.",
+    "API error 503": "Service unavailable. Please try again later.",
+    "Model not loaded": "The model is still loading. Please try again shortly.",
+    "Request timeout": "The server took too long to respond.",
+    "API error 400": "Bad request. The input data may be malformed."
+}
+
+# artifact -> (section marker, prompt key, StoreQuery name)
+ARTIFACTS = {
+    "notes": ("NOTES", "studyPackNotes", "notes"),
+    "quiz": ("QUIZ", "studyPackQuiz", "quiz"),
+    "flashcards": ("FLASHCARDS", "studyPackFlashcards", "flashcards"),
+    "analysis": ("ANALYSIS", "studyPackAnalysis", "note-analysis"),
+    "plan": ("PLAN", "studyPackPlan", "plan")
+}
+
+DEFAULT_ARTIFACTS = ["notes", "quiz", "flashcards", "analysis"]
+
+# Four artifacts don't fit in the 4096 tokens a single generator gets
+STUDY_PACK_MAX_TOKENS = 16384
+
+_sectionMarker = re.compile(r"^[ \t]*=+[ \t]*(NOTES|QUIZ|FLASHCARDS|ANALYSIS|PLAN)[ \t]*=+[ \t]*$", re.M)
+
+def SplitStudyPack(output: str) -> dict:
+    """Splits the delimited provider output into {marker: section text}."""
+    sections = {}
+    matches = list(_sectionMarker.finditer(output))
+
+    for i , match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(output)
+        text = output[match.end():end].strip()
+        if text:
+            sections[match.group(1)] = text
+
+    return sections
+
+def ParseStudyPack(sections: dict , artifacts: list) -> dict:
+    """Feeds each section to the parser the standalone generator uses."""
+    parsers = {
+        "notes": lambda text: text,
+        "quiz": TimedParser("quiz")(parse_quiz),
+        "flashcards": ParseFlashcards,
+        "analysis": lambda text: ParseNoteAnalysis(text) if "SECTION:" in text else None,
+        "plan": TimedParser("study_plan")(parse_study_plan)
+    }
+
+    parsed = {}
+    for artifact in artifacts:
+        text = sections.get(ARTIFACTS[artifact][0])
+        if not text:
+            Log(f"Study pack is missing its {artifact} section." , "warn")
+            continue
+
+        start = time.perf_counter()
+        result = parsers[artifact](text)
+        end = time.perf_counter()
+        Log(f"Parsed study pack {artifact} in {end - start:.6f}s" , "info")
+
+        if result:
+            parsed[artifact] = result
+
+    return parsed
+
+def PrepareStudyPackRequest(prompts: dict , data: dict):
+    """Returns (early response, None) or (None, (AiReq args, artifacts))."""
+    IS_FREE = data.get("isFree" , False)
+    NOTES = data["notes"]
+    LANGUAGE = data["language"]
+    API_MODE = data["apiMode"]
+
+    artifacts = [artifact for artifact in data.get("artifacts") or DEFAULT_ARTIFACTS if artifact in ARTIFACTS]
+    if not (data.get("startDate") and data.get("endDate")):
+        # A plan needs a date range to lay the days out on
+        artifacts = [artifact for artifact in artifacts if artifact != "plan"]
+    if not artifacts:
+        return jsonify({"error": "No study pack artifacts requested."}) , None
+
+    if IS_FREE:
+        with current_app.app_context():
+            if not current_user.is_authenticated:
+                Log("User not logined in." , "error")
+                return render_template("pages/loginRequired.html") , None
+
+            userData = GetUserDoc()
+            if not userData:
+                Log("User account not found." , "error")
+                return render_template("pages/loginRequired.html") , None
+
+            times_used = userData.get("daily_usage", {}).get("timesUsed", 0)
+            if times_used >= 3:
+                Log("Daily limit reached." , "error")
+                return render_template("pages/dailyLimit.html", remaining=0) , None
+
+        if not ReserveUsage():
+            Log("Daily limit reached." , "error")
+            return render_template("pages/dailyLimit.html", remaining=0) , None
+
+    API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
+
+    PROMPT = prompts.get("studyPack")
+    if PROMPT is None or any(prompts.get(ARTIFACTS[artifact][1]) is None for artifact in artifacts):
+        return jsonify({"error": "Internal Error: PROMPT NOT FOUND"}) , None
+
+    sections = "\n\n".join(
+        prompts[ARTIFACTS[artifact][1]].format(
+            AMOUNT=data.get("questionCount" , 10),
+            DIFFICULTY=data.get("difficulty" , "medium"),
+            CARDS=data.get("amount" , 10),
+            START_DATE=data.get("startDate"),
+            END_DATE=data.get("endDate"),
+            HOURS_PER_DAY=data.get("hoursPerDay"),
+            LEARNING_STYLES=", ".join(data.get("learningStyles" , [])),
+            GOAL=data.get("goal" , "")
+        )
+        for artifact in artifacts
+    )
+    PROMPT = FormatPrompt(PROMPT , NOTES=NOTES , LANGUAGE=LANGUAGE , SECTIONS=sections)
+
+    options = RequestOptions(data , API_KEY)
+    options["maxTokens"] = STUDY_PACK_MAX_TOKENS
+
+    return None , (GetProvider(API_MODE).BuildRequest(PROMPT , options) , artifacts)
+
+def FinishStudyPack(output , artifacts: list , stores: dict):
+    if output is None:
+        return jsonify({"error": "Internal Error."})
+
+    if output in standardApiErrors:
+        return jsonify({"error": standardApiErrors[output]})
+    if output in moreApiErrors:
+        return jsonify({"error": moreApiErrors[output]})
+
+    sections = SplitStudyPack(output)
+    parsed = ParseStudyPack(sections , artifacts)
+
+    if not parsed:
+        Log("Failed to parse study pack. (empty)" , "error")
+        return jsonify({"error": "Could not parse study pack output."})
+
+    ids = {}
+    for artifact in artifacts:
+        if artifact not in parsed:
+            ids[artifact] = None
+        elif current_user.is_authenticated:
+            # Quiz and plan sections are kept for `flask reparse`
+            raw = {"outputs": [sections[ARTIFACTS[artifact][0]]]} if artifact in ("quiz" , "plan") else None
+            ids[artifact] = StoreQuery(ARTIFACTS[artifact][2] , parsed[artifact] , raw)
+        else:
+            ids[artifact] = StoreTempQuery(parsed[artifact] , stores[artifact])
+
+    Log(f"Stored study pack: {ids}" , "success")
+
+    return jsonify({"ids": ids})
+
+def StudyPackCache(data: dict , artifacts: list):
+    if data.get("forceNew" , False):
+        return False
+    return CacheIfParsed(lambda output: ParseStudyPack(SplitStudyPack(output) , artifacts))
+
+def StudyPackGen(prompts: dict , stores: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareStudyPackRequest(prompts , data)
+    if early is not None:
+        return early
+
+    aiArgs , artifacts = aiRequest
+    output = AiReq(*aiArgs , cache=StudyPackCache(data , artifacts))
+
+    return FinishStudyPack(output , artifacts , stores)
+
+async def StudyPackGenAsync(prompts: dict , stores: dict):
+    data: dict = request.get_json()
+
+    early , aiRequest = PrepareStudyPackRequest(prompts , data)
+    if early is not None:
+        return early
+
+    aiArgs , artifacts = aiRequest
+    output = await AsyncAiReq(*aiArgs , cache=StudyPackCache(data , artifacts))
+
+    return FinishStudyPack(output , artifacts , stores)
@@ -1,14 +1,17 @@
 from flask import render_template , request , jsonify , send_file , url_for , current_app
 from flask_login import current_user
-from routes.utils import AiReq , IncrementUsage , StoreTempQuery , StoreQuery , GetQueryFromDB , Log , GetMongoClient
+from routes.utils import AiReq , AsyncAiReq , CacheIfParsed , ReserveUsage , StoreTempQuery , StoreQuery , GetQueryFromDB , Log , GetUserDoc
+from routes.providers import GetProvider, RequestOptions
+from routes.promptTemplates import FormatPrompt
+from routes.metrics import ObserveParser
 import os , re
 from io import BytesIO
 from json import dumps , JSONDecodeError , load
 from uuid import uuid4
-from bson import ObjectId
 from requests import post
+from routes.parsers import parse_study_plan
+from routes.structuredOutput import UseStructuredOutput , OutputSchema , DecodeOutput
 
-import study_plan_parser
 import time
 
 standardApiErrors = {
@@ -24,14 +27,13 @@ moreApiErrors = {
     "API error 400": "Bad request. The input data may be malformed or missing required fields."
 }
 
-def StudyPlanGen(prompts: dict , studyPlans: dict):
-    data = request.get_json()
+def PrepareStudyPlanRequest(prompts: dict, data: dict):
+    """Returns (early response, None) or (None, AiReq args)."""
     
     IS_FREE = data["isFree"]
     NOTES = data["notes"]
     LANGUAGE = data["language"]
     API_MODE = data["apiMode"]
-    MODEL = data.get("model", False)
 
     START_DATE = data.get("startDate")
     END_DATE = data.get("endDate")
@@ -39,51 +41,40 @@ def StudyPlanGen(prompts: dict , studyPlans: dict):
     LEARNING_STYLES = data.get("learningStyles", [])
     GOAL = data.get("goal", "")
 
-    IsReasoning = False
-
     if IS_FREE:
         with current_app.app_context():
             if not current_user.is_authenticated:
                 Log("User not logined in." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html"), None
 
-            userData = GetMongoClient()["EduDuck"]["users"].find_one({"_id": ObjectId(current_user.id)})
+            userData = GetUserDoc()
             if not userData:
                 Log("User account not found." , "error")
-                return render_template("pages/loginRequired.html")
+                return render_template("pages/loginRequired.html"), None
 
             times_used = userData.get("daily_usage", {}).get("timesUsed", 0)
             if times_used >= 3:
                 Log("Daily limit reached." , "error")
-                return render_template("pages/dailyLimit.html", remaining=0)
-
-        IncrementUsage()
+                return render_template("pages/dailyLimit.html", remaining=0), None
 
-    if MODEL:
-        MODEL = MODEL.strip()
-        IsReasoning = any(x in MODEL.lower() for x in ["gpt-5", "o1"])
+        if not ReserveUsage():
+            Log("Daily limit reached." , "error")
+            return render_template("pages/dailyLimit.html", remaining=0), None
 
     API_KEY = data["apiKey"] if not IS_FREE else os.getenv("FREE_TIER_API_KEY")
 
-    if API_MODE == "Hugging Face":
-        API_URL = "https://router.huggingface.co/v1/chat/completions"
-    elif API_MODE == "Gemini":
-        API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={API_KEY}"
-    else:
-        API_URL = "https://api.openai.com/v1/chat/completions"
-
-    if API_MODE == "Hugging Face":
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-    elif API_MODE == "OpenAI":
-        headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-    else:
-        headers = {"Content-Type": "application/json", "x-goog-api-key": API_KEY}
+    provider = GetProvider(API_MODE)
+    structured = UseStructuredOutput(provider, prompts, "studyPlan")
+    options = RequestOptions(data, API_KEY)
+    if structured:
+        options["schema"] = OutputSchema("plan")
 
-    PROMPT = prompts.get("studyPlan")
+    PROMPT = prompts.get("studyPlanJson" if structured else "studyPlan")
     if PROMPT is None:
-        return jsonify({"plan": "Internal Error: PROMPT NOT FOUND"})
+        return jsonify({"plan": "Internal Error: PROMPT NOT FOUND"}), None
     else:
-        PROMPT = PROMPT.format(
+        PROMPT = FormatPrompt(
+            PROMPT,
             NOTES=NOTES,
             LANGUAGE=LANGUAGE,
             START_DATE=START_DATE,
@@ -93,52 +84,35 @@ def StudyPlanGen(prompts: dict , studyPlans: dict):
             GOAL=GOAL
         )
 
-    if API_MODE == "Hugging Face":
-        payload = {
-            "messages": [{"role": "user", "content": PROMPT}],
-            "model": MODEL or "openai/gpt-oss-20b"
-        }
-    elif API_MODE == "OpenAI":
-        payload = {
-            "model": MODEL or "gpt-4.1-nano",
-            "messages": [{"role": "user", "content": PROMPT}],
-        }
-    elif API_MODE == "Gemini":
-        payload = {
-            "contents": [{"role": "user", "parts": [{"text": PROMPT}]}]
-        }
-
-    if IsReasoning:
-        payload["max_completion_tokens"] = 4096
-    elif API_MODE == "Gemini":
-        pass
-    else:
-        payload["max_tokens"] = 4096
-        payload["temperature"] = data.get("temperature", 0.3)
-        payload["top_p"] = data.get("top_p", 0.9)
-
-    if payload and API_MODE == "Hugging Face":
-        print(f"Model: {payload['model']}")
+    return None, provider.BuildRequest(PROMPT, options)
 
-    output = AiReq(API_URL, headers, payload, API_MODE)
+def ParseStudyPlan(output: str) -> list:
+    """Schema replies are decoded, everything else goes through the text parser."""
+    plan = DecodeOutput("plan", output)
+    return parse_study_plan(output) if plan is None else plan
 
+def FinishStudyPlan(output, studyPlans: dict):
     if output is None or "{ 'error': }" in output:
         return jsonify({"plan": "Internal Error."})
 
     Log("Got AI response, checking if success..." , "info")
 
+    raw = None
+
     if output in standardApiErrors:
         output = standardApiErrors[output]
     elif output in moreApiErrors:
         output = moreApiErrors[output]
     else:
         Log("Generated study plan. Parsing..." , "success")
+        raw = {"outputs": [output]}
 
     start = time.perf_counter()
-    plan = study_plan_parser.parse_study_plan(output)
+    plan = ParseStudyPlan(output)
     end = time.perf_counter()
 
     Log(f"Parsing took: {end - start:.6f} seconds", "info")
+    ObserveParser("study_plan" , end - start)
 
     queryRes = None
 
@@ -146,12 +120,34 @@ def StudyPlanGen(prompts: dict , studyPlans: dict):
         Log("Failed to parse study plan. (empty)" , "error")
     else:
         if current_user.is_authenticated:
-            queryRes = StoreQuery("plan" , plan)
+            queryRes = StoreQuery("plan" , plan , raw)
         else:
             queryRes = StoreTempQuery(plan , studyPlans)
 
     return jsonify({'id': queryRes})
 
+def StudyPlanGen(prompts: dict, studyPlans: dict):
+    data: dict = request.get_json()
+
+    early, aiRequest = PrepareStudyPlanRequest(prompts, data)
+    if early is not None:
+        return early
+
+    output = AiReq(*aiRequest, cache=CacheIfParsed(ParseStudyPlan) if not data.get("forceNew", False) else False)
+
+    return FinishStudyPlan(output, studyPlans)
+
+async def StudyPlanGenAsync(prompts: dict, studyPlans: dict):
+    data: dict = request.get_json()
+
+    early, aiRequest = PrepareStudyPlanRequest(prompts, data)
+    if early is not None:
+        return early
+
+    output = await AsyncAiReq(*aiRequest, cache=CacheIfParsed(ParseStudyPlan) if not data.get("forceNew", False) else False)
+
+    return FinishStudyPlan(output, studyPlans)
+
 def StudyPlan(studyPlans, RemainingUsage):
     planID = request.args.get('plan')
 
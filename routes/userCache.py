@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Optional
+import threading
+import time
+
+class UserCache:
+    """Short-lived, process-local copies of users documents by user ID.
+
+    Writes in this process call Put or Invalidate, so only other workers'
+    writes can be missed, and for at most ttl seconds. ttl 0 disables it.
+    """
+    def __init__(self, maxEntries: int = 10000, ttl: float = 5.0):
+        self.maxEntries = maxEntries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def Get(self, userID: str) -> Optional[dict]:
+        """The cached document, shared with other requests so don't modify it."""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(userID)
+            if entry is not None:
+                doc, expiresAt = entry
+                if expiresAt > now:
+                    self._entries.move_to_end(userID)
+                    self.hits += 1
+                    return doc
+                del self._entries[userID]
+
+            self.misses += 1
+            return None
+
+    def Put(self, userID: str, doc: dict) -> None:
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries.pop(userID, None)
+            self._entries[userID] = (doc, time.monotonic() + self.ttl)
+
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+
+    def Invalidate(self, userID: str) -> None:
+        with self._lock:
+            self._entries.pop(userID, None)
+
+    def Clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,6 +1,6 @@
 from requests import post
 from pypdf import PdfReader
-from flask import request , jsonify , render_template , url_for , redirect
+from flask import request , jsonify , render_template , url_for , redirect , has_request_context , has_app_context , g
 from PIL import Image
 from pymongo import MongoClient , ReturnDocument
 import os
@@ -28,9 +28,35 @@ import random
 
 from uuid import uuid4
 import time
+import asyncio
+import threading
+
+from routes.aiCache import ResponseCache , MakeCacheKey
+from routes.singleFlight import SingleFlight , MakeFlightKey
+from routes.providers import GetProvider , ModelLabel
+from routes.responseSchemas import RESPONSES_DECODER
+from routes.hedging import Hedge , Deadline , GetLatencyTracker
+from routes.circuitBreaker import ProviderGuard , CircuitBreaker , AdaptiveLimiter , SHED_RESULT
+from routes.metrics import RequestPhases , MongoCommandMetrics , CountAiError , CountAiRetry , CountPromptTokens , ObserveStream , SetRoute , CurrentRoute , AI_CACHE
+from routes.retryPolicy import RetryPolicy , RetryAfter
+from routes.nearDuplicate import NoteIndex
+from routes.userCache import UserCache
+
+FREE_DAILY_LIMIT = 3
 
 console = Console()
 _client = None
+_aiCache = None
+_aiFlights = None
+_hedgeConfig = None
+_providerGuards = {}
+_chunkConfig = None
+_retryPolicy = None
+_noteIndex = None
+_userCache = None
+_aiLoop = None
+_aiLoopLock = threading.Lock()
+_asyncHttpxClient = None
 
 _httpxclient = httpx.Client(
     timeout=httpx.Timeout(60.0, connect=10.0),
@@ -75,41 +101,179 @@ def GetMongoClient() -> MongoClient:
         _client = MongoClient(
         GetMongoURI(),  
         serverSelectionTimeoutMS=10000, 
+        event_listeners=[MongoCommandMetrics()]
     )
     return _client
 
-def IncrementUsage():
+def GetAiCache() -> ResponseCache:
+    global _aiCache
+    if _aiCache is None:
+        shared = None
+        if os.getenv("AI_CACHE_MONGO") == "1":
+            shared = lambda: GetMongoClient()["EduDuck"]["ai-cache"]
+
+        _aiCache = ResponseCache(
+            maxBytes=int(os.getenv("AI_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+            ttl=int(os.getenv("AI_CACHE_TTL", 86400)),
+            sharedCollection=shared
+        )
+    return _aiCache
+
+def GetUserCache() -> UserCache:
+    global _userCache
+    if _userCache is None:
+        _userCache = UserCache(
+            maxEntries=int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000)),
+            ttl=float(os.getenv("USER_CACHE_TTL", 5))
+        )
+    return _userCache
+
+def GetAiFlights() -> SingleFlight:
+    global _aiFlights
+    if _aiFlights is None:
+        _aiFlights = SingleFlight()
+    return _aiFlights
+
+def GetHedgeConfig() -> dict:
+    global _hedgeConfig
+    if _hedgeConfig is None:
+        budget = os.getenv("AI_REQUEST_BUDGET")
+        _hedgeConfig = {
+            "enabled": os.getenv("AI_HEDGE") == "1",
+            "percentile": float(os.getenv("AI_HEDGE_PERCENTILE", 95)),
+            "initialDelay": float(os.getenv("AI_HEDGE_INITIAL_DELAY", 20)),
+            "minDelay": float(os.getenv("AI_HEDGE_MIN_DELAY", 2)),
+            "mode": os.getenv("AI_FALLBACK_MODE"),
+            "model": os.getenv("AI_FALLBACK_MODEL"),
+            "apiKey": os.getenv("AI_FALLBACK_API_KEY"),
+            "budget": float(budget) if budget else None
+        }
+    return _hedgeConfig
+
+def GetRetryPolicy() -> RetryPolicy:
+    global _retryPolicy
+    if _retryPolicy is None:
+        _retryPolicy = RetryPolicy(
+            attempts=int(os.getenv("AI_RETRY_ATTEMPTS", 2)),
+            base=float(os.getenv("AI_RETRY_BASE_DELAY", 0.5)),
+            cap=float(os.getenv("AI_RETRY_MAX_DELAY", 20))
+        )
+    return _retryPolicy
+
+def GetNoteIndex() -> Optional[NoteIndex]:
+    global _noteIndex
+    if _noteIndex is None and os.getenv("AI_DEDUP", "1") == "1":
+        _noteIndex = NoteIndex(
+            lambda: GetMongoClient()["EduDuck"]["note-fingerprints"],
+            threshold=float(os.getenv("AI_DEDUP_THRESHOLD", 0.8))
+        )
+    return _noteIndex
+
+def GetChunkConfig() -> dict:
+    global _chunkConfig
+    if _chunkConfig is None:
+        _chunkConfig = {
+            "maxChars": int(os.getenv("AI_CHUNK_CHARS", 8000)),
+            "maxChunks": int(os.getenv("AI_CHUNK_MAX", 8)),
+            "concurrency": int(os.getenv("AI_CHUNK_CONCURRENCY", 4))
+        }
+    return _chunkConfig
+
+def GetProviderGuard(mode, model) -> ProviderGuard:
+    guard = _providerGuards.get((mode, model))
+    if guard is None:
+        guard = _providerGuards[(mode, model)] = ProviderGuard(
+            CircuitBreaker(
+                errorRate=float(os.getenv("AI_BREAKER_ERROR_RATE", 0.5)),
+                slowCall=float(os.getenv("AI_BREAKER_SLOW_CALL", 30)),
+                cooldown=float(os.getenv("AI_BREAKER_COOLDOWN", 30))
+            ),
+            AdaptiveLimiter(
+                initial=float(os.getenv("AI_LIMIT_INITIAL", 16)),
+                maximum=float(os.getenv("AI_LIMIT_MAX", 256))
+            )
+        )
+    return guard
+
+def IsServerKey(mode, headers) -> bool:
+    """The request is sent with one of our keys (free tier or fallback), shared by many users."""
+    apiKey = GetProvider(mode).ApiKeyOf(headers)
+    return bool(apiKey) and apiKey in (os.getenv("FREE_TIER_API_KEY"), os.getenv("AI_FALLBACK_API_KEY"))
+
+def AiStatus() -> dict:
+    cache = GetAiCache()
+    return {
+        "providers": [
+            {"mode": mode, "model": model, **guard.Stats()}
+            for (mode, model), guard in list(_providerGuards.items())
+        ],
+        "flights": GetAiFlights().Stats(),
+        "cache": {"entries": len(cache), "bytes": cache.size, "hits": cache.hits, "sharedHits": cache.sharedHits, "misses": cache.misses}
+    }
+
+def ReserveUsage():
+    """Atomically takes one of today's free uses; returns the updated user, or None once the limit is reached.
+
+    Inside a background job (g.jobID) the use is recorded against the job, so
+    a run re-claimed after its lease expired isn't charged a second time.
+    """
     if not current_user.is_authenticated:
-        return jsonify({"error": "Not logged in"}), 401
-    
+        return None
+
     today = date.today().isoformat()
     users = GetMongoClient()["EduDuck"]["users"]
-    
+
     users.update_one(
         {"_id": ObjectId(current_user.id), 
          "deleted": {"$ne": True}, 
          "daily_usage.date": {"$ne": today}},  
         {"$set": {"daily_usage": {"date": today, "timesUsed": 0}}}
     )
-    
-    result = users.find_one_and_update(
-        {"_id": ObjectId(current_user.id), "deleted": {"$ne": True}},
-        {"$inc": {"daily_usage.timesUsed": 1}}, 
-        return_document=ReturnDocument.AFTER
-    )
-    
+
+    query = {"_id": ObjectId(current_user.id), 
+             "deleted": {"$ne": True}, 
+             "daily_usage.timesUsed": {"$lt": FREE_DAILY_LIMIT}}
+    update = {"$inc": {"daily_usage.timesUsed": 1}}
+
+    jobID = g.get("jobID") if has_request_context() else None
+    if jobID:
+        query["daily_usage.jobs"] = {"$ne": jobID}
+        update["$push"] = {"daily_usage.jobs": jobID}
+
+    result = users.find_one_and_update(query , update , return_document=ReturnDocument.AFTER)
+
+    if not result and jobID:
+        # An earlier run of this job already took its use
+        result = users.find_one({"_id": ObjectId(current_user.id), "deleted": {"$ne": True}, "daily_usage.jobs": jobID})
+
     if not result:
-        return jsonify({"error": "User not found"}), 404
-    
+        InvalidateUser(current_user.id)
+        return None
+
+    PutUserDoc(result)
+    return result
+
+def IncrementUsage():
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Not logged in"}), 401
+
+    result = ReserveUsage()
+    if not result:
+        if not GetUserDoc():
+            return jsonify({"error": "User not found"}), 404
+        return jsonify({"timesUsed": FREE_DAILY_LIMIT, "remaining": 0}), 429
+
     timesUsed = result["daily_usage"]["timesUsed"]
-    return jsonify({"timesUsed": timesUsed, "remaining": max(3-timesUsed, 0)})
+    return jsonify({"timesUsed": timesUsed, "remaining": max(FREE_DAILY_LIMIT-timesUsed, 0)})
 
 def GetUsage():
     if not current_user.is_authenticated:
         return jsonify({"timesUsed": 3, "remaining": 0})
     
-    users = GetMongoClient()["EduDuck"]["users"]
-    user = users.find_one({"_id": ObjectId(current_user.id), "deleted": {"$ne": True}})
+    user = GetUserDoc()
+    if not user:
+        return jsonify({"timesUsed": 3, "remaining": 0})
+
     today = date.today().isoformat()
     
     usage = user.get("daily_usage", {"date": today, "timesUsed": 0})
@@ -121,16 +285,70 @@ def GetUsage():
     remaining = max(3 - timesUsed, 0)
     return jsonify({"timesUsed": timesUsed, "remaining": remaining})
 
-def LoadUser(userID=None, googleId=None, githubId=None, discordId=None, microsoftId=None):
-    query = {"deleted": {"$ne": True}}  
+def _RequestUsers() -> Optional[dict]:
+    """User documents already read during this request (app context), by ID."""
+    if not has_app_context():
+        return None
+    return g.setdefault("_userDocs", {})
+
+def GetUserDoc(userID: Optional[str] = None) -> Optional[dict]:
+    """
+    The users document of userID, the logged in user by default. It's read
+    once per request, later calls in the request get the same dict, and
+    between requests GetUserCache serves it for a few seconds. Shared, so
+    don't modify it; call InvalidateUser after writing to the user.
+    """
+    if userID is None:
+        if not current_user.is_authenticated:
+            return None
+        userID = current_user.id
 
-    if userID:
+    memo = _RequestUsers()
+    if memo is not None and userID in memo:
+        return memo[userID]
+
+    cache = GetUserCache()
+    userDoc = cache.Get(userID)
+
+    if userDoc is None:
         try:
             objId = ObjectId(userID)
-            query["_id"] = objId
         except Exception:
             return None
-    elif googleId:
+
+        userDoc = GetMongoClient()["EduDuck"]["users"].find_one({"_id": objId, "deleted": {"$ne": True}})
+        if userDoc is not None:
+            cache.Put(userID, userDoc)
+
+    if memo is not None:
+        memo[userID] = userDoc
+
+    return userDoc
+
+def PutUserDoc(userDoc: dict) -> None:
+    """Replaces the cached copies with a document just written (e.g. returned by find_one_and_update)."""
+    userID = str(userDoc["_id"])
+    GetUserCache().Put(userID, userDoc)
+
+    memo = _RequestUsers()
+    if memo is not None:
+        memo[userID] = userDoc
+
+def InvalidateUser(userID: str) -> None:
+    """Drops the cached copies of a user after a write, the next GetUserDoc reads it again."""
+    GetUserCache().Invalidate(userID)
+
+    memo = _RequestUsers()
+    if memo is not None:
+        memo.pop(userID, None)
+
+def LoadUser(userID=None, googleId=None, githubId=None, discordId=None, microsoftId=None):
+    if userID:
+        return GetUserDoc(userID)
+
+    query = {"deleted": {"$ne": True}}  
+
+    if googleId:
         query["googleId"] = googleId
     elif githubId:
         query["githubId"] = githubId
@@ -145,19 +363,23 @@ def LoadUser(userID=None, googleId=None, githubId=None, discordId=None, microsof
     userDoc = GetMongoClient()["EduDuck"]["users"].find_one(query)
     return userDoc
 
+def UserKey(value: Optional[str]) -> Optional[str]:
+    """Case-insensitive form of a username or email, stored as usernameKey / emailKey."""
+    return value.strip().casefold() if value else None
+
+def UserKeys(username: Optional[str] , email: Optional[str]) -> dict:
+    """Lookup fields every user document carries next to username and email."""
+    return {"usernameKey": UserKey(username), "emailKey": UserKey(email)}
+
+def UserLookup(field: str , value: str) -> dict:
+    """Exact match on usernameKey or emailKey, served by their indexes."""
+    return {field: UserKey(value), "deleted": {"$ne": True}}
+
 def LoadUserByUsername(username: str):
-    pattern = re.compile(f"^{re.escape(username)}$", re.IGNORECASE)
-    return GetMongoClient()["EduDuck"]["users"].find_one({
-        "username": pattern,
-        "deleted": {"$ne": True}
-    })
+    return GetMongoClient()["EduDuck"]["users"].find_one(UserLookup("usernameKey" , username))
 
 def LoadUserByMail(email: str):
-    pattern = re.compile(f"^{re.escape(email)}", re.IGNORECASE)
-    return GetMongoClient()["EduDuck"]["users"].find_one({
-        "email": pattern,
-        "deleted": {"$ne": True}
-    })
+    return GetMongoClient()["EduDuck"]["users"].find_one(UserLookup("emailKey" , email))
 
 def LoginUser(UserClass, data=None):
     if data:
@@ -222,7 +444,7 @@ def RegisterUser():
         if existingUser:
             return jsonify({"error": "Username already taken"}), 409
 
-        existingMail = LoadUserByMail(email.lower())
+        existingMail = LoadUserByMail(email)
         if existingMail:
             return jsonify({"error": "Email already taken."}), 409
 
@@ -233,6 +455,7 @@ def RegisterUser():
         userDoc = {
             "username": username.lower(),
             "email": email.lower(), 
+            **UserKeys(username , email),
             "password": hashedPassword,
             "verified": False,
             
@@ -259,77 +482,474 @@ def RegisterUser():
 
     return render_template("pages/register.html")
 
-# Define response schemas for even faster parsing (optional but recommended)
-class OpenAIChoice(msgspec.Struct):
-    message: dict
+decoder = msgspec.json.Decoder()  # Reusable decoder, typed reply schemas live in routes/responseSchemas.py
+
+def GetAiLoop() -> asyncio.AbstractEventLoop:
+    # One event loop per worker process owns every provider connection, so
+    # sync and async views alike share a single pool of in-flight requests.
+    global _aiLoop
+    with _aiLoopLock:
+        if _aiLoop is None or _aiLoop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ai-loop", daemon=True).start()
+            _aiLoop = loop
+    return _aiLoop
+
+def RunOnAiLoop(coro):
+    return asyncio.run_coroutine_threadsafe(coro, GetAiLoop()).result()
+
+async def AwaitOnAiLoop(coro):
+    loop = GetAiLoop()
+    try:
+        if asyncio.get_running_loop() is loop:
+            return await coro
+    except RuntimeError:
+        pass
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+def GetAsyncHttpxClient() -> httpx.AsyncClient:
+    global _asyncHttpxClient
+    if _asyncHttpxClient is None:
+        _asyncHttpxClient = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=500, max_keepalive_connections=100),
+            http2=True
+        )
+    return _asyncHttpxClient
+
+def DecodeResponseText(content: bytes, mode: str, extract_text: bool = False) -> tuple[str, bool, Optional[tuple[int, int]]]:
+    if extract_text:
+        output_texts = [
+            part.text
+            for item in RESPONSES_DECODER.decode(content).output
+            for part in item.content
+            if part.type == "output_text"
+        ]
+        return "\n".join(output_texts).strip() or "API returned no text." , True , None
+
+    return GetProvider(mode).DecodeReply(content)
+
+def BuildFallbackRequest(API_URL, headers, payload, mode):
+    """Returns AiReq args for the hedge target, or None if this request can't be hedged."""
+    config = GetHedgeConfig()
+    if not config["enabled"]:
+        return None
+
+    primary = GetProvider(mode)
+    prompt = primary.PromptOf(payload)
+    if prompt is None:
+        return None
+
+    fallbackMode = config["mode"] or mode
+    apiKey = primary.ApiKeyOf(headers)
+    schema = primary.SchemaOf(payload)
+
+    if schema is not None and not GetProvider(fallbackMode).supportsSchema:
+        # The prompt asks for JSON the fallback couldn't be held to
+        return None
+
+    if fallbackMode == mode:
+        # Same provider, different model: the user's own key still works. The
+        # same model again would only be a duplicate request
+        if not config["model"] or config["model"] == primary.ModelOf(API_URL, payload):
+            return None
+    else:
+        # Another provider needs our key, so only free-tier traffic may cross over
+        if not config["apiKey"] or apiKey != os.getenv("FREE_TIER_API_KEY"):
+            return None
+        apiKey = config["apiKey"]
+
+    return GetProvider(fallbackMode).BuildRequest(prompt, {
+        "apiKey": apiKey,
+        "model": config["model"],
+        "temperature": payload.get("temperature", 0.3),
+        "top_p": payload.get("top_p", 0.9),
+        "schema": schema
+    })
+
+def ModelKey(API_URL, payload, mode) -> str:
+    # Clients pick the model freely, keying on it would grow metrics and guards without bound
+    return ModelLabel(mode, GetProvider(mode).ModelOf(API_URL, payload))
+
+def HedgeDelay(mode, model) -> float:
+    config = GetHedgeConfig()
+    observed = GetLatencyTracker(mode, model).Percentile(config["percentile"])
+    return max(config["minDelay"], observed if observed is not None else config["initialDelay"])
+
+def RequestRoute() -> str:
+    # Read on the calling thread, the AI loop has no request context
+    return (request.endpoint or "none") if has_request_context() else "none"
+
+async def _AiReqOnLoop(API_URL, headers, payload, mode, timeout, extract_text, cache, budget, route="none"):
+    SetRoute(route)
+    if budget is None:
+        budget = GetHedgeConfig()["budget"] or timeout
+    deadline = Deadline(budget)
+
+    if cache:
+        cacheKey = MakeCacheKey(mode, API_URL, payload)
+        cached = await asyncio.to_thread(GetAiCache().Get, cacheKey)
+        if cached is not None:
+            AI_CACHE.labels("hit").inc()
+            Log(f"AI cache hit ({cacheKey[:12]}), skipping request to {API_URL.split('?', 1)[0]}", "info")
+            return cached
+        AI_CACHE.labels("miss").inc()
+
+        flights = GetAiFlights()
+        flightKey = MakeFlightKey(cacheKey, API_URL, headers)
+        if flightKey in flights:
+            AI_CACHE.labels("coalesced").inc()
+            Log(f"Joining in-flight request ({cacheKey[:12]}), saved calls so far: {flights.coalesced + 1}", "info")
+
+        def Store(data):
+            # A reply the view can't parse would be replayed on every retry
+            if cache is True or cache(data):
+                GetAiCache().Put(cacheKey, data)
+
+        return await flights.Do(
+            flightKey,
+            lambda: _HedgedAiReq(API_URL, headers, payload, mode, timeout, extract_text, Store, deadline)
+        )
+
+    return await _HedgedAiReq(API_URL, headers, payload, mode, timeout, extract_text, None, deadline)
 
-class OpenAIResponse(msgspec.Struct):
-    choices: list[OpenAIChoice]
+async def _HedgedAiReq(API_URL, headers, payload, mode, timeout, extract_text, store, deadline):
+    fallback = None if extract_text else BuildFallbackRequest(API_URL, headers, payload, mode)
 
-decoder = msgspec.json.Decoder()  # Reusable decoder
+    def Send(request):
+        return lambda: _RetryAiReq(*request, timeout, extract_text, store, deadline)
 
-def AiReq(API_URL, headers, payload, mode="OpenAI", timeout=60, extract_text=False):
+    result , winner = await Hedge(
+        Send((API_URL, headers, payload, mode)),
+        Send(fallback) if fallback else None,
+        HedgeDelay(mode, ModelKey(API_URL, payload, mode)),
+        deadline
+    )
+
+    if winner == "fallback":
+        Log(f"Fallback {fallback[3]} answered before {mode}", "warn")
+
+    return result
+
+async def _RetryAiReq(API_URL, headers, payload, mode, timeout, extract_text, store, deadline):
+    policy = GetRetryPolicy()
+    attempt = 0
+    delay = None
+
+    while True:
+        result , retryAfter = await _SendAiReq(
+            API_URL, headers, payload, mode, min(timeout, deadline.Remaining()), extract_text, store
+        )
+        if retryAfter is None:
+            return result
+
+        attempt += 1
+        delay = policy.Delay(attempt, delay, retryAfter, deadline.Remaining())
+        if delay is None:
+            return result
+
+        reason = result.removeprefix("API error ") if result else "connect"
+        Log(f"Retrying {mode} ({payload.get('model')}) after {reason} in {delay:.2f}s (attempt {attempt})", "warn")
+        CountAiRetry(mode, ModelKey(API_URL, payload, mode), reason, delay)
+        await asyncio.sleep(delay)
+
+async def _SendAiReq(API_URL, headers, payload, mode, timeout, extract_text, store):
+    """Returns (result, retryAfter); retryAfter is None unless the request may be resent."""
+    model = ModelKey(API_URL, payload, mode)
+    guard = GetProviderGuard(mode, model)
+    if not guard.Admit():
+        Log(f"Shedding request to {mode} ({payload.get('model')}): {guard.Stats()}", "warn")
+        CountAiError(mode, model, "shed")
+        return SHED_RESULT , None
+
+    state = guard.breaker.state
+    start = time.perf_counter()
+    try:
+        result , retryAfter = await _PostAiReq(API_URL, headers, payload, mode, timeout, extract_text, store)
+    except asyncio.CancelledError:
+        guard.Release(None, None)
+        raise
+
+    guard.Release(result, time.perf_counter() - start, IsServerKey(mode, headers))
+    if guard.breaker.state != state:
+        Log(f"Circuit for {mode} ({payload.get('model')}) is now {guard.breaker.state}", "warn")
+
+    return result , retryAfter
+
+async def _PostAiReq(API_URL, headers, payload, mode, timeout, extract_text, store):
+    model = ModelKey(API_URL, payload, mode)
     try:
         start = time.perf_counter()
-        client_timeout = httpx.Timeout(timeout, connect=10.0) if timeout != 60 else None
-        
-        response = _httpxclient.post(
-            API_URL, 
-            headers=headers, 
+        phases = RequestPhases()
+        client_timeout = httpx.Timeout(timeout, connect=10.0) if timeout != 60 else httpx.USE_CLIENT_DEFAULT
+
+        response = await GetAsyncHttpxClient().post(
+            API_URL,
+            headers=headers,
             json=payload,
-            timeout=client_timeout
+            timeout=client_timeout,
+            extensions={"trace": phases}
         )
-        
+
         if response.status_code != 200:
-            print(decoder.decode(response.content))
-            return f'API error {response.status_code}'
+            print(response.content)
+            CountAiError(mode, model, response.status_code)
+            return f'API error {response.status_code}' , RetryAfter(response.status_code, response.headers, response.content)
         end = time.perf_counter()
 
-        Log(f"API request to {API_URL} took {end - start:.4f} seconds", "info")
+        Log(f"API request to {API_URL.split('?', 1)[0]} took {end - start:.4f} seconds", "info")
 
-        start = time.perf_counter()
-        result = decoder.decode(response.content)
-
-        if extract_text:
-            output_texts = [
-                content.get("text", "")
-                for item in result.get("output", [])
-                for content in item.get("content", [])
-                if content.get("type") == "output_text"
-            ]
-            data = "\n".join(output_texts).strip() or "API returned no text."
-        else:
-            if mode in ("OpenAI", "Hugging Face"):
-                try:
-                    data = result["choices"][0]["message"]["content"]
-                except (KeyError, IndexError, TypeError) as e:
-                    print(f"Error parsing {mode} response: {e}")
-                    data = f"Error parsing {mode} response."
-            else:
-                try:
-                    parts = result["candidates"][0]["content"]["parts"]
-                    data = "".join(part["text"] for part in parts)
-                except (KeyError, IndexError, TypeError):
-                    data = "Unknown API format."
+        latency = end - start
+        bodyDone = end
 
+        start = time.perf_counter()
+        data , parsed , usage = DecodeResponseText(response.content, mode, extract_text)
         end = time.perf_counter()
         Log(f"Parsing response took: {end - start:.4f} seconds", "info")
 
-        return data
+        phases.Observe(mode, model, CurrentRoute(), bodyDone, end)
+        if usage:
+            CountPromptTokens(mode, model, *usage)
+
+        if parsed:
+            GetLatencyTracker(mode, model).Record(latency)
+        else:
+            CountAiError(mode, model, "unparsed")
+
+        if store and parsed and data:
+            await asyncio.to_thread(store, data)
+
+        return data , None
 
+    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as err:
+        # Nothing reached the provider, so this one is always safe to resend
+        print(f"Connect error: {str(err)}")
+        CountAiError(mode, model, "connect")
+        return None , 0.0
     except httpx.TimeoutException:
         print(f"Request timeout after {timeout}s")
-        return None
+        CountAiError(mode, model, "timeout")
+        return None , None
     except httpx.RequestError as err:
         print(f"Network error: {str(err)}")
-        return None
+        CountAiError(mode, model, "network")
+        return None , None
     except Exception as err:
         print(f"Internal Error: {str(err)}")
-        return None
+        CountAiError(mode, model, "internal")
+        return None , None
+
+def CacheIfParsed(parse):
+    """For AiReq's cache: a reply is only stored once parse finds something in it."""
+    def Accept(text) -> bool:
+        try:
+            return bool(parse(text))
+        except Exception:
+            return False
+    return Accept
+
+async def AsyncAiReq(API_URL, headers, payload, mode="OpenAI", timeout=60, extract_text=False, cache=False, budget=None):
+    return await AwaitOnAiLoop(_AiReqOnLoop(API_URL, headers, payload, mode, timeout, extract_text, cache, budget, RequestRoute()))
+
+def AiReq(API_URL, headers, payload, mode="OpenAI", timeout=60, extract_text=False, cache=False, budget=None):
+    return RunOnAiLoop(_AiReqOnLoop(API_URL, headers, payload, mode, timeout, extract_text, cache, budget, RequestRoute()))
+
+async def _AiReqManyOnLoop(requests, cache, concurrency, route):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def Run(request):
+        async with semaphore:
+            return await _AiReqOnLoop(*request, 60, False, cache, None, route)
+
+    return await asyncio.gather(*(Run(request) for request in requests))
+
+async def AsyncAiReqMany(requests, cache=False, concurrency=None):
+    """Runs several (API_URL, headers, payload, mode) requests with bounded fan-out, results in order."""
+    concurrency = concurrency or GetChunkConfig()["concurrency"]
+    return await AwaitOnAiLoop(_AiReqManyOnLoop(requests, cache, concurrency, RequestRoute()))
+
+def AiReqMany(requests, cache=False, concurrency=None):
+    concurrency = concurrency or GetChunkConfig()["concurrency"]
+    return RunOnAiLoop(_AiReqManyOnLoop(requests, cache, concurrency, RequestRoute()))
+
+def StreamURL(API_URL: str, mode: str) -> str:
+    if mode != "Gemini":
+        return API_URL
+    API_URL = API_URL.replace(":generateContent", ":streamGenerateContent", 1)
+    return API_URL + ("&" if "?" in API_URL else "?") + "alt=sse"
+
+def ExtractStreamDelta(chunk: dict, mode: str) -> str:
+    try:
+        if mode in ("OpenAI", "Hugging Face"):
+            choices = chunk.get("choices")
+            if not choices:
+                return ""
+            return (choices[0].get("delta") or {}).get("content") or ""
+        parts = chunk["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts)
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return ""
+
+async def _AdmitStream(mode, model):
+    # The guards aren't thread-safe, they're only touched on the AI loop
+    guard = GetProviderGuard(mode, model)
+    return guard if guard.Admit() else None
+
+async def _ReleaseStream(guard, result, latency, sharedKey):
+    guard.Release(result, latency, sharedKey)
+
+def _StreamOnce(API_URL, headers, payload, mode, timeout, model, sharedKey, chunks):
+    """One streamed call through the provider guard. Yields text deltas (also
+    appended to chunks) and returns (ok, error result, retryAfter)."""
+    guard = RunOnAiLoop(_AdmitStream(mode, model))
+    if guard is None:
+        Log(f"Shedding stream to {mode} ({payload.get('model')})", "warn")
+        CountAiError(mode, model, "shed")
+        return False , SHED_RESULT , None
+
+    start = time.perf_counter()
+    result , latency = None , None
+    try:
+        client_timeout = httpx.Timeout(timeout, connect=10.0) if timeout != 60 else None
+
+        with _httpxclient.stream(
+            "POST",
+            StreamURL(API_URL, mode),
+            headers=headers,
+            json=payload,
+            timeout=client_timeout
+        ) as response:
+            if response.status_code != 200:
+                body = response.read()
+                print(body)
+                CountAiError(mode, model, response.status_code)
+                result , latency = f'API error {response.status_code}' , time.perf_counter() - start
+                return False , result , RetryAfter(response.status_code, response.headers, body)
+
+            firstToken = None
+
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                body = line[5:].strip()
+                if body == "[DONE]":
+                    break
+
+                text = ExtractStreamDelta(decoder.decode(body), mode)
+                if not text:
+                    continue
+
+                if firstToken is None:
+                    firstToken = time.perf_counter() - start
+                    Log(f"First token from {API_URL.split('?', 1)[0]} after {firstToken:.4f} seconds", "info")
+
+                chunks.append(text)
+                yield text
+
+        latency = time.perf_counter() - start
+        result = "".join(chunks)
+        Log(f"Streamed response from {API_URL.split('?', 1)[0]} in {latency:.4f} seconds", "info")
+        ObserveStream(mode, model, CurrentRoute(), latency if firstToken is None else firstToken, latency)
+        return True , None , None
+
+    except httpx.TimeoutException:
+        print(f"Request timeout after {timeout}s")
+        CountAiError(mode, model, "timeout")
+        result , latency = "Request timeout" , time.perf_counter() - start
+        return False , result , None
+    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as err:
+        print(f"Connect error: {str(err)}")
+        CountAiError(mode, model, "connect")
+        latency = time.perf_counter() - start
+        return False , None , 0.0
+    except httpx.RequestError as err:
+        print(f"Network error: {str(err)}")
+        CountAiError(mode, model, "network")
+        latency = time.perf_counter() - start
+        return False , None , None
+    except Exception as err:
+        print(f"Internal Error: {str(err)}")
+        CountAiError(mode, model, "internal")
+        latency = time.perf_counter() - start
+        return False , None , None
+    finally:
+        # latency stays None when the client went away mid-stream
+        RunOnAiLoop(_ReleaseStream(guard, result, latency, sharedKey))
+
+def AiReqStream(API_URL, headers, payload, mode="OpenAI", timeout=60, cache=False):
+    """Yields text deltas. A failure before any text yields a lone error string
+    (or None), one after it yields None, so a partial reply is never kept.
+
+    Uses the response cache (a hit is yielded as one chunk), provider guard,
+    retry policy and metrics of AiReq. Retries only happen before any text."""
+    SetRoute(RequestRoute())
+    model = ModelKey(API_URL, payload, mode)
+
+    cacheKey = None
+    if cache:
+        # Same key as the non-streamed request, so either one fills it for the other
+        cacheKey = MakeCacheKey(mode, API_URL, payload)
+        cached = GetAiCache().Get(cacheKey)
+        if cached is not None:
+            AI_CACHE.labels("hit").inc()
+            yield cached
+            return
+        AI_CACHE.labels("miss").inc()
+
+    if mode != "Gemini":
+        payload = {**payload, "stream": True}
+
+    sharedKey = IsServerKey(mode, headers)
+    deadline = Deadline(GetHedgeConfig()["budget"] or timeout)
+    policy = GetRetryPolicy()
+    attempt = 0
+    delay = None
+
+    while True:
+        chunks = []
+        ok , result , retryAfter = yield from _StreamOnce(
+            API_URL, headers, payload, mode, min(timeout, deadline.Remaining()), model, sharedKey, chunks
+        )
+
+        if ok:
+            output = "".join(chunks)
+            if cacheKey and output and (cache is True or cache(output)):
+                GetAiCache().Put(cacheKey, output)
+            return
+
+        if chunks:
+            # The caller already has part of the reply, the error mustn't be appended to it
+            yield None
+            return
+
+        if retryAfter is not None:
+            attempt += 1
+            delay = policy.Delay(attempt, delay, retryAfter, deadline.Remaining())
+            if delay is not None:
+                reason = result.removeprefix("API error ") if result else "connect"
+                Log(f"Retrying stream to {mode} ({payload.get('model')}) after {reason} in {delay:.2f}s (attempt {attempt})", "warn")
+                CountAiRetry(mode, model, reason, delay)
+                time.sleep(delay)
+                continue
+
+        yield result
+        return
+
+def FormatSSE(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {msgspec.json.encode(data).decode('utf-8')}\n\n"
 
 def cleanup():
     if _httpxclient: _httpxclient.close()
 
+    if _aiLoop is not None and not _aiLoop.is_closed():
+        if _asyncHttpxClient is not None:
+            try:
+                RunOnAiLoop(_asyncHttpxClient.aclose())
+            except Exception as err:
+                print(f"Failed to close async client: {str(err)}")
+        _aiLoop.call_soon_threadsafe(_aiLoop.stop)
+
 def uploadNotes():
     file = request.files.get("notesFile")
     supportedImageFormats = ['png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'tif', 'webp', 'ppm', 'pbm', 'pgm', 'jp2', 'j2k']
@@ -386,7 +1006,16 @@ def uploadNotes():
     else:
         return jsonify({"notes": "Unsupported file type."})
 
-def StoreQuery(qName , query=None) -> Optional[str]:
+QUERY_COLLECTIONS = {
+    "quiz": "quizzes",
+    "plan": "study-plans",
+    "flashcards": "flashcards",
+    "notes": "enhanced-notes",
+    "note-analysis": "note-analysis",
+}
+
+def StoreQuery(qName , query=None , raw: Optional[dict] = None) -> Optional[str]:
+    """raw is the provider output the query was parsed from ({"outputs": [...], "limit": n}), kept so `flask reparse` can redo it."""
     if not current_user.is_authenticated:
         return "forbidden" , 401
 
@@ -399,32 +1028,50 @@ def StoreQuery(qName , query=None) -> Optional[str]:
 
     QueryID = str(uuid4())
 
-    dbNames = {
-        "quiz": "quizzes",
-        "plan": "study-plans",
-        "flashcards": "flashcards",
-        "notes": "enhanced-notes",
-        "note-analysis": "note-analysis",
-    }
-
-    collection = dbNames.get(qName , 'err')
+    collection = QUERY_COLLECTIONS.get(qName , 'err')
 
     if collection == 'err':
         Log("Unknown qName @ StoreQuery" , "error")
         return "unknown qName"
 
-    GetMongoClient()["EduDuck"][collection].insert_one({
+    Entry = {
         "userID": current_user.id,
         "queryID": QueryID,
         "queryType": qName,
         "query": query,
         "createdAt": datetime.utcnow() 
-    })
+    }
+    if raw is not None:
+        Entry["raw"] = raw
+
+    GetMongoClient()["EduDuck"][collection].insert_one(Entry)
 
     Log("Added query to mongoDB. ID: " + QueryID , "info")
 
     return QueryID
 
+def FindReusableQuery(qName: str , notes: str , params: dict) -> Optional[tuple[Any, float]]:
+    """(artifact, similarity) of one generated earlier from near-identical notes with the same settings."""
+    index = GetNoteIndex()
+    match = index.Find(qName , notes , params) if index else None
+    if not match:
+        return None
+
+    Entry = GetMongoClient()["EduDuck"][match["collection"]].find_one({
+        "queryID": match["queryID"],
+        "deleted": {"$ne": True}
+    })
+    if not Entry or not Entry.get("query"):
+        return None
+
+    Log(f"Reusing {qName} {match['queryID']} (similarity: {match['similarity']:.2f})" , "info")
+    return Entry["query"] , match["similarity"]
+
+def RememberQuery(qName: str , queryID: str , notes: str , params: dict) -> None:
+    index = GetNoteIndex()
+    if index and queryID:
+        index.Add(qName , notes , params , QUERY_COLLECTIONS[qName] , queryID)
+
 def StoreDuckAIConversation(messages: list , QueryID = None):
     db = GetMongoClient()["EduDuck"]["duck-ai"]
 
@@ -451,11 +1098,12 @@ def StoreDuckAIConversation(messages: list , QueryID = None):
 
     return doc["queryID"]
 
+def QueryLookup(queryID: str, userID: str) -> dict:
+    """Filter for one stored query of a user, served by the queryID_1_userID_1 index."""
+    return {"queryID": queryID, "userID": userID}
+
 def GetQueryFromDB(queryID: str, collection: str) -> Union[Dict[str, Any], str, None]:
-    Entry = GetMongoClient()["EduDuck"][collection].find_one({
-        "queryID": queryID,
-        "userID": current_user.id
-    })
+    Entry = GetMongoClient()["EduDuck"][collection].find_one(QueryLookup(queryID , current_user.id))
 
     if not Entry:
         return None
@@ -515,16 +1163,20 @@ def VerifyEmail(token):
             "$unset": {"verification_token": "", "verification_token_expires": ""}
         }
     )
+    InvalidateUser(str(user["_id"]))
 
     login_user(User(user))
 
     return render_template("pages/emailVerified.html", success=True, email=user["email"])
 
+def ProfileFilter(userID: str) -> dict:
+    return {"userID": userID, "deleted": {"$ne": True}}
+
 def UserProfile():
     db = GetMongoClient()["EduDuck"]
     userid = current_user.id
     streakdata = GetStudyStreakData(userid)
-    filter = {"userID": userid, "deleted": {"$ne": True}}
+    filter = ProfileFilter(userid)
     
     quizzes = list(db["quizzes"].find(filter).sort("createdAt", -1))
     plans = list(db["study-plans"].find(filter).sort("createdAt", -1))
@@ -533,7 +1185,7 @@ def UserProfile():
     duckai = list(db["duck-ai"].find(filter).sort("lastEditedAt", -1))
     noteanalyses = list(db["note-analysis"].find(filter).sort("createdAt", -1))  
 
-    user = db["users"].find_one({"_id": ObjectId(userid)})
+    user = GetUserDoc(userid)
     username = user["username"] if user else None
     email = user["email"] if user else None
     
@@ -553,7 +1205,7 @@ def UserProfile():
 
 def GetUserPFP():
     try:
-        user_doc = GetMongoClient()["EduDuck"]["users"].find_one({"_id": ObjectId(current_user.id)})
+        user_doc = GetUserDoc()
         if not user_doc:
             return jsonify({"error": "User not found"}), 404
 
@@ -572,15 +1224,40 @@ def CheckPasswordSetup(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         if current_user.is_authenticated:
-            user = GetMongoClient()["EduDuck"]["users"].find_one({
-                "_id": ObjectId(current_user.id),
-                "deleted": {"$ne": True}
-            })
+            user = GetUserDoc()
             if user and user.get("needs_password_setup") and not request.args.get("IGNORE"):
                 return redirect(f"{url_for('setup_password')}?skip={request.path}")
         return func(*args, **kwargs)
     return wrapper
 
+def StreakPipeline(user_id: str, start_date: datetime, end_date: datetime, field: str = "createdAt") -> list:
+    """Activity per day of user_id between the dates, counted by field."""
+    dateRange = {"$gte": start_date, "$lte": end_date}
+    if field != "createdAt":
+        # Edits only, creation is already counted
+        dateRange["$ne"] = "$createdAt"
+
+    return [
+        {
+            "$match": {
+                "userID": user_id,
+                field: dateRange,
+                "deleted": {"$ne": True}
+            }
+        },
+        {
+            "$group": {
+                "_id": {
+                    "$dateToString": {
+                        "format": "%Y-%m-%d",
+                        "date": f"${field}"
+                    }
+                },
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+
 def GetStudyStreakData(user_id: str, days: int = 365):
     try:
         db = GetMongoClient()["EduDuck"]
@@ -605,30 +1282,8 @@ def GetStudyStreakData(user_id: str, days: int = 365):
         # Aggregate from all collections
         for collection_name, query_type in collection_mapping.items():
             try:
-                pipeline = [
-                    {
-                        "$match": {
-                            "userID": user_id,
-                            "createdAt": {
-                                "$gte": start_date,
-                                "$lte": end_date
-                            },
-                            "deleted": {"$ne": True}
-                        }
-                    },
-                    {
-                        "$group": {
-                            "_id": {
-                                "$dateToString": {
-                                    "format": "%Y-%m-%d",
-                                    "date": "$createdAt"
-                                }
-                            },
-                            "count": {"$sum": 1}
-                        }
-                    }
-                ]
-                
+                pipeline = StreakPipeline(user_id, start_date, end_date)
+
                 results = db[collection_name].aggregate(pipeline)
                 for doc in results:
                     daily_counts[doc["_id"]] += doc["count"]
@@ -639,31 +1294,8 @@ def GetStudyStreakData(user_id: str, days: int = 365):
         
         # Also count lastEditedAt for duck-ai conversations (chat activity)
         try:
-            pipeline_edits = [
-                {
-                    "$match": {
-                        "userID": user_id,
-                        "lastEditedAt": {
-                            "$gte": start_date,
-                            "$lte": end_date,
-                            "$ne": "$createdAt"
-                        },
-                        "deleted": {"$ne": True}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": {
-                            "$dateToString": {
-                                "format": "%Y-%m-%d",
-                                "date": "$lastEditedAt"
-                            }
-                        },
-                        "count": {"$sum": 1}
-                    }
-                }
-            ]
-            
+            pipeline_edits = StreakPipeline(user_id, start_date, end_date, field="lastEditedAt")
+
             results = db["duck-ai"].aggregate(pipeline_edits)
             for doc in results:
                 daily_counts[doc["_id"]] += doc["count"]
@@ -822,6 +1454,15 @@ def extract_topic(query_data, qtype):
     
     return 'General'
 
+def NextActionFilter(user_id: str) -> dict:
+    return {
+        'userID': user_id,
+        '$or': [
+            {'deletedAt': {'$exists': False}},
+            {'deletedAt': None}
+        ]
+    }
+
 def GetNextAction(_user_history=None):
     if _user_history is None:
         _user_history = {}
@@ -851,13 +1492,7 @@ def GetNextAction(_user_history=None):
     db = GetMongoClient()['EduDuck']
     
     for coll_name, qtype in collections.items():
-        query_filter = {
-            'userID': user_id,
-            '$or': [
-                {'deletedAt': {'$exists': False}},
-                {'deletedAt': None}
-            ]
-        }
+        query_filter = NextActionFilter(user_id)
         cursor = db[coll_name].find(query_filter).sort([('createdAt', -1)]).limit(50)
         
         for doc in cursor:
@@ -49,6 +49,86 @@ export async function generate(
     return data.response.trim();
 }
 
+export interface StreamResult {
+    text: string;
+    queryID: string | null;
+    error: string | null;
+}
+
+export async function generateStream(
+    history: string,
+    userMessage: string,
+    queryID: string | null,
+    apiKey: string | null,
+    model: string | null,
+    apiMode: string,
+    isFree: boolean,
+    language: string,
+    onChunk: (text: string) => void
+): Promise<StreamResult> {
+    const res = await fetch("/duck-ai/generate-stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+            message: history,
+            userMessage,
+            queryID,
+            apiKey,
+            model,
+            apiMode,
+            isFree,
+            language
+        })
+    });
+
+    const result: StreamResult = { text: "", queryID: null, error: null };
+
+    const contentType = res.headers.get("Content-Type") || "";
+    if (!res.ok || !res.body || !contentType.startsWith("text/event-stream")) {
+        result.error = "Error while generating response.";
+        return result;
+    }
+
+    const reader = res.body.getReader();
+    const textDecoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += textDecoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            boundary = buffer.indexOf("\n\n");
+
+            let event = "message";
+            let data = "";
+            for (const line of rawEvent.split("\n")) {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            if (event === "chunk") {
+                result.text += payload.text;
+                onChunk(result.text);
+            } else if (event === "done") {
+                result.queryID = payload.queryID || null;
+            } else if (event === "error") {
+                result.error = payload.message;
+            }
+        }
+    }
+
+    result.text = result.text.trim();
+    return result;
+}
+
 export async function storeConversation(
     messages: Array<{ role: string; content: string }>,
     queryID: string | null
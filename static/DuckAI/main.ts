@@ -1,10 +1,10 @@
 import { autoResize } from "../Components/AutoResize.js";
 import { CustomModelListeners } from "../Components/ModelSelector.js";
 import {
-    CustomModel, CustomModelInput, APIModeSelector, UserInput, ApiKeyInput,
+    CustomModel, CustomModelInput, APIModeSelector, UserInput, ApiKeyInput, ChatMessages,
     sendButton, NewChat, FreeUsage, showSpinner, showStatus, hideStatus, renderMessage, ApiKeyInputParent, LanguageSelector
 } from "./ui.js";
-import { getFreeLimitUsage, generate, storeConversation, uploadFile } from "./api.js";
+import { getFreeLimitUsage, generateStream, uploadFile } from "./api.js";
 import { addMessage, getHistory, parseInitialChat } from "./chat.js";
 
 let FreeUsageLeft = 0;
@@ -120,27 +120,41 @@ document.addEventListener('DOMContentLoaded', async () => {
         showSpinner();
 
         try {
-            const botMessage = await generate(
+            let bubble: HTMLElement | null = null;
+
+            const result = await generateStream(
                 history,
+                text,
+                CurrentDuckAIQueryID,
                 FreeUsage?.checked ? null : apiKey,
                 FreeUsage?.checked ? null : model,
                 FreeUsage?.checked ? "OpenAI" : APIModeSelector.value.trim(),
                 FreeUsage?.checked ?? false,
-                LanguageSelector.value.trim()
+                LanguageSelector.value.trim(),
+                (partial: string) => {
+                    if (!bubble) {
+                        hideStatus();
+                        bubble = renderMessage("assistant", partial);
+                    } else {
+                        bubble.textContent = partial;
+                        ChatMessages.scrollTop = ChatMessages.scrollHeight;
+                    }
+                }
             );
 
+            const botMessage = result.error ?? result.text;
+
+            if (bubble) {
+                (bubble as HTMLElement).textContent = botMessage;
+            } else {
+                renderMessage("assistant", botMessage);
+            }
             addMessage("assistant", botMessage);
-            renderMessage("assistant", botMessage);
             hideStatus();
 
-            const queryID = await storeConversation(
-                [{ role: "user", content: text }, { role: "assistant", content: botMessage }],
-                CurrentDuckAIQueryID
-            );
-
-            if (queryID && !CurrentDuckAIQueryID) {
-                CurrentDuckAIQueryID = queryID;
-                window.history.pushState({}, "", `/duck-ai?id=${queryID}`);
+            if (result.queryID && !CurrentDuckAIQueryID) {
+                CurrentDuckAIQueryID = result.queryID;
+                window.history.pushState({}, "", `/duck-ai?id=${result.queryID}`);
             }
 
             if (FreeUsage?.checked) {
@@ -34,7 +34,7 @@ export function hideStatus(): void {
     StatusText.classList.add('hidden');
 }
 
-export function renderMessage(role: string, content: string): void {
+export function renderMessage(role: string, content: string): HTMLElement {
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${role === "assistant" ? "ai" : "user"}-message`;
     
@@ -46,5 +46,7 @@ export function renderMessage(role: string, content: string): void {
     ChatMessages.appendChild(messageDiv);
     
     ChatMessages.scrollTop = ChatMessages.scrollHeight;
+
+    return bubble;
 }
 
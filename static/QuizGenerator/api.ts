@@ -14,10 +14,13 @@ interface QuizGenerationBody {
     apiMode: string;
     difficulty: string;
     isFree: boolean;
+    forceNew?: boolean;
 }
 
 interface QuizResponse {
     id: string;
+    reused?: boolean;
+    similarity?: number;
 }
 
 interface UploadNotesResponse {
@@ -139,7 +139,13 @@ document.addEventListener('DOMContentLoaded', async () => {
                 isFree: FreeUsage?.checked ?? false
             };
 
-            const data = await generateQuiz(body);
+            let data = await generateQuiz(body);
+
+            // Near-identical notes already have a quiz, let the user pick it or a fresh one
+            if (data.reused && !confirm("A quiz was already made from almost the same notes. Open it? Cancel generates a new one.")) {
+                data = await generateQuiz({ ...body, forceNew: true });
+            }
+
             window.location.href = `/quiz-generator/quiz?id=${encodeURIComponent(data.id)}`;
 
             if (FreeUsageText && FreeUsage?.checked) {
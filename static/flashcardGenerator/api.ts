@@ -13,10 +13,13 @@ interface FlashcardGenerationBody {
     apiMode: string;
     isFree: boolean;
     amount: string;
+    forceNew?: boolean;
 }
 
 interface FlashcardResponse {
     id: string;
+    reused?: boolean;
+    similarity?: number;
 }
 
 interface UploadNotesResponse {
@@ -132,7 +132,13 @@ document.addEventListener('DOMContentLoaded', async () => {
                 amount: AmountSelector.value.trim()
             };
 
-            const data = await generateFlashcards(body);
+            let data = await generateFlashcards(body);
+
+            // Near-identical notes already have a deck, let the user pick it or a fresh one
+            if (data.reused && !confirm("Flashcards were already made from almost the same notes. Open them? Cancel generates new ones.")) {
+                data = await generateFlashcards({ ...body, forceNew: true });
+            }
+
             window.location.href = `/flashcard-generator/result?id=${encodeURIComponent(data.id)}`;
 
             if (FreeUsageText && FreeUsage?.checked) {
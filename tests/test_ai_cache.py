@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from routes.aiCache import ResponseCache, MakeCacheKey
+from routes.retryPolicy import RetryPolicy
+import routes.utils as utils
+from routes.quiz import ParseQuiz
+
+def test_make_cache_key_ignores_dict_order_and_query_string():
+    """
+    GIVEN two payloads with the same content in a different key order
+    WHEN MakeCacheKey is called with URLs that differ only in the query string
+    THEN check that both produce the same key
+    """
+    a = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.3}
+    b = {"temperature": 0.3, "messages": [{"role": "user", "content": "hi"}], "model": "gpt-4.1-nano"}
+    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+
+    assert MakeCacheKey("Gemini", url + "?key=one", a) == MakeCacheKey("Gemini", url + "?key=two", b)
+    assert MakeCacheKey("Gemini", url, a) != MakeCacheKey("OpenAI", url, a)
+
+def test_response_cache_evicts_least_recently_used_by_size():
+    """
+    GIVEN a cache that can hold roughly two entries
+    WHEN a third entry is added after the first one was read
+    THEN check that the least recently used entry is evicted
+    """
+    cache = ResponseCache(maxBytes=30)
+    cache.Put("k1", "a" * 10)
+    cache.Put("k2", "b" * 10)
+    assert cache.Get("k1") == "a" * 10
+
+    cache.Put("k3", "c" * 10)
+
+    assert cache.Get("k2") is None
+    assert cache.Get("k1") == "a" * 10
+    assert cache.Get("k3") == "c" * 10
+    assert cache.size <= 30
+
+def test_response_cache_expires_entries(mocker):
+    """
+    GIVEN a cached entry
+    WHEN its TTL has passed
+    THEN check that it is no longer returned
+    """
+    clock = mocker.patch('routes.aiCache.time.monotonic', return_value=100.0)
+    cache = ResponseCache(maxBytes=1024, ttl=10)
+    cache.Put("k", "value")
+
+    clock.return_value = 111.0
+    assert cache.Get("k") is None
+    assert len(cache) == 0
+
+def test_response_cache_reads_through_shared_tier(mocker):
+    """
+    GIVEN a shared tier that already holds a response
+    WHEN the local cache misses
+    THEN check that the shared response is returned and kept locally
+    """
+    collection = mocker.Mock()
+    collection.find_one.return_value = {"_id": "k", "response": "shared"}
+    cache = ResponseCache(maxBytes=1024, sharedCollection=lambda: collection)
+
+    assert cache.Get("k") == "shared"
+    assert cache.Get("k") == "shared"
+    collection.find_one.assert_called_once()
+    assert cache.sharedHits == 1 and cache.hits == 1
+
+def test_ai_req_serves_repeat_requests_from_cache(mocker):
+    """
+    GIVEN a successful provider response
+    WHEN AiReq is called twice with the same payload and cache enabled
+    THEN check that the provider is only called once
+    """
+    mocker.patch.object(utils, '_aiCache', ResponseCache(maxBytes=1024 * 1024))
+    response = mocker.Mock(status_code=200, content=b'{"choices": [{"message": {"content": "quiz"}}]}')
+    post = mocker.AsyncMock(return_value=response)
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "notes"}]}
+
+    first = utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True)
+    second = utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True)
+
+    assert first == second == "quiz"
+    post.assert_called_once()
+
+def test_ai_req_does_not_cache_errors(mocker):
+    """
+    GIVEN a provider returning an error status
+    WHEN AiReq is called with cache enabled
+    THEN check that the error is not cached
+    """
+    mocker.patch.object(utils, '_aiCache', ResponseCache(maxBytes=1024 * 1024))
+    mocker.patch.object(utils, '_retryPolicy', RetryPolicy(attempts=0))
+    response = mocker.Mock(status_code=429, content=b'{"error": "rate limited"}')
+    post = mocker.AsyncMock(return_value=response)
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "notes"}]}
+
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True) == "API error 429"
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True) == "API error 429"
+    assert post.call_count == 2
+
+def test_async_ai_req_shares_cache_with_sync_path(mocker):
+    """
+    GIVEN a response cached by a synchronous AiReq call
+    WHEN AsyncAiReq is awaited from another event loop with the same payload
+    THEN check that the cached response is returned without a second provider call
+    """
+    mocker.patch.object(utils, '_aiCache', ResponseCache(maxBytes=1024 * 1024))
+    response = mocker.Mock(status_code=200, content=b'{"choices": [{"message": {"content": "plan"}}]}')
+    post = mocker.AsyncMock(return_value=response)
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "notes"}]}
+
+    first = utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True)
+    second = asyncio.run(utils.AsyncAiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True))
+
+    assert first == second == "plan"
+    post.assert_called_once()
+
+def test_ai_req_retries_a_reply_that_did_not_parse(mocker):
+    """
+    GIVEN a provider whose first reply has no questions in it and whose second is a quiz
+    WHEN the quiz is requested three times with cache=CacheIfParsed(ParseQuiz)
+    THEN check that the bad reply isn't cached, so the retry reaches the provider, and the quiz then is
+    """
+    mocker.patch.object(utils, '_aiCache', ResponseCache(maxBytes=1024 * 1024))
+    bad = mocker.Mock(status_code=200, content=b'{"choices": [{"message": {"content": "Sorry, I cannot help with that."}}]}')
+    good = mocker.Mock(status_code=200, content=b'{"choices": [{"message": {"content": "1 What is 2+2? a) 3 b) 4 c) 5 d) 6|CORRECT:b|"}}]}')
+    post = mocker.AsyncMock(side_effect=[bad, good])
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "notes"}]}
+    cache = utils.CacheIfParsed(ParseQuiz)
+
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=cache).startswith("Sorry")
+    assert "CORRECT" in utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=cache)
+    assert "CORRECT" in utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=cache)
+    assert post.call_count == 2
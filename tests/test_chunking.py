@@ -0,0 +1,76 @@
+import pytest
+from routes.chunking import SplitNotes, ShareCounts, ChunkNotes, MergeQuizzes, MergeFlashcards
+
+def test_split_notes_keeps_short_notes_whole():
+    """
+    GIVEN notes shorter than the chunk size
+    WHEN SplitNotes is called
+    THEN check that the notes are returned unchanged as one chunk
+    """
+    assert SplitNotes("# Cells\n\nMitochondria make ATP.", maxChars=100) == ["# Cells\n\nMitochondria make ATP."]
+
+def test_split_notes_breaks_on_sections_and_paragraphs():
+    """
+    GIVEN notes with several sections larger than the chunk size
+    WHEN SplitNotes is called
+    THEN check that chunks respect the size and no section is cut in half
+    """
+    sections = [f"# Section {i}\n" + ("Sentence about topic %d. " % i) * 10 for i in range(6)]
+    notes = "\n\n".join(sections)
+
+    chunks = SplitNotes(notes, maxChars=600, maxChunks=8)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 600 for chunk in chunks)
+    assert all(chunk.count("# Section") >= 1 for chunk in chunks)
+    assert "".join(chunks).count("Sentence") == notes.count("Sentence")
+
+def test_split_notes_caps_chunk_count():
+    """
+    GIVEN very long notes
+    WHEN SplitNotes is called with a chunk limit
+    THEN check that no more than the limit of chunks is produced
+    """
+    notes = "\n\n".join("Paragraph %d has some words." % i for i in range(500))
+
+    assert len(SplitNotes(notes, maxChars=200, maxChunks=4)) <= 4
+
+def test_share_counts_sum_to_total():
+    """
+    GIVEN chunk sizes
+    WHEN ShareCounts splits a question count
+    THEN check that shares follow the sizes and add up to the total
+    """
+    assert ShareCounts(10, [100, 100]) == [5, 5]
+    assert sum(ShareCounts(7, [300, 100, 100])) == 7
+    assert ShareCounts(7, [300, 100, 100])[0] >= 4
+
+def test_chunk_notes_passes_amount_through_for_short_notes():
+    """
+    GIVEN short notes and an amount from the request body
+    WHEN ChunkNotes is called
+    THEN check that the original notes and amount are kept as-is
+    """
+    assert ChunkNotes("short notes", "10", maxChars=100) == [("short notes", "10")]
+
+def test_merge_quizzes_dedupes_and_renumbers():
+    """
+    GIVEN two parsed chunk quizzes that share a question
+    WHEN MergeQuizzes is called
+    THEN check that the repeat is dropped and keys are renumbered from 1
+    """
+    q = lambda text: {"question": text, "answers": {"a": "1", "b": "2", "c": "3", "d": "4"}, "correct": "a"}
+    merged = MergeQuizzes([{"1": q("What is ATP?"), "2": q("Where is DNA?")}, {"1": q("what is  ATP"), "2": q("What is RNA?")}], 10)
+
+    assert list(merged) == ["1", "2", "3"]
+    assert [merged[k]["question"] for k in merged] == ["What is ATP?", "Where is DNA?", "What is RNA?"]
+
+def test_merge_flashcards_respects_limit():
+    """
+    GIVEN more flashcards than requested
+    WHEN MergeFlashcards is called
+    THEN check that the result is trimmed to the limit
+    """
+    decks = [[{"question": "A", "answer": "1"}, {"question": "B", "answer": "2"}], [{"question": "C", "answer": "3"}]]
+
+    assert MergeFlashcards(decks, 2) == decks[0]
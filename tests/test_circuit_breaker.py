@@ -0,0 +1,115 @@
+import pytest
+from routes.circuitBreaker import (
+    CircuitBreaker, AdaptiveLimiter, ProviderGuard, IsProviderFailure, CLOSED, OPEN, HALF_OPEN
+)
+import routes.utils as utils
+
+def test_is_provider_failure_ignores_client_errors():
+    """
+    GIVEN results from AiReq
+    WHEN IsProviderFailure classifies them
+    THEN check that only outages, rate limits and timeouts count against the provider
+    """
+    assert IsProviderFailure(None)
+    assert IsProviderFailure("API error 503")
+    assert IsProviderFailure("API error 429")
+    assert not IsProviderFailure("API error 401")
+    assert not IsProviderFailure("1. Question? a) b) |CORRECT:a")
+
+def test_circuit_breaker_trips_and_recovers(mocker):
+    """
+    GIVEN a breaker seeing mostly failures
+    WHEN the cooldown passes and a probe succeeds
+    THEN check that it opens, lets one probe through half-open and closes again
+    """
+    clock = mocker.patch('routes.circuitBreaker.time.monotonic', return_value=100.0)
+    breaker = CircuitBreaker(minCalls=4, errorRate=0.5, cooldown=10)
+
+    for failed in (True, False, True, True):
+        assert breaker.Allow()
+        breaker.Record(failed, 1.0)
+
+    assert breaker.state == OPEN
+    assert not breaker.Allow()
+
+    clock.return_value = 111.0
+    assert breaker.Allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.Allow()
+
+    breaker.Record(False, 1.0)
+    assert breaker.state == CLOSED
+    assert breaker.Stats()["trips"] == 1 and breaker.Stats()["rejected"] == 2
+
+def test_circuit_breaker_trips_on_slow_calls():
+    """
+    GIVEN a provider that answers but very slowly
+    WHEN enough slow calls are recorded
+    THEN check that the breaker opens
+    """
+    breaker = CircuitBreaker(minCalls=3, slowCall=10, slowRate=0.6)
+
+    for _ in range(3):
+        breaker.Record(False, 25.0)
+
+    assert breaker.state == OPEN
+
+def test_adaptive_limiter_sheds_and_backs_off():
+    """
+    GIVEN a limiter with room for two requests
+    WHEN a third request arrives and then an overload is reported
+    THEN check that the third request is shed and the limit is halved
+    """
+    limiter = AdaptiveLimiter(initial=2, minimum=1)
+
+    assert limiter.Acquire() and limiter.Acquire()
+    assert not limiter.Acquire()
+
+    limiter.Release(False, 1.0)
+    limiter.Release(True, 1.0)
+
+    assert limiter.Stats() == {"limit": 1, "inFlight": 0, "shed": 1}
+
+def test_send_ai_req_sheds_with_503_when_circuit_open(mocker):
+    """
+    GIVEN an open circuit for a provider/model
+    WHEN AiReq is called
+    THEN check that no request is sent and "API error 503" is returned
+    """
+    breaker = CircuitBreaker(cooldown=60)
+    breaker._Open()
+    mocker.patch.dict(utils._providerGuards, {("OpenAI", "gpt-4.1-nano"): ProviderGuard(breaker, AdaptiveLimiter())})
+    post = mocker.AsyncMock()
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "notes"}]}
+
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI") == "API error 503"
+    post.assert_not_called()
+
+def test_user_key_rate_limits_dont_trip_shared_guard(mocker):
+    """
+    GIVEN a guard shared by every user of a provider/model
+    WHEN requests sent with a user's own key keep getting 429, then the free-tier key does
+    THEN check that the user's 429s leave the circuit and limit alone and the free-tier ones don't
+    """
+    mocker.patch.dict('os.environ', {"FREE_TIER_API_KEY": "server-key"})
+    mocker.patch.object(utils, 'Log')
+    guard = ProviderGuard(CircuitBreaker(minCalls=2, cooldown=60), AdaptiveLimiter(initial=8))
+    mocker.patch.dict(utils._providerGuards, {("OpenAI", "gpt-4.1-nano"): guard})
+    response = mocker.Mock(status_code=429, headers={}, content=b"{}")
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=mocker.AsyncMock(return_value=response)))
+    mocker.patch.object(utils, 'GetRetryPolicy', return_value=mocker.Mock(Delay=lambda *args: None))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "notes"}]}
+    url = "https://api.openai.com/v1/chat/completions"
+
+    for _ in range(4):
+        assert utils.AiReq(url, {"Authorization": "Bearer user-key"}, payload, "OpenAI") == "API error 429"
+
+    assert guard.breaker.state == CLOSED
+    assert guard.limiter.Stats() == {"limit": 8, "inFlight": 0, "shed": 0}
+
+    for _ in range(2):
+        utils.AiReq(url, {"Authorization": "Bearer server-key"}, payload, "OpenAI")
+
+    assert guard.breaker.state == OPEN
+    assert guard.limiter.Stats()["limit"] == 4
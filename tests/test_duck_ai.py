@@ -1,6 +1,6 @@
 import pytest
 from flask import Flask
-from routes.duckAI import GenerateResponse
+from routes.duckAI import GenerateResponse, GenerateResponseStream
 
 @pytest.fixture
 def app():
@@ -14,15 +14,11 @@ def test_generate_response_increment_usage_for_free_user(mocker, app):
     """
     GIVEN a free user who has not reached their daily limit
     WHEN GenerateResponse is called
-    THEN check that IncrementUsage is called
+    THEN check that a free use is reserved
     """
     mocker.patch('routes.duckAI.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
-    mocker.patch('routes.duckAI.GetMongoClient', return_value={
-        "EduDuck": {
-            "users": mocker.Mock(find_one=lambda x: {"daily_usage": {"timesUsed": 0}})
-        }
-    })
-    increment_usage_mock = mocker.patch('routes.duckAI.IncrementUsage')
+    mocker.patch('routes.duckAI.GetUserDoc', return_value={"daily_usage": {"timesUsed": 0}})
+    increment_usage_mock = mocker.patch('routes.duckAI.ReserveUsage')
     mocker.patch('routes.duckAI.AiReq', return_value="Test response")
 
     data = {
@@ -39,3 +35,56 @@ def test_generate_response_increment_usage_for_free_user(mocker, app):
     }
     GenerateResponse(prompts)
     increment_usage_mock.assert_called_once()
+
+def test_generate_response_stream_relays_chunks_and_stores_conversation(mocker, app):
+    """
+    GIVEN a provider streaming a response in several chunks
+    WHEN GenerateResponseStream is consumed to the end
+    THEN check that every chunk is relayed as an SSE event and the conversation is stored
+    """
+    mocker.patch('routes.duckAI.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
+    mocker.patch('routes.duckAI.AiReqStream', return_value=iter(["Hel", "lo"]))
+    store_mock = mocker.patch('routes.duckAI.StoreDuckAIConversation', return_value="conversation_id")
+
+    data = {
+        "isFree": False,
+        "message": "user: hi",
+        "userMessage": "hi",
+        "apiMode": "OpenAI",
+        "model": "gpt-4.1-nano",
+        "apiKey": "test_api_key"
+    }
+    mocker.patch('routes.duckAI.request', mocker.Mock(get_json=lambda: data))
+
+    with app.test_request_context():
+        response = GenerateResponseStream({"generateResponse": "{MESSAGE}"})
+        body = "".join(chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in response.response)
+
+    assert response.mimetype == "text/event-stream"
+    assert 'event: chunk\ndata: {"text":"Hel"}' in body
+    assert 'event: chunk\ndata: {"text":"lo"}' in body
+    assert 'event: done\ndata: {"queryID":"conversation_id"}' in body
+    store_mock.assert_called_once_with(
+        [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hello"}], None
+    )
+
+def test_generate_response_stream_maps_api_errors(mocker, app):
+    """
+    GIVEN a provider rejecting the request with a rate limit
+    WHEN GenerateResponseStream is consumed
+    THEN check that the friendly error message is sent and nothing is stored
+    """
+    mocker.patch('routes.duckAI.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
+    mocker.patch('routes.duckAI.AiReqStream', return_value=iter(["API error 429"]))
+    store_mock = mocker.patch('routes.duckAI.StoreDuckAIConversation')
+
+    data = {"message": "user: hi", "userMessage": "hi", "apiMode": "OpenAI", "apiKey": "test_api_key"}
+    mocker.patch('routes.duckAI.request', mocker.Mock(get_json=lambda: data))
+
+    with app.test_request_context():
+        response = GenerateResponseStream({"generateResponse": "{MESSAGE}"})
+        body = "".join(chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in response.response)
+
+    assert "event: error" in body
+    assert "Rate limit exceeded" in body
+    store_mock.assert_not_called()
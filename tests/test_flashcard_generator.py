@@ -57,15 +57,11 @@ def test_flashcard_generator_increment_usage_for_free_user(mocker, app):
     """
     GIVEN a free user who has not reached their daily limit
     WHEN FlashcardGenerator is called
-    THEN check that IncrementUsage is called
+    THEN check that a free use is reserved
     """
     mocker.patch('routes.flashcardGenerator.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
-    mocker.patch('routes.flashcardGenerator.GetMongoClient', return_value={
-        "EduDuck": {
-            "users": mocker.Mock(find_one=lambda x: {"daily_usage": {"timesUsed": 0}})
-        }
-    })
-    increment_usage_mock = mocker.patch('routes.flashcardGenerator.IncrementUsage')
+    mocker.patch('routes.flashcardGenerator.GetUserDoc', return_value={"daily_usage": {"timesUsed": 0}})
+    increment_usage_mock = mocker.patch('routes.flashcardGenerator.ReserveUsage')
     mocker.patch('routes.flashcardGenerator.AiReq', return_value="Question 1|Answer 1")
     mocker.patch('routes.flashcardGenerator.StoreQuery', return_value="test_query_id")
 
@@ -85,3 +81,35 @@ def test_flashcard_generator_increment_usage_for_free_user(mocker, app):
     }
     FlashcardGenerator(prompts, {})
     increment_usage_mock.assert_called_once()
+
+def test_flashcard_generator_fans_out_long_notes(mocker, app):
+    """
+    GIVEN notes longer than one chunk
+    WHEN FlashcardGenerator is called
+    THEN check that each chunk is requested through AiReqMany and the decks are merged
+    """
+    mocker.patch('routes.flashcardGenerator.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
+    mocker.patch('routes.flashcardGenerator.GetChunkConfig', return_value={"maxChars": 50, "maxChunks": 8, "concurrency": 4})
+    ai_req = mocker.patch('routes.flashcardGenerator.AiReq')
+    ai_req_many = mocker.patch('routes.flashcardGenerator.AiReqMany', return_value=["A|1~B|2", "b | 2~C|3", "API error 429"])
+    store_query = mocker.patch('routes.flashcardGenerator.StoreQuery', return_value="test_query_id")
+
+    data = {
+        "isFree": False,
+        "notes": "\n\n".join(["First part of the notes, long enough."] * 3),
+        "language": "English",
+        "apiMode": "OpenAI",
+        "amount": 6,
+        "apiKey": "test_api_key"
+    }
+    mocker.patch('routes.flashcardGenerator.request', mocker.Mock(get_json=lambda: data))
+
+    FlashcardGenerator({"flashcard": "Create {AMOUNT} flashcards about {NOTES} in {LANGUAGE}."}, {})
+
+    ai_req.assert_not_called()
+    assert len(ai_req_many.call_args.args[0]) == 3
+    store_query.assert_called_once_with("flashcards", [
+        {"question": "A", "answer": "1"},
+        {"question": "B", "answer": "2"},
+        {"question": "C", "answer": "3"}
+    ])
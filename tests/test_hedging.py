@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from routes.hedging import Hedge, Deadline, LatencyTracker, IsRetryable
+from routes.providers import GetProvider, RequestOptions
+import routes.utils as utils
+
+def Answer(result, delay):
+    async def call():
+        await asyncio.sleep(delay)
+        return result
+    return call
+
+def test_hedge_fallback_wins_when_primary_is_slow():
+    """
+    GIVEN a primary that is slower than the hedge delay
+    WHEN Hedge races it against a fast fallback
+    THEN check that the fallback result is returned and the primary is cancelled
+    """
+    cancelled = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "slow"
+
+    result = asyncio.run(Hedge(primary, Answer("fast", 0.01), 0.02, Deadline(2)))
+
+    assert result == ("fast", "fallback")
+    assert cancelled == [True]
+
+def test_hedge_starts_fallback_on_retryable_error():
+    """
+    GIVEN a primary that fails with a rate limit before the hedge delay
+    WHEN Hedge is awaited
+    THEN check that the fallback is started straight away and wins
+    """
+    result = asyncio.run(Hedge(Answer("API error 429", 0), Answer("quiz", 0), 10, Deadline(2)))
+
+    assert result == ("quiz", "fallback")
+
+def test_hedge_returns_non_retryable_primary_error():
+    """
+    GIVEN a primary that fails with an auth error
+    WHEN Hedge is awaited
+    THEN check that the error is returned without waiting for the fallback
+    """
+    result = asyncio.run(Hedge(Answer("API error 401", 0), Answer("quiz", 1), 10, Deadline(2)))
+
+    assert result == ("API error 401", "primary")
+    assert not IsRetryable("API error 401") and IsRetryable(None)
+
+def test_hedge_respects_deadline():
+    """
+    GIVEN requests slower than the latency budget
+    WHEN Hedge is awaited
+    THEN check that it gives up with a timeout once the budget is spent
+    """
+    result = asyncio.run(Hedge(Answer("late", 1), None, 0, Deadline(0.05)))
+
+    assert result == ("Request timeout", None)
+
+def test_latency_tracker_percentile():
+    """
+    GIVEN a tracker with 100 samples
+    WHEN the 95th percentile is requested
+    THEN check the nearest-rank value, and that too few samples return None
+    """
+    tracker = LatencyTracker(minSamples=20)
+    assert tracker.Percentile(95) is None
+
+    for i in range(1, 101):
+        tracker.Record(i / 10)
+
+    assert tracker.Percentile(95) == 9.5
+
+def test_build_fallback_request_only_crosses_providers_for_free_tier(mocker, monkeypatch):
+    """
+    GIVEN hedging configured to fall back to Gemini
+    WHEN a fallback request is built for a free-tier request and for a user's own key
+    THEN check that only the free-tier request is sent to the other provider
+    """
+    monkeypatch.setenv("FREE_TIER_API_KEY", "free-key")
+    mocker.patch.object(utils, '_hedgeConfig', {
+        "enabled": True, "percentile": 95, "initialDelay": 20, "minDelay": 2,
+        "mode": "Gemini", "model": None, "apiKey": "server-gemini-key", "budget": None
+    })
+
+    freeRequest = GetProvider("OpenAI").BuildRequest("notes", RequestOptions({}, "free-key"))
+    userRequest = GetProvider("OpenAI").BuildRequest("notes", RequestOptions({}, "user-key"))
+
+    API_URL, headers, payload, mode = utils.BuildFallbackRequest(*freeRequest)
+    assert mode == "Gemini"
+    assert headers["x-goog-api-key"] == "server-gemini-key"
+    assert payload["contents"][0]["parts"][0]["text"] == "notes"
+    assert utils.BuildFallbackRequest(*userRequest) is None
+
+def test_build_fallback_request_skips_the_same_gemini_model(mocker):
+    """
+    GIVEN hedging within Gemini to gemini-2.5-flash
+    WHEN fallback requests are built for a request to the default model and to another one
+    THEN check that the default one isn't hedged with a copy of itself and the other goes to the fallback model
+    """
+    mocker.patch.object(utils, '_hedgeConfig', {
+        "enabled": True, "percentile": 95, "initialDelay": 20, "minDelay": 2,
+        "mode": None, "model": "gemini-2.5-flash", "apiKey": None, "budget": None
+    })
+
+    default = GetProvider("Gemini").BuildRequest("notes", RequestOptions({}, "g-key"))
+    pro = GetProvider("Gemini").BuildRequest("notes", RequestOptions({"model": "gemini-2.5-pro"}, "g-key"))
+
+    assert utils.BuildFallbackRequest(*default) is None
+    API_URL, _, _, mode = utils.BuildFallbackRequest(*pro)
+    assert mode == "Gemini" and "/models/gemini-2.5-flash:generateContent" in API_URL
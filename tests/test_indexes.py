@@ -0,0 +1,108 @@
+from datetime import datetime
+from routes.indexes import INDEXES , EnsureIndexes , VerifyIndexes , PlanStages , HotQueries , SoftDeleteUpdate
+
+def Collections(mocker , existing: dict) -> dict:
+    """Mocked collections whose index_information returns existing.get(name, just _id)."""
+    collections = {}
+    for name in INDEXES:
+        collection = mocker.Mock()
+        collection.index_information.return_value = existing.get(name , {"_id_": {"key": [("_id", 1)], "v": 2}})
+        collections[name] = collection
+    return collections
+
+def test_ensure_indexes_creates_only_what_is_missing(mocker):
+    """
+    GIVEN quizzes with the queryID index in place and a TTL index whose expiry changed, other collections empty
+    WHEN EnsureIndexes runs without and then with rebuild
+    THEN check that missing indexes are created, the changed one is only replaced on rebuild and existing ones are kept
+    """
+    existing = {"quizzes": {
+        "_id_": {"key": [("_id", 1)], "v": 2},
+        "queryID_1_userID_1": {"key": [("queryID", 1), ("userID", 1)], "v": 2},
+        "deletedAt_1": {"key": [("deletedAt", 1)], "v": 2, "expireAfterSeconds": 60, "partialFilterExpression": {"deleted": True}}
+    }}
+    collections = Collections(mocker , existing)
+    mocker.patch('routes.indexes.GetMongoClient', return_value={"EduDuck": collections})
+    mocker.patch('routes.indexes.Log')
+
+    report = {(entry["collection"] , entry["index"]): entry["action"] for entry in EnsureIndexes()}
+
+    assert report[("quizzes" , "queryID_1_userID_1")] == "ok"
+    assert report[("quizzes" , "userID_1_createdAt_-1")] == "created"
+    assert report[("quizzes" , "deletedAt_1")] == "conflict"
+    assert report[("duck-ai" , "userID_1_lastEditedAt_-1")] == "created"
+    quizzes = collections["quizzes"]
+    assert [call.kwargs["name"] for call in quizzes.create_index.call_args_list] == ["userID_1_createdAt_-1"]
+    quizzes.drop_index.assert_not_called()
+
+    quizzes.reset_mock()
+    report = {(entry["collection"] , entry["index"]): entry["action"] for entry in EnsureIndexes(rebuild=True)}
+
+    assert report[("quizzes" , "deletedAt_1")] == "rebuilt"
+    quizzes.drop_index.assert_called_once_with("deletedAt_1")
+    ttl = [call for call in quizzes.create_index.call_args_list if call.kwargs["name"] == "deletedAt_1"][0]
+    assert ttl.kwargs["expireAfterSeconds"] == 2592000
+    assert ttl.kwargs["partialFilterExpression"] == {"deletedAt": {"$exists": True}}
+
+def test_plan_stages_reads_only_winning_plans():
+    """
+    GIVEN a find explain with a COLLSCAN among the rejected plans and an aggregate explain with its plan under $cursor
+    WHEN PlanStages is called
+    THEN check that only the winning plans' stages are returned
+    """
+    find = {"queryPlanner": {
+        "winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "queryID_1_userID_1"}},
+        "rejectedPlans": [{"stage": "COLLSCAN"}]
+    }}
+    aggregate = {"stages": [
+        {"$cursor": {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "GROUP", "inputStage": {"stage": "COLLSCAN"}}}}}},
+        {"$group": {}}
+    ]}
+
+    assert PlanStages(find) == {"FETCH" , "IXSCAN"}
+    assert PlanStages(aggregate) == {"GROUP" , "COLLSCAN"}
+
+def test_verify_indexes_flags_collection_scans(mocker):
+    """
+    GIVEN a database where every explain scans an index except the streak aggregation on flashcards
+    WHEN VerifyIndexes is called
+    THEN check that only that query is reported and every hot query was explained
+    """
+    mocker.patch('routes.indexes.Log')
+    indexed = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+    scanned = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}]}
+
+    db = mocker.MagicMock()
+    def Collection(name):
+        collection = mocker.Mock()
+        collection.name = name
+        collection.find.return_value.sort.return_value.limit.return_value.explain.return_value = indexed
+        collection.find.return_value.sort.return_value.explain.return_value = indexed
+        collection.find.return_value.explain.return_value = indexed
+        collection.database.command.return_value = scanned if name == "flashcards" else indexed
+        return collection
+    db.__getitem__.side_effect = Collection
+    mocker.patch('routes.indexes.GetMongoClient', return_value={"EduDuck": db})
+
+    report = VerifyIndexes()
+
+    assert len(report) == len(HotQueries())
+    assert [(entry["query"] , entry["collection"]) for entry in report if not entry["ok"]] == [("GetStudyStreakData" , "flashcards")]
+
+def test_deleted_ttl_matches_what_soft_delete_writes():
+    """
+    GIVEN a document marked the way delete_account soft-deletes it
+    WHEN it's checked against the partial filter of every TTL index
+    THEN check that each filter matches it and none matches a live document
+    """
+    deleted = SoftDeleteUpdate(datetime(2026 , 1 , 1))["$set"]
+    ttls = [index for indexes in INDEXES.values() for index in indexes if "expireAfterSeconds" in index["options"]]
+
+    def Matches(doc , expression):
+        return all((field in doc) == condition["$exists"] for field , condition in expression.items())
+
+    assert len(ttls) == len(INDEXES)
+    for index in ttls:
+        assert index["keys"] == [("deletedAt", 1)]
+        assert Matches(deleted , index["options"]["partialFilterExpression"])
+        assert not Matches({"username": "duck"} , index["options"]["partialFilterExpression"])
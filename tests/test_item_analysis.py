@@ -0,0 +1,129 @@
+import math
+import random
+import pytest
+from flask import Flask
+from routes.itemAnalysis import QuizKey , RollupUpdate , RecordSubmission , ItemStats
+from routes.parsers import submit_result
+from routes.quiz import submitResult
+
+QUIZ = {
+    "1": {"question": "What makes ATP?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "a"},
+    "2": {"question": "What stores DNA?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "b"},
+    "3": {"question": "What builds proteins?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "c"}
+}
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+
+def Apply(rollup: dict , inc: dict) -> None:
+    """Applies a $inc with dotted paths like MongoDB does."""
+    for path , amount in inc.items():
+        node = rollup
+        *parents , leaf = path.split(".")
+        for key in parents:
+            node = node.setdefault(key , {})
+        node[leaf] = node.get(leaf , 0) + amount
+
+def Pearson(xs: list , ys: list) -> float:
+    n = len(xs)
+    mx , my = sum(xs) / n , sum(ys) / n
+    cov = sum((x - mx) * (y - my) for x , y in zip(xs , ys)) / n
+    return cov / math.sqrt(sum((x - mx) ** 2 for x in xs) / n * sum((y - my) ** 2 for y in ys) / n)
+
+def test_incremental_rollup_matches_a_full_rescan():
+    """
+    GIVEN 200 random submissions of one quiz folded into a rollup one $inc at a time
+    WHEN ItemStats is computed from the rollup
+    THEN check that difficulty, option rates and discrimination equal the values computed from every attempt
+    """
+    rng = random.Random(7)
+    rollup = {}
+    results = []
+    for _ in range(200):
+        answers = {number: rng.choice(["a" , "b" , "c" , "C" , "d" , None]) for number in QUIZ}
+        result = submit_result(QUIZ , answers)
+        results.append(result)
+        Apply(rollup , RollupUpdate(result))
+
+    stats = ItemStats(rollup , QUIZ)
+
+    assert stats["attempts"] == 200
+    for number in QUIZ:
+        items = [int(result["results"][number]["right"]) for result in results]
+        rests = [result["score"] - item for result , item in zip(results , items)]
+        chosen = [result["results"][number]["user"].lower() or "blank" for result in results]
+
+        assert stats["questions"][number]["difficulty"] == pytest.approx(sum(items) / 200)
+        assert stats["questions"][number]["discrimination"] == pytest.approx(Pearson(items , rests) , abs=1e-4)
+        assert stats["questions"][number]["options"]["c"] == pytest.approx(chosen.count("c") / 200)
+        assert stats["questions"][number]["options"]["blank"] == pytest.approx(chosen.count("blank") / 200)
+
+def test_item_stats_without_spread():
+    """
+    GIVEN a quiz nobody attempted and one where every attempt got question 1 right
+    WHEN ItemStats is computed
+    THEN check that undefined difficulty and discrimination are None and unpicked distractors are flagged
+    """
+    assert ItemStats(None , QUIZ)["questions"]["1"] == {
+        "difficulty": None, "discrimination": None,
+        "options": {"a": 0.0, "b": 0.0, "c": 0.0, "d": 0.0, "blank": 0.0},
+        "weakDistractors": []
+    }
+
+    rollup = {}
+    for answers in ({"1": "a", "2": "b"} , {"1": "a", "2": "c"}):
+        Apply(rollup , RollupUpdate(submit_result(QUIZ , answers)))
+    question = ItemStats(rollup , QUIZ)["questions"]["1"]
+
+    assert question["difficulty"] == 1.0
+    assert question["discrimination"] is None
+    assert question["weakDistractors"] == ["b" , "c" , "d"]
+
+def test_record_submission_stores_and_rolls_up(mocker, app):
+    """
+    GIVEN a logged in user submitting a graded quiz
+    WHEN RecordSubmission is called
+    THEN check that the submission is stored and the quiz's rollup is upserted with one $inc keyed by its content
+    """
+    mocker.patch('routes.itemAnalysis.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
+    mocker.patch('routes.itemAnalysis.Log')
+    submissions , stats = mocker.Mock() , mocker.Mock()
+    mocker.patch('routes.itemAnalysis.GetMongoClient', return_value={"EduDuck": {"quiz-submissions": submissions, "quiz-stats": stats}})
+    result = submit_result(QUIZ , {"1": "a", "2": "d"})
+
+    resultID = RecordSubmission(QUIZ , result)
+
+    stored = submissions.insert_one.call_args.args[0]
+    assert stored["queryID"] == resultID and stored["query"] == result
+    query , update = stats.update_one.call_args.args
+    assert query == {"_id": QuizKey(QUIZ)}
+    assert update["$inc"]["attempts"] == 1
+    assert update["$inc"]["questions.1.rightScoreSum"] == 1
+    assert update["$inc"]["questions.2.options.d"] == 1
+    assert update["$inc"]["questions.3.options.blank"] == 1
+    assert stats.update_one.call_args.kwargs["upsert"] is True
+
+    # An imported copy under another ID shares the rollup, an edited one doesn't
+    assert QuizKey(dict(QUIZ)) == QuizKey(QUIZ)
+    assert QuizKey({**QUIZ, "3": {**QUIZ["3"], "correct": "d"}}) != QuizKey(QUIZ)
+
+def test_guest_submission_stays_in_memory(mocker, app):
+    """
+    GIVEN a guest submitting a quiz
+    WHEN submitResult is called
+    THEN check that the result goes to the temporary store as before
+    """
+    mocker.patch('routes.itemAnalysis.current_user', mocker.Mock(is_authenticated=False))
+    mocker.patch('routes.quiz.Log')
+    mocker.patch('routes.quiz.ObserveParser')
+    quizResults = {}
+
+    with app.test_request_context(json={"quiz": QUIZ, "answers": {"1": "a"}}):
+        response = submitResult(quizResults)
+
+    assert quizResults[response.get_json()["id"]]["score"] == 1
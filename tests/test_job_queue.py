@@ -0,0 +1,177 @@
+import time
+import pytest
+from flask import Flask, jsonify, request, g
+from flask_login import LoginManager
+import routes.jobQueue as jobQueue
+from routes.jobQueue import SqliteJobStore, JobWorkers, QUEUED, RUNNING, DONE, FAILED
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({"TESTING": True, "WTF_CSRF_ENABLED": False, "SECRET_KEY": "test"})
+    LoginManager(app).user_loader(lambda userID: None)
+    return app
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.EnsureIndexes()
+    return store
+
+def Job(jobID, kind="quiz", payload=None):
+    return {"_id": jobID, "kind": kind, "payload": payload or {"notes": "cells"}, "headers": {}, "userID": None}
+
+def test_sqlite_store_claims_each_job_once(store):
+    """
+    GIVEN two queued jobs
+    WHEN workers claim repeatedly
+    THEN check that jobs come out oldest first, once each, with the attempt counted
+    """
+    store.Enqueue(Job("a"))
+    store.Enqueue(Job("b"))
+
+    first = store.Claim(lease=60)
+    second = store.Claim(lease=60)
+
+    assert (first["_id"], second["_id"]) == ("a", "b")
+    assert first["state"] == RUNNING and first["attempts"] == 1
+    assert first["payload"] == {"notes": "cells"}
+    assert store.Claim(lease=60) is None
+
+def test_sqlite_store_reclaims_expired_lease(store):
+    """
+    GIVEN a job whose worker died while running it
+    WHEN its lease runs out
+    THEN check that another worker can claim it again
+    """
+    store.Enqueue(Job("a"))
+    store.Claim(lease=0.01)
+    time.sleep(0.02)
+
+    job = store.Claim(lease=60)
+
+    assert job["_id"] == "a" and job["attempts"] == 2
+
+def test_finish_drops_payload(store):
+    """
+    GIVEN a claimed job whose payload holds the user's API key
+    WHEN it finishes
+    THEN check that the result is kept and the payload is gone
+    """
+    store.Enqueue(Job("a", payload={"apiKey": "secret"}))
+    store.Claim(lease=60)
+
+    store.Finish("a", DONE, result={"id": "quiz-id"}, statusCode=200)
+    job = store.Get("a")
+
+    assert job["state"] == DONE and job["result"] == {"id": "quiz-id"}
+    assert job["payload"] is None
+
+def test_run_job_calls_view_with_stored_body(app, store):
+    """
+    GIVEN a queued quiz job and a handler for it
+    WHEN a worker runs the job
+    THEN check that the view sees the stored JSON body and its response becomes the result
+    """
+    seen = {}
+
+    def view():
+        seen["path"] = request.path
+        seen["body"] = request.get_json()
+        return jsonify({"id": "quiz-id"})
+
+    workers = JobWorkers(app, store, {"quiz": ("/quiz-generator/gen-quiz", view)})
+    store.Enqueue(Job("a", payload={"notes": "cells", "questionCount": 5}))
+
+    workers.RunJob(store.Claim(lease=60))
+    job = store.Get("a")
+
+    assert seen == {"path": "/quiz-generator/gen-quiz", "body": {"notes": "cells", "questionCount": 5}}
+    assert job["state"] == DONE and job["result"] == {"id": "quiz-id"} and job["statusCode"] == 200
+
+def test_run_job_fails_after_too_many_attempts(app, store):
+    """
+    GIVEN a job that kept losing its worker
+    WHEN it is claimed past the attempt limit
+    THEN check that it is failed without running the view again
+    """
+    view_calls = []
+    workers = JobWorkers(app, store, {"quiz": ("/quiz-generator/gen-quiz", lambda: view_calls.append(1))}, maxAttempts=1)
+    store.Enqueue(Job("a"))
+    store.Claim(lease=0.01)
+    time.sleep(0.02)
+
+    workers.RunJob(store.Claim(lease=60))
+
+    assert store.Get("a")["state"] == FAILED
+    assert view_calls == []
+
+def test_enqueue_and_poll_job_status(app, store, mocker):
+    """
+    GIVEN job mode enabled
+    WHEN a client asks for a job and polls its status
+    THEN check that it gets 202 with the job ID, then the queued state
+    """
+    workers = JobWorkers(app, store, {})
+    mocker.patch.object(workers, 'Start')
+    mocker.patch.object(jobQueue, '_jobWorkers', workers)
+
+    @app.route("/gen", methods=["POST"])
+    def gen():
+        assert jobQueue.JobRequested()
+        return jobQueue.EnqueueJob("quiz")
+
+    @app.route("/jobs/<job_id>")
+    def status(job_id):
+        return jobQueue.JobStatus(job_id)
+
+    client = app.test_client()
+    response = client.post("/gen", json={"notes": "cells", "job": True})
+    jobID = response.get_json()["job"]
+
+    assert response.status_code == 202
+    status = client.get(f"/jobs/{jobID}")
+    assert status.get_json() == {"id": jobID, "state": QUEUED}
+    assert status.headers["Retry-After"] == "2"
+    assert client.get("/jobs/missing").status_code == 404
+
+def test_init_job_queue_leaves_workers_to_the_server(app, tmp_path, mocker):
+    """
+    GIVEN job mode enabled with the SQLite store
+    WHEN the app sets up the job queue, as every CLI command does on import, and a server then starts it
+    THEN check that no worker thread starts until StartJobWorkers is called
+    """
+    mocker.patch.dict('os.environ', {"AI_JOBS": "1", "AI_JOBS_STORE": "sqlite", "AI_JOBS_SQLITE": str(tmp_path / "jobs.sqlite3")})
+    mocker.patch.object(jobQueue, '_jobWorkers', None)
+    start = mocker.patch.object(JobWorkers, 'Start')
+
+    assert jobQueue.InitJobQueue(app, {}) is jobQueue.GetJobWorkers()
+    start.assert_not_called()
+
+    jobQueue.StartJobWorkers()
+    start.assert_called_once()
+
+def test_reclaimed_job_runs_with_its_job_id(app, store):
+    """
+    GIVEN a job whose lease expired while its first run was still going
+    WHEN another worker reclaims and runs it
+    THEN check that both runs see the same job ID, which ReserveUsage charges once
+    """
+    seen = []
+
+    def view():
+        seen.append(g.jobID)
+        return jsonify({"id": "quiz-id"})
+
+    workers = JobWorkers(app, store, {"quiz": ("/quiz-generator/gen-quiz", view)})
+    store.Enqueue(Job("a"))
+    first = store.Claim(lease=0.01)
+    time.sleep(0.02)
+    second = store.Claim(lease=60)
+
+    workers.RunJob(first)
+    workers.RunJob(second)
+
+    assert second["attempts"] == 2
+    assert seen == ["a", "a"]
+    assert store.Get("a")["state"] == DONE
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+from prometheus_client import REGISTRY
+from routes.metrics import RequestPhases, TimedParser, MongoCommandMetrics, RenderMetrics
+from routes.retryPolicy import RetryPolicy
+import routes.utils as utils
+
+def Sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_request_phases_split_latency():
+    """
+    GIVEN trace events for a call that opened a new connection
+    WHEN the phases are observed
+    THEN check that connect, ttfb, body and decode each get their share of the time
+    """
+    phases = RequestPhases()
+    phases.start = 10.0
+    phases.marks = {
+        "connection.connect_tcp.started": 10.0,
+        "connection.start_tls.complete": 10.25,
+        "receive_response_headers.complete": 12.0
+    }
+    labels = {"provider": "OpenAI", "model": "phase-model", "route": "quiz_generate"}
+
+    phases.Observe("OpenAI", "phase-model", "quiz_generate", 13.0, 13.5)
+
+    assert Sample("eduduck_ai_request_seconds_sum", **labels, phase="connect") == 0.25
+    assert Sample("eduduck_ai_request_seconds_sum", **labels, phase="ttfb") == 2.0
+    assert Sample("eduduck_ai_request_seconds_sum", **labels, phase="body") == 1.0
+    assert Sample("eduduck_ai_request_seconds_sum", **labels, phase="decode") == 0.5
+    assert Sample("eduduck_ai_request_seconds_sum", **labels, phase="total") == 3.5
+
+def test_request_phases_trace_hook_strips_protocol_prefix():
+    """
+    GIVEN an HTTP/2 response headers event from httpx
+    WHEN it reaches the trace hook
+    THEN check that it is stored under the protocol-independent name
+    """
+    phases = RequestPhases()
+
+    asyncio.run(phases("http2.receive_response_headers.complete", {}))
+
+    assert "receive_response_headers.complete" in phases.marks
+
+def test_ai_req_counts_errors_by_status(mocker):
+    """
+    GIVEN a provider answering with a rate limit
+    WHEN AiReq is called outside a request
+    THEN check that the error is counted under its status, with the unknown model labelled custom
+    """
+    mocker.patch.object(utils, '_retryPolicy', RetryPolicy(attempts=0))
+    post = mocker.AsyncMock(return_value=mocker.Mock(status_code=429, content=b""))
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "metrics-model", "messages": [{"role": "user", "content": "notes"}]}
+    labels = {"provider": "OpenAI", "model": "custom", "route": "none", "status": "429"}
+    before = Sample("eduduck_ai_errors_total", **labels)
+
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI") == "API error 429"
+    assert Sample("eduduck_ai_errors_total", **labels) == before + 1
+    assert "trace" in post.call_args.kwargs["extensions"]
+
+def test_timed_parser_observes_runs():
+    """
+    GIVEN a parser wrapped with TimedParser
+    WHEN it is called
+    THEN check that its result is unchanged and one run is recorded
+    """
+    parse = TimedParser("test_parser")(lambda text: text.upper())
+    before = Sample("eduduck_parser_seconds_count", parser="test_parser")
+
+    assert parse("quiz") == "QUIZ"
+    assert Sample("eduduck_parser_seconds_count", parser="test_parser") == before + 1
+
+def test_mongo_command_metrics_labels_collection():
+    """
+    GIVEN started and succeeded events from the MongoDB driver
+    WHEN the listener handles them
+    THEN check that the duration is recorded under the command and collection
+    """
+    listener = MongoCommandMetrics()
+    listener.started(SimpleNamespace(request_id=7, command_name="insert", command={"insert": "metrics-test"}))
+    listener.succeeded(SimpleNamespace(request_id=7, command_name="insert", duration_micros=2500))
+
+    assert Sample("eduduck_mongo_seconds_sum", command="insert", collection="metrics-test", outcome="ok") == 0.0025
+    assert listener._collections == {}
+
+def test_render_metrics_prometheus_text():
+    """
+    GIVEN the metrics registry
+    WHEN it is rendered
+    THEN check that it uses the Prometheus text format
+    """
+    body, contentType = RenderMetrics()
+
+    assert contentType.startswith("text/plain")
+    assert b"# TYPE eduduck_ai_request_seconds histogram" in body
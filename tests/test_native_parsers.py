@@ -0,0 +1,182 @@
+import random
+import pytest
+from routes import pyParsers
+
+native_parsers = pytest.importorskip("native_parsers")
+
+FLASHCARDS = [
+    "",
+    "Question 1|Answer 1~Question 2|Answer 2",
+    "  What is ATP? | Energy carrier ~\nWhat is DNA?|Genetic code|with a pipe~",
+    "no separator~|no question~no answer|~ | ~",
+    "Wo ist das?　| Hier ~\x1cQ\x1f|A\x85",
+    "What does API error 429 mean? | Rate limit exceeded ~",
+]
+
+ANALYSES = [
+    "",
+    "   \n  ",
+    "invalid string",
+    """
+    OVERALL_SCORE: 85
+
+    SECTION: Clarity
+    CONFIDENCE: 90
+    ISSUES:
+    - Some sentences are a bit long.
+    WHY_IT_MATTERS:
+    - Long sentences can be hard to follow.
+    SUGGESTIONS:
+    - Break up long sentences.
+    -
+    """,
+    "OVERALL_SCORE: +7\r\nOVERALL_SCORE: lots\r\nSECTION: Ünïcode　\r\nCONFIDENCE: 1_0\r\nISSUES:\r\n-\ttabbed item\r\n",
+    "ISSUES:\n- before any section\nCONFIDENCE: 50\nSECTION:\nCONFIDENCE: ٣\nSUGGESTIONS:\n- kept\nCONFIDENCE: x\n- dropped, field reset\n",
+]
+
+SEEDS = range(40)
+CASES_PER_SEED = 50
+
+# Pieces of the formats the prompts ask for, plus the noise models add around them
+SPACES = ["", " ", "  ", "\t", "\n", "\r\n", "\n\n", "\x0b", "\x0c", "\x1c", "\x85", "\xa0", " ", "　"]
+WORDS = ["What", "is", "the", "powerhouse", "of", "cell", "ATP", "Mitochondria", "Zellkern", "日本語", "é", "1.5", "x)", "(a)", "Day", "day 2", "|", "~", ":", "-", "!", "?", ";", "..."]
+LETTERS = list("abcdABCDxe1 |")
+HEADINGS = ["Day " , "Day " , "day " , "Day" , "DAY " , "Week " , "Session " , "Dzień " , "DZIEŃ " , "Tydzień " , "Jour " , "Séance " ,
+            "День " , "ТИЖДЕНЬ " , "Заняття " , "Неделя " , "Tag " , "Montag " , "Woche " , "Jour\u202f" , "Sitzung\xa0"]
+
+def Noise(rng: random.Random) -> str:
+    return "".join(rng.choice(SPACES + WORDS) for _ in range(rng.randint(0, 4)))
+
+def Sentence(rng: random.Random , maxWords: int = 8) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, maxWords)))
+
+def LlmQuiz(rng: random.Random) -> str:
+    questions = []
+    for number in range(1 , rng.randint(0 , 24) + 1):
+        labels = ["a)" , "b)" , "c)" , "d)"]
+        if rng.random() < 0.1:
+            rng.shuffle(labels)
+        if rng.random() < 0.05:
+            labels.pop(rng.randrange(4))
+
+        options = rng.choice(SPACES).join(f"{label}{rng.choice(SPACES)}{Sentence(rng , 4)}{rng.choice(['', '.', '!', ' ?'])}" for label in labels)
+        marker = rng.choice(["|CORRECT:" , "|CORRECT: " , "|CORRECT:\n" , "| CORRECT:" , "|correct:"])
+        closing = rng.choice(["|" , " |" , "" , "||"])
+        questions.append(f"{rng.choice([str(number) , f'{number}.' , ''])} {Sentence(rng)}? {options} {marker}{rng.choice(LETTERS)}{closing}{Noise(rng)}")
+
+    return rng.choice(SPACES).join(questions)
+
+def LlmStudyPlan(rng: random.Random) -> str:
+    days = []
+    for number in range(rng.randint(0 , 12)):
+        label = rng.choice(HEADINGS) + rng.choice([str(number + 1) , "x" , ""]) + rng.choice([":" , ":" , "" , " :" , "\xa0:"])
+        days.append(f"{label}{rng.choice(SPACES)}{rng.choice(SPACES)}{Sentence(rng)}{Noise(rng)}")
+
+    return Noise(rng) + "\n".join(days)
+
+def LlmFlashcards(rng: random.Random) -> str:
+    cards = [f"{Sentence(rng)}{rng.choice(['|' , ' | ' , '' , '||'])}{Sentence(rng)}" for _ in range(rng.randint(0 , 12))]
+    return rng.choice(["~" , " ~\n" , "~~"]).join(cards)
+
+def LlmAnalysis(rng: random.Random) -> str:
+    keys = ["OVERALL_SCORE:" , "SECTION:" , "CONFIDENCE:" , "ISSUES:" , "WHY_IT_MATTERS:" , "SUGGESTIONS:" , "-" , "- "]
+    values = ["85" , " 90 " , "+7" , "1_0" , "٣" , "lots" , "" , Sentence(rng)]
+    lines = [f"{rng.choice(SPACES)}{rng.choice(keys)}{rng.choice(values)}" for _ in range(rng.randint(0 , 20))]
+    return rng.choice(["\n" , "\r\n"]).join(lines)
+
+def Splits(rng: random.Random , text: str) -> list:
+    pieces = []
+    while text:
+        size = rng.randint(1 , 24)
+        pieces.append(text[:size])
+        text = text[size:]
+    return pieces
+
+def Stream(parser , pieces: list) -> dict:
+    quiz = {}
+    for piece in pieces:
+        quiz.update(parser.feed(piece))
+    quiz.update(parser.finish())
+    return quiz
+
+@pytest.mark.parametrize("text", FLASHCARDS)
+def test_native_flashcards_match_python(text):
+    """
+    GIVEN flashcard model output, including odd whitespace and separators
+    WHEN both parsers read it
+    THEN check that the native parser returns exactly what the Python one does
+    """
+    assert native_parsers.parse_flashcards(text) == pyParsers.parse_flashcards(text)
+
+@pytest.mark.parametrize("text", ANALYSES)
+def test_native_note_analysis_matches_python(text):
+    """
+    GIVEN note analysis model output, including scores int() only partly accepts
+    WHEN both parsers read it
+    THEN check that the native parser returns exactly what the Python one does
+    """
+    assert native_parsers.parse_note_analysis(text) == pyParsers.parse_note_analysis(text)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fuzzed_quizzes_match(seed):
+    """
+    GIVEN generated quiz output with shuffled labels, odd markers and whitespace
+    WHEN both implementations parse it in one go, in a batch and streamed in random pieces
+    THEN check that every result is identical
+    """
+    rng = random.Random(seed)
+    texts = [LlmQuiz(rng) for _ in range(CASES_PER_SEED)]
+
+    expected = [pyParsers.parse_quiz(text) for text in texts]
+    assert [native_parsers.parse_quiz(text) for text in texts] == expected
+    assert native_parsers.parse_quiz_many(texts) == expected
+
+    for text , quiz in zip(texts , expected):
+        pieces = Splits(rng , text)
+        assert Stream(native_parsers.QuizStreamParser() , pieces) == quiz
+        assert Stream(pyParsers.QuizStreamParser() , pieces) == quiz
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fuzzed_study_plans_match(seed):
+    """
+    GIVEN generated study plan output with localized and broken headings and Unicode whitespace
+    WHEN both implementations parse it
+    THEN check that the results are identical
+    """
+    rng = random.Random(seed)
+    texts = [LlmStudyPlan(rng) for _ in range(CASES_PER_SEED)]
+
+    expected = [pyParsers.parse_study_plan(text) for text in texts]
+    assert [native_parsers.parse_study_plan(text) for text in texts] == expected
+    assert native_parsers.parse_study_plan_many(texts) == expected
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fuzzed_flashcards_and_analyses_match(seed):
+    """
+    GIVEN generated flashcard and note analysis output
+    WHEN both implementations parse it
+    THEN check that the results are identical
+    """
+    rng = random.Random(seed)
+
+    for _ in range(CASES_PER_SEED):
+        cards , analysis = LlmFlashcards(rng) , LlmAnalysis(rng)
+        assert native_parsers.parse_flashcards(cards) == pyParsers.parse_flashcards(cards)
+        assert native_parsers.parse_note_analysis(analysis) == pyParsers.parse_note_analysis(analysis)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fuzzed_submissions_match(seed):
+    """
+    GIVEN parsed quizzes and answers with wrong case, gaps and non-string values
+    WHEN both implementations grade them
+    THEN check that scores, percentages and per-question results are identical
+    """
+    rng = random.Random(seed)
+
+    for _ in range(CASES_PER_SEED):
+        quiz = pyParsers.parse_quiz(LlmQuiz(rng)) or {"1": {"question": "What makes ATP?", "correct": "a"}}
+        if rng.random() < 0.2:
+            quiz["1"]["correct"] = rng.choice([None , 3 , "" , "B"])
+        answers = {number: rng.choice(["a" , "b" , "C" , "D" , "" , None , 2 , "ä"]) for number in quiz if rng.random() < 0.9}
+
+        assert native_parsers.submit_result(quiz , answers) == pyParsers.submit_result(quiz , answers)
@@ -0,0 +1,190 @@
+import pytest
+from flask import Flask
+import random
+from collections import OrderedDict
+from routes import nearDuplicate
+from routes.nearDuplicate import NormalizeNotes, Shingles, Signature, Bands, Similarity, NoteIndex, MAX_SHINGLES, SIGNATURE_CACHE
+from routes.flashcardGenerator import FlashcardGenerator, FlashcardParams
+from routes.quiz import QuizParams
+
+NOTES = "\n\n".join([
+    "Photosynthesis converts light energy into chemical energy stored in glucose inside the chloroplasts of plant cells.",
+    "The light dependent reactions take place in the thylakoid membranes and produce ATP and NADPH while splitting water.",
+    "The Calvin cycle runs in the stroma and uses ATP and NADPH to fix carbon dioxide into three carbon sugars.",
+    "Cellular respiration breaks glucose down again in the mitochondria, releasing the energy as ATP for the cell."
+])
+
+def test_normalize_notes_ignores_case_and_punctuation():
+    """
+    GIVEN notes that differ only in casing, punctuation and whitespace
+    WHEN NormalizeNotes is called
+    THEN check that both give the same words
+    """
+    assert NormalizeNotes("The  Calvin cycle,\nruns!") == NormalizeNotes("the calvin cycle runs") == ["the", "calvin", "cycle", "runs"]
+
+def test_signature_similarity_of_near_duplicates():
+    """
+    GIVEN the same notes with a typo fixed and paragraphs reordered, and unrelated notes
+    WHEN their signatures are compared
+    THEN check that the edited notes stay similar and the unrelated ones do not
+    """
+    paragraphs = NOTES.split("\n\n")
+    edited = "\n\n".join([paragraphs[1], paragraphs[0].replace("glucose", "glucsoe"), *paragraphs[2:]])
+    other = "The French Revolution began in 1789 with the storming of the Bastille and ended the absolute monarchy."
+
+    assert Similarity(Signature(NOTES), Signature(NOTES.upper() + "  ")) == 1.0
+    assert Similarity(Signature(NOTES), Signature(edited)) >= 0.8
+    assert Similarity(Signature(NOTES), Signature(other)) < 0.2
+    assert set(Bands(Signature(NOTES))) & set(Bands(Signature(edited)))
+
+def test_long_notes_are_sampled_to_max_shingles():
+    """
+    GIVEN notes of about 2 MB and a copy with every 80th word replaced
+    WHEN they are shingled and signed
+    THEN check that at most MAX_SHINGLES shingles are hashed and the copy is still found similar
+    """
+    rng = random.Random(7)
+    vocabulary = ["".join(rng.choice("abcdefghij") for _ in range(rng.randint(2, 8))) for _ in range(5000)]
+    words = [rng.choice(vocabulary) for _ in range(350000)]
+    edited = [word if i % 80 else "changed" for i, word in enumerate(words)]
+
+    assert len(Shingles(" ".join(words))) == MAX_SHINGLES
+    assert Similarity(Signature(" ".join(words)), Signature(" ".join(edited))) >= 0.8
+
+def test_signature_cache_is_keyed_by_digest(mocker):
+    """
+    GIVEN an empty signature cache
+    WHEN the same notes are signed twice and more distinct notes than it holds follow
+    THEN check that MinHash runs once for the repeat, the cache stays bounded and never keeps the notes
+    """
+    mocker.patch('routes.nearDuplicate._signatures', OrderedDict())
+    minhash = mocker.spy(nearDuplicate, '_MinHash')
+
+    assert Signature(NOTES) == Signature(NOTES)
+    assert minhash.call_count == 1
+
+    for i in range(SIGNATURE_CACHE + 5):
+        Signature(f"{NOTES} {i}")
+
+    assert len(nearDuplicate._signatures) == SIGNATURE_CACHE
+    assert all(isinstance(key , bytes) and len(key) == 16 for key in nearDuplicate._signatures)
+
+def test_signature_of_empty_notes():
+    """
+    GIVEN notes without any words
+    WHEN Signature is called
+    THEN check that nothing is fingerprinted
+    """
+    assert Signature("  ...  ") == ()
+    assert Similarity((), ()) == 0.0
+
+def test_note_index_returns_most_similar_match_above_threshold(mocker):
+    """
+    GIVEN indexed fingerprints, one close to the notes and one only loosely related
+    WHEN NoteIndex.Find is called
+    THEN check that the close one is returned with its similarity
+    """
+    signature = list(Signature(NOTES))
+    loose = signature[:32] + [0] * 32
+    collection = mocker.Mock()
+    collection.find.return_value.sort.return_value.limit.return_value = [
+        {"signature": loose, "collection": "quizzes", "queryID": "loose"},
+        {"signature": signature, "collection": "quizzes", "queryID": "close"}
+    ]
+    index = NoteIndex(lambda: collection, threshold=0.8)
+
+    match = index.Find("quiz", NOTES, {"language": "English", "difficulty": "Easy", "amount": "10"})
+
+    assert match["queryID"] == "close" and match["similarity"] == 1.0
+    query = collection.find.call_args.args[0]
+    assert query["kind"] == "quiz" and query["params"] == {"language": "English", "difficulty": "Easy", "amount": "10"}
+    assert query["bands"]["$in"] == Bands(Signature(NOTES))
+
+def test_note_index_treats_store_errors_as_miss(mocker):
+    """
+    GIVEN a fingerprint collection that cannot be reached
+    WHEN NoteIndex.Find is called
+    THEN check that it reports no match instead of failing the request
+    """
+    collection = mocker.Mock()
+    collection.find.side_effect = RuntimeError("no server")
+
+    assert NoteIndex(lambda: collection).Find("quiz", NOTES, {}) is None
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+
+def FlashcardRequest(mocker, forceNew=False):
+    data = {
+        "isFree": True,
+        "notes": NOTES,
+        "language": "English",
+        "apiMode": "OpenAI",
+        "amount": 5,
+        "apiKey": None,
+        "forceNew": forceNew
+    }
+    mocker.patch('routes.flashcardGenerator.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
+    mocker.patch('routes.flashcardGenerator.GetUserDoc', return_value={"daily_usage": {"timesUsed": 0}})
+    mocker.patch('routes.flashcardGenerator.request', mocker.Mock(get_json=lambda: data))
+    return data
+
+def test_flashcard_generator_reuses_near_duplicate_deck(mocker, app):
+    """
+    GIVEN a free user whose notes match a deck generated before with the same settings
+    WHEN FlashcardGenerator is called
+    THEN check that a copy of that deck is returned without a provider call or using up a free generation
+    """
+    FlashcardRequest(mocker)
+    deck = [{"question": "Where does the Calvin cycle run?", "answer": "In the stroma"}]
+    find = mocker.patch('routes.flashcardGenerator.FindReusableQuery', return_value=(deck, 0.92))
+    increment_usage = mocker.patch('routes.flashcardGenerator.ReserveUsage')
+    ai_req = mocker.patch('routes.flashcardGenerator.AiReq')
+    store_query = mocker.patch('routes.flashcardGenerator.StoreQuery', return_value="copy_id")
+    remember = mocker.patch('routes.flashcardGenerator.RememberQuery')
+
+    response = FlashcardGenerator({"flashcard": "Create {AMOUNT} flashcards about {NOTES} in {LANGUAGE}."}, {})
+
+    assert response.get_json() == {"id": "copy_id", "reused": True, "similarity": 0.92}
+    find.assert_called_once_with("flashcards", NOTES, {"language": "English", "amount": "5", "apiMode": "OpenAI", "model": ""})
+    store_query.assert_called_once_with("flashcards", deck)
+    ai_req.assert_not_called()
+    increment_usage.assert_not_called()
+    remember.assert_not_called()
+
+def test_flashcard_generator_force_new_skips_reuse(mocker, app):
+    """
+    GIVEN a user who asked for a fresh deck
+    WHEN FlashcardGenerator is called
+    THEN check that no lookup is made and the new deck is fingerprinted
+    """
+    data = FlashcardRequest(mocker, forceNew=True)
+    find = mocker.patch('routes.flashcardGenerator.FindReusableQuery')
+    mocker.patch('routes.flashcardGenerator.ReserveUsage')
+    mocker.patch('routes.flashcardGenerator.AiReq', return_value="Question 1|Answer 1")
+    mocker.patch('routes.flashcardGenerator.StoreQuery', return_value="new_id")
+    remember = mocker.patch('routes.flashcardGenerator.RememberQuery')
+
+    response = FlashcardGenerator({"flashcard": "Create {AMOUNT} flashcards about {NOTES} in {LANGUAGE}."}, {})
+
+    assert response.get_json() == {"id": "new_id"}
+    find.assert_not_called()
+    remember.assert_called_once_with("flashcards", "new_id", data["notes"], {"language": "English", "amount": "5", "apiMode": "OpenAI", "model": ""})
+
+def test_reuse_params_include_provider_and_model():
+    """
+    GIVEN the same notes settings sent to different providers or models
+    WHEN the reuse settings are built
+    THEN check that each provider and model gets its own settings so a result is never reused across them
+    """
+    data = {"language": "English", "amount": 5, "questionCount": 5, "difficulty": "Easy", "apiMode": "OpenAI"}
+
+    assert FlashcardParams(data) == {"language": "English", "amount": "5", "apiMode": "OpenAI", "model": ""}
+    assert FlashcardParams(data) != FlashcardParams({**data, "apiMode": "Gemini"})
+    assert QuizParams(data) != QuizParams({**data, "model": " gpt-4o "})
+    assert QuizParams({**data, "model": " gpt-4o "})["model"] == "gpt-4o"
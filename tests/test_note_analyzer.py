@@ -73,15 +73,11 @@ def test_note_analyzer_increment_usage_for_free_user(mocker, app):
     """
     GIVEN a free user who has not reached their daily limit
     WHEN NoteAnalyzer is called
-    THEN check that IncrementUsage is called
+    THEN check that a free use is reserved
     """
     mocker.patch('routes.noteAnalyzer.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
-    mocker.patch('routes.noteAnalyzer.GetMongoClient', return_value={
-        "EduDuck": {
-            "users": mocker.Mock(find_one=lambda x: {"daily_usage": {"timesUsed": 0}})
-        }
-    })
-    increment_usage_mock = mocker.patch('routes.noteAnalyzer.IncrementUsage')
+    mocker.patch('routes.noteAnalyzer.GetUserDoc', return_value={"daily_usage": {"timesUsed": 0}})
+    increment_usage_mock = mocker.patch('routes.noteAnalyzer.ReserveUsage')
     mocker.patch('routes.noteAnalyzer.AiReq', return_value="OVERALL_SCORE: 85")
     mocker.patch('routes.noteAnalyzer.StoreQuery', return_value="test_query_id")
 
@@ -1,6 +1,7 @@
+import asyncio
 import pytest
 from flask import Flask
-from routes.noteEnhancer import EnhanceNotes
+from routes.noteEnhancer import EnhanceNotes, EnhanceNotesAsync
 
 @pytest.fixture
 def app():
@@ -17,11 +18,7 @@ def test_enhance_notes_free_user_limit(mocker, app):
     THEN check that the "dailyLimit.html" template is rendered
     """
     mocker.patch('routes.noteEnhancer.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
-    mocker.patch('routes.noteEnhancer.GetMongoClient', return_value={
-        "EduDuck": {
-            "users": mocker.Mock(find_one=lambda x: {"daily_usage": {"timesUsed": 3}})
-        }
-    })
+    mocker.patch('routes.noteEnhancer.GetUserDoc', return_value={"daily_usage": {"timesUsed": 3}})
     mocker.patch('routes.noteEnhancer.render_template', return_value="dailyLimit.html")
 
     data = {
@@ -40,15 +37,11 @@ def test_enhance_notes_increment_usage_for_free_user(mocker, app):
     """
     GIVEN a free user who has not reached their daily limit
     WHEN EnhanceNotes is called
-    THEN check that IncrementUsage is called
+    THEN check that a free use is reserved
     """
     mocker.patch('routes.noteEnhancer.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
-    mocker.patch('routes.noteEnhancer.GetMongoClient', return_value={
-        "EduDuck": {
-            "users": mocker.Mock(find_one=lambda x: {"daily_usage": {"timesUsed": 0}})
-        }
-    })
-    increment_usage_mock = mocker.patch('routes.noteEnhancer.IncrementUsage')
+    mocker.patch('routes.noteEnhancer.GetUserDoc', return_value={"daily_usage": {"timesUsed": 0}})
+    increment_usage_mock = mocker.patch('routes.noteEnhancer.ReserveUsage')
     mocker.patch('routes.noteEnhancer.AiReq', return_value="Enhanced notes")
     mocker.patch('routes.noteEnhancer.StoreQuery', return_value="test_query_id")
 
@@ -67,3 +60,31 @@ def test_enhance_notes_increment_usage_for_free_user(mocker, app):
     }
     EnhanceNotes(prompts, {})
     increment_usage_mock.assert_called_once()
+
+def test_enhance_notes_async_awaits_async_ai_req(mocker, app):
+    """
+    GIVEN a user with their own API key
+    WHEN EnhanceNotesAsync is awaited
+    THEN check that the notes come from AsyncAiReq and are stored
+    """
+    mocker.patch('routes.noteEnhancer.current_user', mocker.Mock(is_authenticated=False))
+    mocker.patch('routes.noteEnhancer.jsonify', side_effect=lambda x: x)
+    async_ai_req = mocker.patch('routes.noteEnhancer.AsyncAiReq', mocker.AsyncMock(return_value="# Enhanced"))
+    sync_ai_req = mocker.patch('routes.noteEnhancer.AiReq')
+
+    data = {
+        "isFree": False,
+        "notes": "test notes",
+        "language": "English",
+        "apiMode": "OpenAI",
+        "model": "gpt-4.1-nano",
+        "apiKey": "test_api_key"
+    }
+    mocker.patch('routes.noteEnhancer.request', mocker.Mock(get_json=lambda: data))
+
+    notes = {}
+    response = asyncio.run(EnhanceNotesAsync({"enhanceNotes": "{NOTES} {LANGUAGE}"}, notes))
+
+    async_ai_req.assert_awaited_once()
+    sync_ai_req.assert_not_called()
+    assert notes[response["id"]] == "# Enhanced"
@@ -0,0 +1,61 @@
+import json
+import re
+from routes.promptTemplates import FormatPrompt, AppendPrompt
+from routes.providers import GetProvider, RequestOptions
+
+def LoadPrompts():
+    with open("prompts.json", "r") as file:
+        return json.load(file)
+
+def test_system_prefixes_are_static():
+    """
+    GIVEN the templates in prompts.json
+    WHEN their system parts are inspected
+    THEN check that none holds a per-request placeholder, so every request shares the prefix
+    """
+    for name, template in LoadPrompts().items():
+        if isinstance(template, dict):
+            assert not re.search(r"\{[A-Z_]+\}", template["system"]), name
+            assert "{" in template["user"], name
+
+def test_format_prompt_keeps_plain_string_templates():
+    """
+    GIVEN an old-style string template and a system/user template
+    WHEN both are formatted and extended
+    THEN check the string stays a string and only the user part of the split one changes
+    """
+    assert FormatPrompt("Notes: {NOTES}", NOTES="cells") == "Notes: cells"
+
+    prompt = AppendPrompt(FormatPrompt({"system": "Rules {not a field}", "user": "Notes: {NOTES}"}, NOTES="cells"), "!")
+
+    assert prompt == {"system": "Rules {not a field}", "user": "Notes: cells!"}
+
+def test_split_prompt_payloads_and_recovery():
+    """
+    GIVEN a system/user prompt
+    WHEN OpenAI and Gemini requests are built from it
+    THEN check the static part goes first as system instructions and the prompt can be recovered for hedging
+    """
+    prompt = {"system": "Rules", "user": "Notes"}
+
+    _, _, payload, _ = GetProvider("OpenAI").BuildRequest(prompt, RequestOptions({}, "key"))
+    assert payload["messages"] == [{"role": "system", "content": "Rules"}, {"role": "user", "content": "Notes"}]
+    assert GetProvider("OpenAI").PromptOf(payload) == prompt
+
+    _, _, payload, _ = GetProvider("Gemini").BuildRequest(prompt, RequestOptions({}, "key"))
+    assert payload["systemInstruction"] == {"parts": [{"text": "Rules"}]}
+    assert payload["contents"][0]["parts"][0]["text"] == "Notes"
+    assert GetProvider("Gemini").PromptOf(payload) == prompt
+
+def test_decode_reply_reports_cached_prompt_tokens():
+    """
+    GIVEN replies whose usage reports prompt-cache hits
+    WHEN they are decoded
+    THEN check the prompt and cached token counts come back with the text
+    """
+    chat = b'{"choices": [{"message": {"content": "hi"}}], "usage": {"prompt_tokens": 2048, "prompt_tokens_details": {"cached_tokens": 1920}}}'
+    gemini = b'{"candidates": [{"content": {"parts": [{"text": "hi"}]}}], "usageMetadata": {"promptTokenCount": 1500, "cachedContentTokenCount": 1024}}'
+
+    assert GetProvider("OpenAI").DecodeReply(chat) == ("hi", True, (2048, 1920))
+    assert GetProvider("Gemini").DecodeReply(gemini) == ("hi", True, (1500, 1024))
+    assert GetProvider("OpenAI").DecodeReply(b'{"choices": [{"message": {"content": "hi"}}]}')[2] is None
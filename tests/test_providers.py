@@ -0,0 +1,124 @@
+import pytest
+from routes.providers import GetProvider, IsReasoningModel, RequestOptions, ModelLabel
+
+def test_is_reasoning_model():
+    """
+    GIVEN a few model names
+    WHEN IsReasoningModel is called
+    THEN check that only reasoning models are detected
+    """
+    assert IsReasoningModel("gpt-5-mini")
+    assert IsReasoningModel("O1-preview")
+    assert not IsReasoningModel("gpt-4.1-nano")
+    assert not IsReasoningModel(None)
+
+def test_openai_provider_builds_request():
+    """
+    GIVEN request data with a padded model name
+    WHEN the OpenAI provider builds a request
+    THEN check the endpoint, headers and sampling options
+    """
+    options = RequestOptions({"model": " gpt-4.1-mini ", "temperature": 0.5}, "sk-test")
+    API_URL, headers, payload, mode = GetProvider("OpenAI").BuildRequest("prompt", options)
+
+    assert API_URL == "https://api.openai.com/v1/chat/completions"
+    assert headers == {"Content-Type": "application/json", "Authorization": "Bearer sk-test"}
+    assert payload == {
+        "model": "gpt-4.1-mini",
+        "messages": [{"role": "user", "content": "prompt"}],
+        "max_tokens": 4096,
+        "temperature": 0.5,
+        "top_p": 0.9
+    }
+    assert mode == "OpenAI"
+
+def test_reasoning_model_uses_max_completion_tokens():
+    """
+    GIVEN a reasoning model
+    WHEN the OpenAI provider builds a payload
+    THEN check that max_completion_tokens is used and sampling options are left out
+    """
+    _, _, payload, _ = GetProvider("OpenAI").BuildRequest("prompt", RequestOptions({"model": "gpt-5"}, "sk-test"))
+
+    assert payload["max_completion_tokens"] == 4096
+    assert "max_tokens" not in payload and "temperature" not in payload
+
+def test_hugging_face_and_gemini_providers():
+    """
+    GIVEN the Hugging Face and Gemini providers
+    WHEN they build requests without a model, and Gemini with one
+    THEN check their defaults, auth headers and payload shapes, and that Gemini's URL names the model
+    """
+    API_URL, headers, payload, _ = GetProvider("Hugging Face").BuildRequest("prompt", RequestOptions({}, "hf-key"))
+    assert API_URL == "https://router.huggingface.co/v1/chat/completions"
+    assert headers == {"Authorization": "Bearer hf-key"}
+    assert payload["model"] == "openai/gpt-oss-20b"
+
+    API_URL, headers, payload, _ = GetProvider("Gemini").BuildRequest("prompt", RequestOptions({}, "g-key"))
+    assert API_URL.endswith("gemini-2.5-flash:generateContent?key=g-key")
+    assert headers["x-goog-api-key"] == "g-key"
+    assert payload == {"contents": [{"role": "user", "parts": [{"text": "prompt"}]}]}
+
+    API_URL, _, _, _ = GetProvider("Gemini").BuildRequest("prompt", RequestOptions({"model": "gemini-2.5-pro"}, "g-key"))
+    assert API_URL.endswith("/models/gemini-2.5-pro:generateContent?key=g-key")
+    assert GetProvider("Gemini").ModelOf(API_URL, payload) == "gemini-2.5-pro"
+    assert "/models/a%2F..%3Fx:generateContent" in GetProvider("Gemini").Endpoint("g-key", "a/..?x")
+
+def test_provider_extractors():
+    """
+    GIVEN decoded OpenAI and Gemini responses
+    WHEN each provider extracts the text
+    THEN check the text is returned and malformed bodies are reported as unparsed
+    """
+    assert GetProvider("OpenAI").Extract({"choices": [{"message": {"content": "hi"}}]}) == ("hi", True)
+    assert GetProvider("Gemini").Extract({"candidates": [{"content": {"parts": [{"text": "a"}, {"text": "b"}]}}]}) == ("ab", True)
+    assert GetProvider("Gemini").Extract({})[1] is False
+
+def test_provider_typed_decode_skips_unread_fields():
+    """
+    GIVEN raw reply bodies with usage, logprobs and safety ratings
+    WHEN each provider decodes them with its typed schema
+    THEN check the same text comes back as the dict path would give
+    """
+    chat = b'{"id": "x", "choices": [{"index": 0, "message": {"role": "assistant", "content": "hi", "reasoning": "..."}, "logprobs": {"content": []}}], "usage": {"total_tokens": 9}}'
+    gemini = b'{"candidates": [{"content": {"parts": [{"text": "a"}, {"text": "b"}]}, "safetyRatings": [{"category": "x"}]}], "usageMetadata": {}}'
+
+    assert GetProvider("OpenAI").Decode(chat) == ("hi", True)
+    assert GetProvider("Hugging Face").Decode(chat) == ("hi", True)
+    assert GetProvider("Gemini").Decode(gemini) == ("ab", True)
+
+def test_provider_typed_decode_falls_back_on_unexpected_shapes():
+    """
+    GIVEN replies the typed schemas don't describe
+    WHEN they are decoded
+    THEN check the dict path reports them as unparsed, like before
+    """
+    assert GetProvider("OpenAI").Decode(b'{"error": {"message": "nope"}}') == ("Error parsing OpenAI response.", False)
+    assert GetProvider("Gemini").Decode(b'{"candidates": [{"finishReason": "SAFETY"}]}') == ("Unknown API format.", False)
+
+def test_provider_generate_calls_ai_req(mocker):
+    """
+    GIVEN a provider
+    WHEN generate is called
+    THEN check that AiReq receives the built request
+    """
+    ai_req = mocker.patch('routes.utils.AiReq', return_value="output")
+
+    assert GetProvider("OpenAI").generate("prompt", RequestOptions({}, "sk-test"), cache=True) == "output"
+    args, kwargs = ai_req.call_args
+    assert args[0] == "https://api.openai.com/v1/chat/completions" and args[3] == "OpenAI"
+    assert kwargs == {"cache": True}
+
+def test_model_label_bounds_client_models(monkeypatch):
+    """
+    GIVEN known, configured fallback, missing and made-up model names
+    WHEN ModelLabel is called
+    THEN check that only known and configured models keep their name
+    """
+    monkeypatch.setenv("AI_FALLBACK_MODEL", "gpt-4o-2024-08-06")
+
+    assert ModelLabel("OpenAI", "gpt-4.1-nano") == "gpt-4.1-nano"
+    assert ModelLabel("Gemini", "gemini-2.5-pro") == "gemini-2.5-pro"
+    assert ModelLabel("OpenAI", "gpt-4o-2024-08-06") == "gpt-4o-2024-08-06"
+    assert ModelLabel("Hugging Face", None) == "default"
+    assert ModelLabel("OpenAI", "x" * 200) == ModelLabel("Gemini", "gpt-4.1-nano") == "custom"
@@ -0,0 +1,98 @@
+import pytest
+from routes.pyParsers import parse_quiz , QuizStreamParser , submit_result , parse_study_plan
+
+QUIZ = (
+    "1 Which organelle makes ATP? a) Mitochondria b) Nucleus. c) Ribosome d) Golgi |CORRECT: A|\n"
+    "2 Short but kept a) x b) y c) z d) w |CORRECT:b|\n"
+    "3 Which labels are out of order? b) one a) two c) three d) four |CORRECT:c|\n"
+    "4 What stores genetic information? a) Lipids b) DNA c) Water d) Salt |CORRECT: x|"
+)
+
+def test_parse_quiz_skips_broken_questions_and_renumbers():
+    """
+    GIVEN quiz output with a valid question, one with out-of-order labels and an unknown answer letter
+    WHEN parse_quiz is called
+    THEN check that broken questions are dropped, answers are trimmed and the letter falls back to a
+    """
+    quiz = parse_quiz(QUIZ)
+
+    assert list(quiz) == ["1", "2", "3"]
+    assert quiz["1"] == {
+        "question": "Which organelle makes ATP?",
+        "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"},
+        "correct": "a"
+    }
+    assert quiz["2"]["question"] == "Short but kept"
+    assert quiz["3"]["correct"] == "a"
+
+@pytest.mark.parametrize("size", [1, 3, 9, 40])
+def test_stream_parser_matches_parse_quiz(size):
+    """
+    GIVEN quiz output arriving in pieces of a fixed size
+    WHEN every piece is fed to a QuizStreamParser
+    THEN check that the merged questions equal parse_quiz on the whole text and feed after finish fails
+    """
+    parser = QuizStreamParser()
+    quiz = {}
+    for start in range(0 , len(QUIZ) , size):
+        quiz.update(parser.feed(QUIZ[start:start + size]))
+    quiz.update(parser.finish())
+
+    assert quiz == parse_quiz(QUIZ)
+    assert parser.count == len(quiz)
+    with pytest.raises(RuntimeError):
+        parser.feed("more")
+
+def test_submit_result_grades_like_the_native_parser():
+    """
+    GIVEN a quiz and answers in another case, a missing answer and a non-string answer
+    WHEN submit_result is called
+    THEN check that only ASCII case is ignored and the percentage rounds half away from zero
+    """
+    quiz = {str(n): {"question": "Q", "correct": "a"} for n in range(1 , 9)}
+    answers = {"1": "A", "2": "a", "3": "b", "4": 1, "5": "á"}
+
+    result = submit_result(quiz , answers)
+
+    assert result["score"] == 2
+    assert result["total"] == 8
+    assert result["percentage"] == 25.0
+    assert result["results"]["4"] == {"correct": "a", "user": "", "right": False}
+    assert submit_result({"1": {"correct": "a"}, "2": {}, "3": {}, "4": {}, "5": {}, "6": {}, "7": {}, "8": {}}, {"1": "a"})["percentage"] == 12.5
+
+    with pytest.raises(ValueError):
+        submit_result({} , {})
+
+def test_parse_study_plan_splits_on_numbered_days():
+    """
+    GIVEN study plan output with a day label missing its number and an ideographic space
+    WHEN parse_study_plan is called
+    THEN check that the unnumbered label stays part of the previous day's tasks
+    """
+    plan = parse_study_plan("Intro\nDay 1:\n  Read chapter one　\nDay x: rest\nDay 2: Quiz yourself")
+
+    assert plan == [
+        {"day": "Day 1:", "tasks": "Read chapter one　\nDay x: rest"},
+        {"day": "Day 2:", "tasks": "Quiz yourself"}
+    ]
+
+def test_parse_study_plan_reads_localized_and_week_headings():
+    """
+    GIVEN study plans with Polish, French, Ukrainian and German headings, weeks and a heading inside a longer word
+    WHEN parse_study_plan is called
+    THEN check that every language splits into entries and "Montag 1:" isn't read as "Tag 1:"
+    """
+    assert [entry["day"] for entry in parse_study_plan("Dzień 1: Czytaj\nDZIEŃ 2: Quiz")] == ["Dzień 1:" , "DZIEŃ 2:"]
+    assert parse_study_plan("Jour 1\u202f: Lire\nSéance 2 : Réviser") == [
+        {"day": "Jour 1\u202f:", "tasks": "Lire"},
+        {"day": "Séance 2 :", "tasks": "Réviser"}
+    ]
+    assert parse_study_plan("ТИЖДЕНЬ 1:\nДень 1: Читати") == [
+        {"day": "ТИЖДЕНЬ 1:", "tasks": ""},
+        {"day": "День 1:", "tasks": "Читати"}
+    ]
+    assert parse_study_plan("Woche 1:\nTag 1: Lesen, Montag 1: frei\nTag 2: Quiz") == [
+        {"day": "Woche 1:", "tasks": ""},
+        {"day": "Tag 1:", "tasks": "Lesen, Montag 1: frei"},
+        {"day": "Tag 2:", "tasks": "Quiz"}
+    ]
@@ -1,6 +1,6 @@
 import pytest
 from flask import Flask
-from routes.quiz import QuizGen
+from routes.quiz import QuizGen, QuizGenStream
 
 @pytest.fixture
 def app():
@@ -63,3 +63,37 @@ def test_quiz_gen_calls_parse_quiz(mocker, app):
     QuizGen(prompts, {})
     ai_req_mock.assert_called_once()
     parse_quiz_mock.assert_called_once_with("1. Question? a) ans b) ans |CORRECT:a")
+
+def test_quiz_gen_stream_sends_questions_as_they_complete(mocker, app):
+    """
+    GIVEN a model that streams a quiz in pieces that split questions
+    WHEN QuizGenStream is called
+    THEN check that each question is sent once its block is complete, then the stored quiz ID
+    """
+    mocker.patch('routes.quiz.current_user', mocker.Mock(is_authenticated=False))
+    mocker.patch('routes.quiz.FindReusableQuery', return_value=None)
+    mocker.patch('routes.quiz.AiReqStream', return_value=iter([
+        "1 What color is grass? a) blue b) red c) green d) yel",
+        "low|CORRECT:c|2 What is 2+2? a) 3 b)",
+        " 4 c) 5 d) 6|CORRECT:b|"
+    ]))
+    store_temp_query = mocker.patch('routes.quiz.StoreTempQuery', return_value="test_query_id")
+
+    data = {
+        "isFree": False,
+        "notes": "test notes",
+        "language": "English",
+        "questionCount": 2,
+        "apiMode": "OpenAI",
+        "difficulty": "Easy",
+        "apiKey": "test_api_key"
+    }
+
+    with app.test_request_context(json=data):
+        response = QuizGenStream({"quiz": "Create {AMOUNT} questions about {NOTES} in {LANGUAGE} at {DIFFICULTY}."}, {})
+        events = response.get_data(as_text=True).strip().split("\n\n")
+
+    assert [event.split("\n")[0] for event in events] == ["event: question", "event: question", "event: done"]
+    assert '"correct":"c"' in events[0] and '"number":"2"' in events[1]
+    assert events[2] == 'event: done\ndata: {"id":"test_query_id"}'
+    assert store_temp_query.call_args.args[0]["1"]["answers"]["d"] == "yellow"
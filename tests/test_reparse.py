@@ -0,0 +1,73 @@
+from routes.reparse import Reparse , RebuildQuizzes
+
+QUESTION = {"question": "What makes ATP?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "a"}
+OTHER = {"question": "What stores DNA?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "b"}
+
+def test_rebuild_quizzes_parses_the_whole_batch_at_once(mocker):
+    """
+    GIVEN one single-request quiz and one chunked quiz
+    WHEN RebuildQuizzes is called
+    THEN check that every output goes through a single parse_quiz_many call and chunks are merged up to the limit
+    """
+    parse_many = mocker.patch('routes.reparse.parse_quiz_many', return_value=[
+        {"1": QUESTION},
+        {"1": QUESTION},
+        {"1": QUESTION, "2": OTHER}
+    ])
+
+    quizzes = RebuildQuizzes([
+        {"outputs": ["single"]},
+        {"outputs": ["chunk 1", "chunk 2"], "limit": 5}
+    ])
+
+    parse_many.assert_called_once_with(["single", "chunk 1", "chunk 2"])
+    assert quizzes == [{"1": QUESTION}, {"1": QUESTION, "2": OTHER}]
+
+def test_reparse_writes_only_changed_documents_in_batches(mocker):
+    """
+    GIVEN three stored quizzes with raw output, one unchanged, one changed and one that now parses empty
+    WHEN Reparse is called with a batch size of two
+    THEN check that the parser runs once per batch and only the changed quiz is rewritten
+    """
+    docs = [
+        {"_id": 1, "raw": {"outputs": ["same"]}, "query": {"1": QUESTION}},
+        {"_id": 2, "raw": {"outputs": ["changed"]}, "query": {"1": QUESTION}},
+        {"_id": 3, "raw": {"outputs": ["broken"]}, "query": {"1": OTHER}}
+    ]
+    collection = mocker.Mock()
+    collection.find.return_value.batch_size.return_value = iter(docs)
+    mocker.patch('routes.reparse.GetMongoClient', return_value={"EduDuck": {"quizzes": collection}})
+    mocker.patch('routes.reparse.Log')
+    parse_many = mocker.patch('routes.reparse.parse_quiz_many', side_effect=[
+        [{"1": QUESTION}, {"1": QUESTION, "2": OTHER}],
+        [{}]
+    ])
+
+    stats = Reparse("quizzes" , batchSize=2)
+
+    assert stats == {"scanned": 3, "changed": 1, "empty": 1}
+    assert parse_many.call_count == 2
+    collection.bulk_write.assert_called_once()
+    updates = collection.bulk_write.call_args.args[0]
+    assert len(updates) == 1
+    assert updates[0]._filter == {"_id": 2}
+    assert updates[0]._doc["$set"]["query"] == {"1": QUESTION, "2": OTHER}
+
+def test_reparse_dry_run_does_not_write(mocker):
+    """
+    GIVEN a stored study plan whose parsed result changed
+    WHEN Reparse is called with dryRun
+    THEN check that the change is counted but nothing is written
+    """
+    collection = mocker.Mock()
+    collection.find.return_value.batch_size.return_value = iter([
+        {"_id": 1, "raw": {"outputs": ["Day 1: Read"]}, "query": []}
+    ])
+    mocker.patch('routes.reparse.GetMongoClient', return_value={"EduDuck": {"study-plans": collection}})
+    mocker.patch('routes.reparse.Log')
+    mocker.patch('routes.reparse.parse_study_plan_many', return_value=[[{"day": "Day 1:", "tasks": "Read"}]])
+
+    stats = Reparse("study-plans" , dryRun=True)
+
+    assert stats == {"scanned": 1, "changed": 1, "empty": 0}
+    collection.bulk_write.assert_not_called()
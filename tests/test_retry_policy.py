@@ -0,0 +1,86 @@
+import pytest
+import httpx
+from routes.retryPolicy import RetryPolicy, RetryAfter, ParseDuration, ParseRetryHint
+import routes.utils as utils
+
+def test_parse_duration_formats():
+    """
+    GIVEN the duration formats providers use in rate-limit headers
+    WHEN ParseDuration reads them
+    THEN check that each comes back in seconds and garbage is rejected
+    """
+    assert ParseDuration("12") == 12
+    assert ParseDuration("250ms") == 0.25
+    assert ParseDuration("6m0s") == 360
+    assert ParseDuration("1.5s") == 1.5
+    assert ParseDuration("soon") is None
+
+def test_parse_retry_hint_prefers_explicit_headers():
+    """
+    GIVEN rate-limit responses from OpenAI and Gemini
+    WHEN ParseRetryHint reads them
+    THEN check that Retry-After, exhausted OpenAI budgets and Gemini RetryInfo are understood
+    """
+    assert ParseRetryHint(httpx.Headers({"Retry-After": "3"})) == 3
+    assert ParseRetryHint(httpx.Headers({
+        "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1s",
+        "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "6m0s"
+    })) == 360
+    body = b'{"error": {"details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "37s"}]}}'
+    assert ParseRetryHint(httpx.Headers({}), body) == 37
+
+def test_retry_after_skips_non_transient_errors():
+    """
+    GIVEN error responses that would fail the same way again
+    WHEN RetryAfter classifies them
+    THEN check that only plain 429/503 responses may be resent
+    """
+    assert RetryAfter(503, httpx.Headers({})) == 0.0
+    assert RetryAfter(429, httpx.Headers({"Retry-After": "2"})) == 2
+    assert RetryAfter(401, httpx.Headers({})) is None
+    assert RetryAfter(502, httpx.Headers({})) is None
+    assert RetryAfter(429, httpx.Headers({}), b'{"error": {"code": "insufficient_quota"}}') is None
+
+def test_retry_policy_stays_within_deadline(mocker):
+    """
+    GIVEN a policy allowing two retries
+    WHEN delays are requested for several attempts and remaining budgets
+    THEN check that jitter respects the hint and retries stop when attempts or time run out
+    """
+    mocker.patch('routes.retryPolicy.random.uniform', side_effect=lambda low, high: high)
+    policy = RetryPolicy(attempts=2, base=0.5, cap=20, reserve=2)
+
+    assert policy.Delay(1, None, 0.0, 60) == 1.5
+    assert policy.Delay(2, 1.5, 10.0, 60) == 10.0
+    assert policy.Delay(3, 10.0, 0.0, 60) is None
+    assert policy.Delay(1, None, 5.0, 6) is None
+
+def test_ai_req_retries_rate_limit_then_succeeds(mocker):
+    """
+    GIVEN a provider that rate limits once with Retry-After: 0
+    WHEN AiReq is called
+    THEN check that the request is resent and the second answer is returned
+    """
+    mocker.patch.object(utils, '_retryPolicy', RetryPolicy(attempts=2, base=0.01, cap=0.05))
+    limited = httpx.Response(429, headers={"Retry-After": "0"}, content=b'{"error": "slow down"}')
+    answer = httpx.Response(200, content=b'{"choices": [{"message": {"content": "quiz"}}]}')
+    post = mocker.AsyncMock(side_effect=[limited, answer])
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "retry-model", "messages": [{"role": "user", "content": "notes"}]}
+
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI") == "quiz"
+    assert post.call_count == 2
+
+def test_ai_req_does_not_retry_auth_errors(mocker):
+    """
+    GIVEN a provider rejecting the API key
+    WHEN AiReq is called
+    THEN check that the error is returned after a single attempt
+    """
+    mocker.patch.object(utils, '_retryPolicy', RetryPolicy(attempts=2, base=0.01, cap=0.05))
+    post = mocker.AsyncMock(return_value=httpx.Response(401, content=b""))
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "retry-model", "messages": [{"role": "user", "content": "notes"}]}
+
+    assert utils.AiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI") == "API error 401"
+    post.assert_called_once()
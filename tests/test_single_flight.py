@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from routes.aiCache import ResponseCache
+from routes.singleFlight import SingleFlight, MakeFlightKey
+import routes.utils as utils
+
+def test_single_flight_coalesces_concurrent_calls():
+    """
+    GIVEN several concurrent callers with the same key
+    WHEN they all call SingleFlight.Do while the first call is still running
+    THEN check that the factory runs once and every caller gets its result
+    """
+    flights = SingleFlight()
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "quiz"
+
+    async def main():
+        return await asyncio.gather(*(flights.Do("k", factory) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["quiz"] * 5
+    assert calls == 1
+    assert flights.Stats() == {"leaders": 1, "coalesced": 4, "inFlight": 0}
+
+def test_single_flight_survives_leader_cancellation():
+    """
+    GIVEN a follower waiting on a leader's in-flight call
+    WHEN the leader is cancelled
+    THEN check that the follower still receives the result
+    """
+    flights = SingleFlight()
+
+    async def factory():
+        await asyncio.sleep(0.01)
+        return "plan"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.Do("k", factory))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.Do("k", factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "plan"
+
+def test_flight_key_separates_credentials():
+    """
+    GIVEN the same prompt fingerprint sent with two different API keys
+    WHEN MakeFlightKey is called
+    THEN check that the keys differ so one user's error is never shared with another
+    """
+    a = MakeFlightKey("fingerprint", "https://api.openai.com/v1/chat/completions", {"Authorization": "Bearer a"})
+    b = MakeFlightKey("fingerprint", "https://api.openai.com/v1/chat/completions", {"Authorization": "Bearer b"})
+
+    assert a != b
+    assert a == MakeFlightKey("fingerprint", "https://api.openai.com/v1/chat/completions", {"Authorization": "Bearer a"})
+
+def test_async_ai_req_coalesces_identical_generations(mocker):
+    """
+    GIVEN a slow provider
+    WHEN identical cached generations are awaited concurrently
+    THEN check that only one provider call is made
+    """
+    mocker.patch.object(utils, '_aiCache', ResponseCache(maxBytes=1024 * 1024))
+    mocker.patch.object(utils, '_aiFlights', SingleFlight())
+    response = mocker.Mock(status_code=200, content=b'{"choices": [{"message": {"content": "quiz"}}]}')
+
+    async def slow_post(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return response
+
+    post = mocker.AsyncMock(side_effect=slow_post)
+    mocker.patch.object(utils, 'GetAsyncHttpxClient', return_value=mocker.Mock(post=post))
+    payload = {"model": "gpt-4.1-nano", "messages": [{"role": "user", "content": "shared notes"}]}
+
+    async def main():
+        return await asyncio.gather(*(
+            utils.AsyncAiReq("https://api.openai.com/v1/chat/completions", {}, payload, "OpenAI", cache=True)
+            for _ in range(10)
+        ))
+
+    assert asyncio.run(main()) == ["quiz"] * 10
+    post.assert_called_once()
+    assert utils.GetAiFlights().coalesced == 9
@@ -0,0 +1,123 @@
+import json
+import pytest
+from flask import Flask
+from routes.structuredOutput import OutputSchema , GeminiSchema , JsonSchema , DecodeOutput
+from routes.providers import GetProvider , RequestOptions
+from routes.quiz import PrepareQuizRequest
+import routes.utils as utils
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+
+def test_output_schema_is_strict_and_pins_the_item_count():
+    """
+    GIVEN the quiz reply Struct
+    WHEN OutputSchema is built for 5 questions
+    THEN check that refs are inlined, every object is closed and the list length is fixed
+    """
+    schema = OutputSchema("quiz" , 5)["schema"]
+    questions = schema["properties"]["questions"]
+    question = questions["items"]
+
+    assert "$ref" not in json.dumps(schema) and "$defs" not in schema
+    assert schema["additionalProperties"] is False and question["additionalProperties"] is False
+    assert questions["minItems"] == questions["maxItems"] == 5
+    assert question["required"] == ["question", "answers", "correct"]
+    assert question["properties"]["correct"]["enum"] == ["a", "b", "c", "d"]
+    assert JsonSchema(GeminiSchema(schema)) == schema
+
+def test_providers_send_the_schema_in_their_own_format():
+    """
+    GIVEN request options carrying a flashcard schema
+    WHEN OpenAI, Gemini and Hugging Face requests are built
+    THEN check that OpenAI gets a strict response_format, Gemini a responseSchema and Hugging Face neither
+    """
+    options = {**RequestOptions({}, "key"), "schema": OutputSchema("flashcards" , 3)}
+
+    _, _, payload, _ = GetProvider("OpenAI").BuildRequest("prompt", options)
+    assert payload["response_format"]["type"] == "json_schema"
+    assert payload["response_format"]["json_schema"]["strict"] is True
+    assert GetProvider("OpenAI").SchemaOf(payload) == options["schema"]
+
+    _, _, payload, _ = GetProvider("Gemini").BuildRequest("prompt", options)
+    assert payload["generationConfig"]["responseMimeType"] == "application/json"
+    assert payload["generationConfig"]["responseSchema"]["type"] == "OBJECT"
+    assert GetProvider("Gemini").SchemaOf(payload)["schema"] == options["schema"]["schema"]
+
+    _, _, payload, _ = GetProvider("Hugging Face").BuildRequest("prompt", options)
+    assert "response_format" not in payload
+
+def test_decode_output_matches_the_text_parser_shapes():
+    """
+    GIVEN schema replies for a quiz, a study plan and a note analysis, plus text and broken JSON
+    WHEN DecodeOutput is called
+    THEN check that the results have the text parsers' shapes and anything else is left to them
+    """
+    quiz = DecodeOutput("quiz" , json.dumps({"questions": [
+        {"question": "Which organelle makes ATP?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "a"},
+        {"question": " ", "answers": {"a": "x", "b": "y", "c": "z", "d": "w"}, "correct": "b"}
+    ]}))
+    assert quiz == {"1": {"question": "Which organelle makes ATP?", "answers": {"a": "Mitochondria", "b": "Nucleus", "c": "Ribosome", "d": "Golgi"}, "correct": "a"}}
+
+    plan = DecodeOutput("plan" , '{"days": [{"day": 1, "tasks": "Reading: chapter one (minutes: 30)"}]}')
+    assert plan == [{"day": "Day 1:", "tasks": "Reading: chapter one (minutes: 30)"}]
+
+    analysis = DecodeOutput("note-analysis" , '{"overall_score": 80, "sections": [{"title": "Clarity", "confidence": 90, "issues": ["Long sentences"], "why_it_matters": [], "suggestions": []}]}')
+    assert analysis["overall_score"] == 80 and analysis["sections"][0]["issues"] == ["Long sentences"]
+
+    assert DecodeOutput("quiz" , "1 What? a) x b) y c) z d) w|CORRECT:a|") is None
+    assert DecodeOutput("quiz" , '{"questions": [{"question": "cut off') is None
+    assert DecodeOutput("quiz" , '{"questions": [{"question": "Q", "answers": {}, "correct": "e"}]}') is None
+
+def test_prepare_quiz_request_asks_for_a_schema_when_enabled(mocker, app):
+    """
+    GIVEN structured output enabled and an OpenAI quiz request
+    WHEN PrepareQuizRequest is called with and without structured output
+    THEN check that the JSON prompt and a schema for the requested amount are only used when allowed
+    """
+    mocker.patch('routes.structuredOutput.StructuredOutputEnabled', return_value=True)
+    data = {
+        "isFree": False,
+        "notes": "Mitochondria make ATP.",
+        "language": "English",
+        "questionCount": "4",
+        "apiMode": "OpenAI",
+        "difficulty": "easy",
+        "apiKey": "sk-test",
+        "forceNew": True
+    }
+    prompts = {"quiz": "TEXT {NOTES} {LANGUAGE} {AMOUNT} {DIFFICULTY}", "quizJson": "JSON {NOTES} {LANGUAGE} {AMOUNT} {DIFFICULTY}"}
+
+    _, [(_, _, payload, _)] = PrepareQuizRequest(prompts , data , {})
+    assert payload["messages"][0]["content"].startswith("JSON")
+    assert payload["response_format"]["json_schema"]["schema"]["properties"]["questions"]["maxItems"] == 4
+
+    _, [(_, _, payload, _)] = PrepareQuizRequest(prompts , data , {} , structured=False)
+    assert payload["messages"][0]["content"].startswith("TEXT")
+    assert "response_format" not in payload
+
+def test_fallback_request_keeps_the_schema(mocker, monkeypatch):
+    """
+    GIVEN a free-tier OpenAI request with a schema and hedging to Gemini or Hugging Face
+    WHEN a fallback request is built
+    THEN check that Gemini gets the same schema and Hugging Face, which can't enforce it, isn't used
+    """
+    monkeypatch.setenv("FREE_TIER_API_KEY", "free-key")
+    config = {
+        "enabled": True, "percentile": 95, "initialDelay": 20, "minDelay": 2,
+        "mode": "Gemini", "model": None, "apiKey": "server-key", "budget": None
+    }
+    mocker.patch.object(utils, '_hedgeConfig', config)
+    request = GetProvider("OpenAI").BuildRequest("notes", {**RequestOptions({}, "free-key"), "schema": OutputSchema("quiz" , 3)})
+
+    _, _, payload, mode = utils.BuildFallbackRequest(*request)
+    assert mode == "Gemini"
+    assert JsonSchema(payload["generationConfig"]["responseSchema"]) == OutputSchema("quiz" , 3)["schema"]
+
+    config["mode"] = "Hugging Face"
+    assert utils.BuildFallbackRequest(*request) is None
@@ -0,0 +1,71 @@
+import pytest
+from flask import Flask
+from routes.studyPack import SplitStudyPack, StudyPackGen
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+
+PACK_OUTPUT = """===NOTES===
+# Cells
+Mitochondria make **ATP**.
+
+===QUIZ===
+1 What makes ATP? a) Nucleus b) Mitochondria c) Ribosome d) Wall|CORRECT:b|
+
+=== FLASHCARDS ===
+What makes ATP? | Mitochondria ~ What stores DNA? | Nucleus
+"""
+
+def test_split_study_pack_sections():
+    """
+    GIVEN delimited study pack output with slightly irregular markers
+    WHEN SplitStudyPack is called
+    THEN check that every section is returned without its marker
+    """
+    sections = SplitStudyPack(PACK_OUTPUT)
+
+    assert set(sections) == {"NOTES", "QUIZ", "FLASHCARDS"}
+    assert sections["NOTES"].startswith("# Cells")
+    assert sections["FLASHCARDS"] == "What makes ATP? | Mitochondria ~ What stores DNA? | Nucleus"
+
+def test_study_pack_stores_each_artifact_separately(mocker, app):
+    """
+    GIVEN a logged in user requesting notes, quiz and flashcards
+    WHEN StudyPackGen is called
+    THEN check that one AiReq call is made and each artifact is stored under its own query
+    """
+    mocker.patch('routes.studyPack.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
+    ai_req = mocker.patch('routes.studyPack.AiReq', return_value=PACK_OUTPUT)
+    mocker.patch('routes.studyPack.parse_quiz', return_value={"1": {"question": "What makes ATP?"}})
+    store_query = mocker.patch('routes.studyPack.StoreQuery', side_effect=lambda name, query, raw=None: f"{name}-id")
+    mocker.patch('routes.studyPack.jsonify', side_effect=lambda x: x)
+
+    data = {
+        "isFree": False,
+        "notes": "Mitochondria make ATP.",
+        "language": "English",
+        "apiMode": "OpenAI",
+        "apiKey": "test_api_key",
+        "artifacts": ["notes", "quiz", "flashcards"]
+    }
+    mocker.patch('routes.studyPack.request', mocker.Mock(get_json=lambda: data))
+
+    prompts = {
+        "studyPack": "{SECTIONS} {NOTES} {LANGUAGE}",
+        "studyPackNotes": "===NOTES===",
+        "studyPackQuiz": "===QUIZ=== {AMOUNT} {DIFFICULTY}",
+        "studyPackFlashcards": "===FLASHCARDS=== {CARDS}"
+    }
+    response = StudyPackGen(prompts, {"notes": {}, "quiz": {}, "flashcards": {}})
+
+    ai_req.assert_called_once()
+    assert response == {"ids": {"notes": "notes-id", "quiz": "quiz-id", "flashcards": "flashcards-id"}}
+    assert store_query.call_args_list[2].args[1] == [
+        {"question": "What makes ATP?", "answer": "Mitochondria"},
+        {"question": "What stores DNA?", "answer": "Nucleus"}
+    ]
@@ -14,18 +14,14 @@ def test_study_plan_gen_increment_usage_for_free_user(mocker, app):
     """
     GIVEN a free user who has not reached their daily limit
     WHEN StudyPlanGen is called
-    THEN check that IncrementUsage is called
+    THEN check that a free use is reserved
     """
     mocker.patch('routes.studyPlanGenerator.current_user', mocker.Mock(is_authenticated=True, id='699755eb0ac27fe8296de32f'))
-    mocker.patch('routes.studyPlanGenerator.GetMongoClient', return_value={
-        "EduDuck": {
-            "users": mocker.Mock(find_one=lambda x: {"daily_usage": {"timesUsed": 0}})
-        }
-    })
-    increment_usage_mock = mocker.patch('routes.studyPlanGenerator.IncrementUsage')
+    mocker.patch('routes.studyPlanGenerator.GetUserDoc', return_value={"daily_usage": {"timesUsed": 0}})
+    increment_usage_mock = mocker.patch('routes.studyPlanGenerator.ReserveUsage')
     mocker.patch('routes.studyPlanGenerator.AiReq', return_value="## Day 1: Introduction to Python")
     mocker.patch('routes.studyPlanGenerator.StoreQuery', return_value="test_query_id")
-    mocker.patch('routes.studyPlanGenerator.study_plan_parser.parse_study_plan', return_value=[{"day": 1, "topic": "Introduction to Python"}])
+    mocker.patch('routes.studyPlanGenerator.parse_study_plan', return_value=[{"day": 1, "topic": "Introduction to Python"}])
 
     data = {
         "isFree": True,
@@ -0,0 +1,128 @@
+import pytest
+from bson import ObjectId
+from flask import Flask , g
+from routes.userCache import UserCache
+from routes.utils import GetUserDoc , IncrementUsage , InvalidateUser , ReserveUsage
+
+USER_ID = "699755eb0ac27fe8296de32f"
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def users(mocker):
+    """A users collection mock and a fresh process cache for the logged in test user."""
+    users = mocker.Mock()
+    users.find_one.side_effect = lambda query: {"_id": query["_id"], "daily_usage": {"timesUsed": 1}}
+    mocker.patch('routes.utils.GetMongoClient', return_value={"EduDuck": {"users": users}})
+    mocker.patch('routes.utils._userCache', UserCache())
+    mocker.patch('routes.utils.current_user', mocker.Mock(is_authenticated=True, id=USER_ID))
+    return users
+
+def test_user_cache_expires_and_evicts(mocker):
+    """
+    GIVEN a cache holding two users with a five second ttl
+    WHEN entries expire, a third user is added and one is invalidated
+    THEN check that expired, least recently used and invalidated users are gone and a ttl of 0 stores nothing
+    """
+    clock = mocker.patch('routes.userCache.time.monotonic', return_value=100.0)
+    cache = UserCache(maxEntries=2, ttl=5)
+    cache.Put("a" , {"_id": "a"})
+    cache.Put("b" , {"_id": "b"})
+
+    assert cache.Get("a") == {"_id": "a"}
+    cache.Put("c" , {"_id": "c"})
+    assert cache.Get("b") is None and len(cache) == 2
+
+    cache.Invalidate("a")
+    assert cache.Get("a") is None
+
+    clock.return_value = 105.0
+    assert cache.Get("c") is None
+    assert (cache.hits , cache.misses) == (1 , 3)
+
+    disabled = UserCache(ttl=0)
+    disabled.Put("a" , {"_id": "a"})
+    assert len(disabled) == 0
+
+def test_get_user_doc_reads_once_per_request(users, app):
+    """
+    GIVEN a logged in user
+    WHEN GetUserDoc is called several times in one request and again in the next one
+    THEN check that the first request reads the users collection once and the next is served by the process cache
+    """
+    with app.test_request_context():
+        first = GetUserDoc()
+        assert GetUserDoc() is first
+        assert GetUserDoc(USER_ID) is first
+
+    with app.test_request_context():
+        assert GetUserDoc() is first
+
+    assert users.find_one.call_count == 1
+    assert users.find_one.call_args.args[0] == {"_id": ObjectId(USER_ID), "deleted": {"$ne": True}}
+
+    with app.test_request_context():
+        InvalidateUser(USER_ID)
+        GetUserDoc()
+
+    assert users.find_one.call_count == 2
+
+def test_increment_usage_refreshes_cached_user(users, app):
+    """
+    GIVEN a user whose document was read earlier in the request
+    WHEN IncrementUsage updates their usage
+    THEN check that later reads get the updated document without querying again
+    """
+    users.find_one_and_update.return_value = {"_id": ObjectId(USER_ID), "daily_usage": {"timesUsed": 2}}
+
+    with app.test_request_context():
+        assert GetUserDoc()["daily_usage"]["timesUsed"] == 1
+        IncrementUsage()
+        assert GetUserDoc()["daily_usage"]["timesUsed"] == 2
+
+    with app.test_request_context():
+        assert GetUserDoc()["daily_usage"]["timesUsed"] == 2
+
+    assert users.find_one.call_count == 1
+
+def test_reserve_usage_stops_at_the_daily_limit(users, app):
+    """
+    GIVEN a free user who has already used all of today's requests
+    WHEN ReserveUsage and the increment-usage endpoint try to take another one
+    THEN check that the limit is enforced in the update filter, nothing is returned and the cached user is dropped
+    """
+    users.find_one_and_update.return_value = None
+
+    with app.test_request_context():
+        GetUserDoc()
+        assert ReserveUsage() is None
+        response , status = IncrementUsage()
+
+    query = users.find_one_and_update.call_args.args[0]
+    assert query["daily_usage.timesUsed"] == {"$lt": 3}
+    assert status == 429 and response.get_json()["remaining"] == 0
+    assert users.find_one.call_count == 2
+
+def test_reserve_usage_charges_a_job_once(users, app):
+    """
+    GIVEN a background job whose earlier run already took a free use
+    WHEN the re-claimed job reserves usage again
+    THEN check that the charge is tied to the job ID and the user is returned without a second charge
+    """
+    charged = {"_id": ObjectId(USER_ID), "daily_usage": {"timesUsed": 2, "jobs": ["job-1"]}}
+    users.find_one_and_update.return_value = None
+    users.find_one.side_effect = lambda query: charged if query.get("daily_usage.jobs") == "job-1" else None
+
+    with app.test_request_context():
+        g.jobID = "job-1"
+        assert ReserveUsage() is charged
+
+    query , update = users.find_one_and_update.call_args.args
+    assert query["daily_usage.jobs"] == {"$ne": "job-1"}
+    assert update == {"$inc": {"daily_usage.timesUsed": 1}, "$push": {"daily_usage.jobs": "job-1"}}
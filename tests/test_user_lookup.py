@@ -0,0 +1,76 @@
+import pytest
+from flask import Flask
+from routes.utils import LoadUserByMail , LoadUserByUsername , RegisterUser , UserKeys
+from routes.migrations import MigrateUserKeys
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.add_url_rule("/verify/<token>", "verify_email", lambda token: token)
+    with app.app_context():
+        yield app
+
+def test_lookups_match_normalized_keys_exactly(mocker):
+    """
+    GIVEN a username and an email typed in another case with surrounding spaces
+    WHEN LoadUserByUsername and LoadUserByMail are called
+    THEN check that they query the exact usernameKey and emailKey, not a regex
+    """
+    users = mocker.Mock()
+    mocker.patch('routes.utils.GetMongoClient', return_value={"EduDuck": {"users": users}})
+
+    LoadUserByUsername(" DuckFan ")
+    LoadUserByMail("Duck@EduDuck.app")
+
+    assert users.find_one.call_args_list[0].args[0] == {"usernameKey": "duckfan", "deleted": {"$ne": True}}
+    assert users.find_one.call_args_list[1].args[0] == {"emailKey": "duck@eduduck.app", "deleted": {"$ne": True}}
+
+def test_register_user_stores_lookup_keys(mocker, app):
+    """
+    GIVEN a new registration with a mixed-case username and email
+    WHEN RegisterUser is called
+    THEN check that both are checked by key and the stored user carries usernameKey and emailKey
+    """
+    users = mocker.Mock()
+    users.find_one.return_value = None
+    mocker.patch('routes.utils.GetMongoClient', return_value={"EduDuck": {"users": users}})
+    body = {"username": "DuckFan", "password": "secret123", "confirm": "secret123", "email": "Duck@EduDuck.app"}
+
+    with app.test_request_context(method="POST", json=body):
+        RegisterUser()
+
+    assert [call.args[0] for call in users.find_one.call_args_list] == [
+        {"usernameKey": "duckfan", "deleted": {"$ne": True}},
+        {"emailKey": "duck@eduduck.app", "deleted": {"$ne": True}}
+    ]
+    stored = users.insert_one.call_args.args[0]
+    assert stored["usernameKey"] == "duckfan" and stored["emailKey"] == "duck@eduduck.app"
+
+def test_migrate_user_keys_backfills_in_batches(mocker):
+    """
+    GIVEN three users without lookup keys, one of them without an email
+    WHEN MigrateUserKeys runs with a batch size of two, then as a dry run
+    THEN check that each user gets its keys in one bulk write per batch and the dry run writes nothing
+    """
+    docs = [
+        {"_id": 1, "username": "DuckFan", "email": "Duck@EduDuck.app"},
+        {"_id": 2, "username": "octocat", "email": None},
+        {"_id": 3, "username": "Quack", "email": "quack@eduduck.app"}
+    ]
+    users = mocker.Mock()
+    users.find.return_value.batch_size.side_effect = lambda size: iter(docs)
+    mocker.patch('routes.migrations.GetMongoClient', return_value={"EduDuck": {"users": users}})
+    mocker.patch('routes.migrations.Log')
+
+    assert MigrateUserKeys(batchSize=2) == {"scanned": 3, "updated": 3}
+
+    assert users.bulk_write.call_count == 2
+    first = users.bulk_write.call_args_list[0].args[0]
+    assert first[0]._doc == {"$set": UserKeys("DuckFan" , "Duck@EduDuck.app")}
+    assert first[1]._doc == {"$set": {"usernameKey": "octocat", "emailKey": None}}
+
+    users.bulk_write.reset_mock()
+    assert MigrateUserKeys(dryRun=True) == {"scanned": 3, "updated": 3}
+    users.bulk_write.assert_not_called()
@@ -31,3 +31,91 @@ def test_log(capsys):
     captured = capsys.readouterr()
     assert "test message" in captured.out
     assert "info" in captured.out
+
+def test_ai_req_stream_parses_openai_deltas(mocker):
+    """
+    GIVEN an OpenAI-style SSE body
+    WHEN AiReqStream is iterated
+    THEN check that only the content deltas are yielded and stream mode is requested
+    """
+    import routes.utils as utils
+
+    lines = [
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        '',
+        'data: {"choices": [{"delta": {"content": "Hi"}}]}',
+        'data: {"choices": [{"delta": {"content": " there"}}]}',
+        'data: [DONE]',
+    ]
+    response = mocker.MagicMock(status_code=200)
+    response.iter_lines.return_value = iter(lines)
+    stream = mocker.patch.object(utils._httpxclient, 'stream')
+    stream.return_value.__enter__.return_value = response
+
+    chunks = list(utils.AiReqStream("https://api.openai.com/v1/chat/completions", {}, {"model": "gpt-4.1-nano"}, "OpenAI"))
+
+    assert chunks == ["Hi", " there"]
+    assert stream.call_args.kwargs["json"]["stream"] is True
+
+def test_ai_req_stream_ends_with_none_on_timeout_after_text(mocker):
+    """
+    GIVEN a provider stream that times out after its first delta
+    WHEN AiReqStream is iterated
+    THEN check that the delta is followed by None, not the timeout text, and the guard's slot is released
+    """
+    import httpx
+    import routes.utils as utils
+    from routes.circuitBreaker import ProviderGuard, CircuitBreaker, AdaptiveLimiter
+
+    def lines():
+        yield 'data: {"choices": [{"delta": {"content": "Hi"}}]}'
+        raise httpx.ReadTimeout("slow")
+
+    guard = ProviderGuard(CircuitBreaker(), AdaptiveLimiter())
+    mocker.patch.dict(utils._providerGuards, {("OpenAI", "gpt-4.1-nano"): guard})
+    response = mocker.MagicMock(status_code=200)
+    response.iter_lines.return_value = lines()
+    stream = mocker.patch.object(utils._httpxclient, 'stream')
+    stream.return_value.__enter__.return_value = response
+
+    chunks = list(utils.AiReqStream("https://api.openai.com/v1/chat/completions", {}, {"model": "gpt-4.1-nano"}, "OpenAI"))
+
+    assert chunks == ["Hi", None]
+    assert guard.Stats()["limiter"]["inFlight"] == 0
+    assert guard.Stats()["breaker"]["failures"] == 1
+
+def test_ai_req_stream_retries_and_caches(mocker):
+    """
+    GIVEN a provider answering a stream with 503 first and a reply the second time
+    WHEN AiReqStream is iterated twice with a cache predicate
+    THEN check that the 503 is retried before any text, and the second call is served from the cache
+    """
+    import routes.utils as utils
+    from routes.aiCache import ResponseCache
+    from routes.retryPolicy import RetryPolicy
+
+    mocker.patch.object(utils, '_aiCache', ResponseCache(maxBytes=1024 * 1024))
+    mocker.patch.object(utils, '_retryPolicy', RetryPolicy(attempts=1, base=0.01, cap=0.01))
+    unavailable = mocker.MagicMock(status_code=503, headers={})
+    unavailable.read.return_value = b"{}"
+    ok = mocker.MagicMock(status_code=200)
+    ok.iter_lines.return_value = iter(['data: {"choices": [{"delta": {"content": "quiz"}}]}', 'data: [DONE]'])
+    stream = mocker.patch.object(utils._httpxclient, 'stream')
+    stream.return_value.__enter__.side_effect = [unavailable, ok]
+    args = ("https://api.openai.com/v1/chat/completions", {}, {"model": "gpt-4.1-nano"}, "OpenAI")
+
+    assert list(utils.AiReqStream(*args, cache=lambda output: output == "quiz")) == ["quiz"]
+    assert list(utils.AiReqStream(*args, cache=lambda output: output == "quiz")) == ["quiz"]
+    assert stream.call_count == 2
+
+def test_stream_url_switches_gemini_to_sse():
+    """
+    GIVEN a Gemini generateContent URL
+    WHEN StreamURL is called
+    THEN check that the streaming SSE endpoint is returned
+    """
+    from routes.utils import StreamURL
+
+    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key=abc"
+    assert StreamURL(url, "Gemini") == "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:streamGenerateContent?key=abc&alt=sse"
+    assert StreamURL("https://api.openai.com/v1/chat/completions", "OpenAI") == "https://api.openai.com/v1/chat/completions"